@@ -3,6 +3,8 @@ from ploxTokens import *
 
 class Expr:
 
+	__slots__ = ()
+
 	def __init__(self):
 		pass
 
@@ -52,6 +54,10 @@ class Expr:
 
 class Assign(Expr):
 
+	__slots__ = ("name", "value", "depth", "slot")
+	__match_args__ = ("name", "value")
+	kind = 0
+
 	def __init__(self, name: Token, value: Expr):
 		self.name: Token = name
 		self.value: Expr = value
@@ -61,6 +67,10 @@ class Assign(Expr):
 
 class Binary(Expr):
 
+	__slots__ = ("left", "operator", "right")
+	__match_args__ = ("left", "operator", "right")
+	kind = 1
+
 	def __init__(self, left: Expr, operator: Token, right: Expr):
 		self.left: Expr = left
 		self.operator: Token = operator
@@ -71,6 +81,10 @@ class Binary(Expr):
 
 class Call(Expr):
 
+	__slots__ = ("callee", "paren", "arguments")
+	__match_args__ = ("callee", "paren", "arguments")
+	kind = 2
+
 	def __init__(self, callee: Expr, paren: Token, arguments: list[Expr]):
 		self.callee: Expr = callee
 		self.paren: Token = paren
@@ -81,6 +95,10 @@ class Call(Expr):
 
 class Get(Expr):
 
+	__slots__ = ("object", "name", "cache")
+	__match_args__ = ("object", "name")
+	kind = 3
+
 	def __init__(self, object: Expr, name: Token):
 		self.object: Expr = object
 		self.name: Token = name
@@ -90,6 +108,10 @@ class Get(Expr):
 
 class Grouping(Expr):
 
+	__slots__ = ("expression",)
+	__match_args__ = ("expression",)
+	kind = 4
+
 	def __init__(self, expression: Expr):
 		self.expression: Expr = expression
 
@@ -98,6 +120,10 @@ class Grouping(Expr):
 
 class Literal(Expr):
 
+	__slots__ = ("value",)
+	__match_args__ = ("value",)
+	kind = 5
+
 	def __init__(self, value: object):
 		self.value: object = value
 
@@ -106,6 +132,10 @@ class Literal(Expr):
 
 class Logical(Expr):
 
+	__slots__ = ("left", "operator", "right")
+	__match_args__ = ("left", "operator", "right")
+	kind = 6
+
 	def __init__(self, left: Expr, operator: Token, right: Expr):
 		self.left: Expr = left
 		self.operator: Token = operator
@@ -116,6 +146,10 @@ class Logical(Expr):
 
 class Set(Expr):
 
+	__slots__ = ("object", "name", "value", "cache")
+	__match_args__ = ("object", "name", "value")
+	kind = 7
+
 	def __init__(self, object: Expr, name: Token, value: Expr):
 		self.object: Expr = object
 		self.name: Token = name
@@ -126,6 +160,10 @@ class Set(Expr):
 
 class Super(Expr):
 
+	__slots__ = ("keyword", "method", "depth", "slot")
+	__match_args__ = ("keyword", "method")
+	kind = 8
+
 	def __init__(self, keyword: Token, method: Token):
 		self.keyword: Token = keyword
 		self.method: Token = method
@@ -135,6 +173,10 @@ class Super(Expr):
 
 class This(Expr):
 
+	__slots__ = ("keyword", "depth", "slot")
+	__match_args__ = ("keyword",)
+	kind = 9
+
 	def __init__(self, keyword: Token):
 		self.keyword: Token = keyword
 
@@ -143,6 +185,10 @@ class This(Expr):
 
 class Unary(Expr):
 
+	__slots__ = ("operator", "right")
+	__match_args__ = ("operator", "right")
+	kind = 10
+
 	def __init__(self, operator: Token, right: Expr):
 		self.operator: Token = operator
 		self.right: Expr = right
@@ -152,9 +198,33 @@ class Unary(Expr):
 
 class Variable(Expr):
 
+	__slots__ = ("name", "depth", "slot")
+	__match_args__ = ("name",)
+	kind = 11
+
 	def __init__(self, name: Token):
 		self.name: Token = name
 
 	def accept(self, visitor: Expr.Visitor) -> object:
 		return visitor.visitVariableExpr(self)
 
+# kind -> the Visitor method for that Expr
+exprVisits = (
+	"visitAssignExpr",
+	"visitBinaryExpr",
+	"visitCallExpr",
+	"visitGetExpr",
+	"visitGroupingExpr",
+	"visitLiteralExpr",
+	"visitLogicalExpr",
+	"visitSetExpr",
+	"visitSuperExpr",
+	"visitThisExpr",
+	"visitUnaryExpr",
+	"visitVariableExpr",
+)
+
+# A visitor's methods in kind order, for visitors that dispatch with
+# table[expr.kind](expr) instead of a call through accept() first.
+def exprDispatch(visitor: Expr.Visitor) -> list:
+	return [getattr(visitor, name) for name in exprVisits]
@@ -3,10 +3,9 @@ from AST import Token, Expr
 
 class Stmt:
 
-	def __init__(self):
-		pass
+	__slots__ = ()
 
-	def accept(self, visitor: Stmt.Visitor):
+	def __init__(self):
 		pass
 
 	class Visitor:
@@ -14,73 +13,168 @@ class Stmt:
 		def __init__(self):
 			pass
 
-		def visitBlockStmt(self, stmt: Block):
+		def visitBlockStmt(self, stmt: Block) -> object:
+			pass
+
+		def visitClassStmt(self, stmt: Class) -> object:
+			pass
+
+		def visitExpressionStmt(self, stmt: Expression) -> object:
+			pass
+
+		def visitFunctionStmt(self, stmt: Function) -> object:
 			pass
 
-		def visitExpressionStmt(self, stmt: Expression):
+		def visitIfStmt(self, stmt: If) -> object:
 			pass
 
-		def visitIfStmt(self, stmt: If):
+		def visitPrintStmt(self, stmt: Print) -> object:
 			pass
 
-		def visitPrintStmt(self, stmt: Print):
+		def visitReturnStmt(self, stmt: Return) -> object:
 			pass
 
-		def visitVarStmt(self, stmt: Var):
+		def visitVarStmt(self, stmt: Var) -> object:
 			pass
 
-		def visitWhileStmt(self, stmt: While):
+		def visitWhileStmt(self, stmt: While) -> object:
 			pass
 
+	def accept(self, visitor: Stmt.Visitor) -> object:
+		pass
+
 class Block(Stmt):
 
+	__slots__ = ("statements", "slotNames")
+	__match_args__ = ("statements",)
+	kind = 0
+
 	def __init__(self, statements: list[Stmt]):
 		self.statements: list[Stmt] = statements
 
-	def accept(self, visitor: Stmt.Visitor):
+	def accept(self, visitor: Stmt.Visitor) -> object:
 		return visitor.visitBlockStmt(self)
 
+class Class(Stmt):
+
+	__slots__ = ("name", "superclass", "methods", "slot")
+	__match_args__ = ("name", "superclass", "methods")
+	kind = 1
+
+	def __init__(self, name: Token, superclass: Variable|None, methods: list[Function]):
+		self.name: Token = name
+		self.superclass: Variable|None = superclass
+		self.methods: list[Function] = methods
+
+	def accept(self, visitor: Stmt.Visitor) -> object:
+		return visitor.visitClassStmt(self)
+
 class Expression(Stmt):
 
+	__slots__ = ("expression",)
+	__match_args__ = ("expression",)
+	kind = 2
+
 	def __init__(self, expression: Expr):
 		self.expression: Expr = expression
 
-	def accept(self, visitor: Stmt.Visitor):
+	def accept(self, visitor: Stmt.Visitor) -> object:
 		return visitor.visitExpressionStmt(self)
 
+class Function(Stmt):
+
+	__slots__ = ("name", "params", "body", "slot", "slotNames")
+	__match_args__ = ("name", "params", "body")
+	kind = 3
+
+	def __init__(self, name: Token, params: list[Token], body: list[Stmt]):
+		self.name: Token = name
+		self.params: list[Token] = params
+		self.body: list[Stmt] = body
+
+	def accept(self, visitor: Stmt.Visitor) -> object:
+		return visitor.visitFunctionStmt(self)
+
 class If(Stmt):
 
-	def __init__(self, condition: Expr, thenBranch: Stmt, elseBranch: Stmt):
+	__slots__ = ("condition", "thenBranch", "elseBranch")
+	__match_args__ = ("condition", "thenBranch", "elseBranch")
+	kind = 4
+
+	def __init__(self, condition: Expr, thenBranch: Stmt, elseBranch: Stmt|None):
 		self.condition: Expr = condition
 		self.thenBranch: Stmt = thenBranch
-		self.elseBranch: Stmt = elseBranch
+		self.elseBranch: Stmt|None = elseBranch
 
-	def accept(self, visitor: Stmt.Visitor):
+	def accept(self, visitor: Stmt.Visitor) -> object:
 		return visitor.visitIfStmt(self)
 
 class Print(Stmt):
 
+	__slots__ = ("expression",)
+	__match_args__ = ("expression",)
+	kind = 5
+
 	def __init__(self, expression: Expr):
 		self.expression: Expr = expression
 
-	def accept(self, visitor: Stmt.Visitor):
+	def accept(self, visitor: Stmt.Visitor) -> object:
 		return visitor.visitPrintStmt(self)
 
+class Return(Stmt):
+
+	__slots__ = ("keyword", "value")
+	__match_args__ = ("keyword", "value")
+	kind = 6
+
+	def __init__(self, keyword: Token, value: Expr|None):
+		self.keyword: Token = keyword
+		self.value: Expr|None = value
+
+	def accept(self, visitor: Stmt.Visitor) -> object:
+		return visitor.visitReturnStmt(self)
+
 class Var(Stmt):
 
+	__slots__ = ("name", "initializer", "slot")
+	__match_args__ = ("name", "initializer")
+	kind = 7
+
 	def __init__(self, name: Token, initializer: Expr|None):
 		self.name: Token = name
 		self.initializer: Expr|None = initializer
 
-	def accept(self, visitor: Stmt.Visitor):
+	def accept(self, visitor: Stmt.Visitor) -> object:
 		return visitor.visitVarStmt(self)
 
 class While(Stmt):
 
-	def __init__(self, condition: Expr, body: Stmt):
+	__slots__ = ("condition", "body", "increment")
+	__match_args__ = ("condition", "body", "increment")
+	kind = 8
+
+	def __init__(self, condition: Expr, body: Stmt, increment: Expr|None):
 		self.condition: Expr = condition
 		self.body: Stmt = body
+		self.increment: Expr|None = increment
 
-	def accept(self, visitor: Stmt.Visitor):
+	def accept(self, visitor: Stmt.Visitor) -> object:
 		return visitor.visitWhileStmt(self)
 
+# kind -> the Visitor method for that Stmt
+stmtVisits = (
+	"visitBlockStmt",
+	"visitClassStmt",
+	"visitExpressionStmt",
+	"visitFunctionStmt",
+	"visitIfStmt",
+	"visitPrintStmt",
+	"visitReturnStmt",
+	"visitVarStmt",
+	"visitWhileStmt",
+)
+
+# A visitor's methods in kind order, for visitors that dispatch with
+# table[stmt.kind](stmt) instead of a call through accept() first.
+def stmtDispatch(visitor: Stmt.Visitor) -> list:
+	return [getattr(visitor, name) for name in stmtVisits]
@@ -0,0 +1,225 @@
+from __future__ import annotations
+import asyncio
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from environment import ArrayEnvironment
+from loxClass import LoxClass, LoxInstance
+from ploxRuntime import LoxRuntimeError
+
+# plox only imports this module when an async interpreter is asked for, so
+# pulling Interpreter in from there doesn't make a cycle at import time
+from plox import Interpreter, LoxFunction, ReturnValue
+
+# statements that can hold other statements, and so can run for a long time
+compound = (While, Block, If)
+
+class AsyncInterpreter(Interpreter):
+
+    # Tree walker that can share an asyncio event loop with other work.
+    # Statements that contain other statements (blocks, loops, ifs) are run
+    # as generators, and so are calls to Lox functions and classes: an
+    # expression with a call in it is evaluated by evalSteps(), which runs
+    # the function body through the same generators. Every stepBudget
+    # executed statements, however deep in calls, the generator chain
+    # yields, and interperateAsync() hands control back to the event loop
+    # before carrying on. Everything without a call in it is executed
+    # exactly as Interpreter does, and interperate() still runs
+    # synchronously.
+    #
+    # Native functions run to completion; they can't call back into Lox.
+
+    def __init__(self, lox_inst, stepBudget: int = 1000, scopeType: type = ArrayEnvironment):
+        super().__init__(lox_inst, scopeType)
+        self.stepBudget: int = stepBudget
+        self.stepsLeft: int = stepBudget
+        self.slices: int = 0
+        # node -> whether running it can call a Lox function
+        self.stepped: dict[Stmt|Expr, bool] = {}
+
+    async def interperateAsync(self, statements: list[Stmt]):
+        try:
+            for statement in statements:
+                for _ in self.steps(statement):
+                    self.slices += 1
+                    await asyncio.sleep(0)
+        except LoxRuntimeError as e:
+            self.lox_inst.runTimeError(e)
+
+    def hasCall(self, expr: Expr) -> bool:
+        found = self.stepped.get(expr)
+        if found is None:
+            found = type(expr) is Call
+            for name in expr.__match_args__:
+                child = getattr(expr, name)
+                if isinstance(child, Expr):
+                    found = self.hasCall(child) or found
+                elif type(child) is list:
+                    for argument in child:
+                        found = self.hasCall(argument) or found
+            self.stepped[expr] = found
+        return found
+
+    def needsSteps(self, stmt: Stmt) -> bool:
+        found = self.stepped.get(stmt)
+        if found is None:
+            kind = type(stmt)
+            if kind in compound:
+                found = True
+            elif kind is Expression or kind is Print:
+                found = self.hasCall(stmt.expression)
+            elif kind is Var:
+                found = stmt.initializer is not None and self.hasCall(stmt.initializer)
+            elif kind is Return:
+                found = stmt.value is not None and self.hasCall(stmt.value)
+            else:
+                found = False
+            self.stepped[stmt] = found
+        return found
+
+    # Like execute(), as a generator: returns the statement's completion
+    # (see ReturnValue) when it's done.
+    def steps(self, stmt: Stmt):
+        self.stepsLeft -= 1
+        if self.stepsLeft <= 0:
+            self.stepsLeft = self.stepBudget
+            yield
+
+        kind = type(stmt)
+
+        if kind is While:
+            body = stmt.body
+            increment = stmt.increment
+            if self.needsSteps(body):
+                while self.isTruthy((yield from self.evalSteps(stmt.condition))):
+                    completion = yield from self.steps(body)
+                    if completion is not None:
+                        return completion
+                    if increment is not None:
+                        yield from self.evalSteps(increment)
+            else:
+                while self.isTruthy((yield from self.evalSteps(stmt.condition))):
+                    self.stepsLeft -= 1
+                    if self.stepsLeft <= 0:
+                        self.stepsLeft = self.stepBudget
+                        yield
+                    completion = self.execute(body)
+                    if completion is not None:
+                        return completion
+                    if increment is not None:
+                        yield from self.evalSteps(increment)
+            return None
+        elif kind is Block:
+            if stmt.slotNames is None:
+                return (yield from self.blockSteps(stmt.statements, self.environment))
+            return (yield from self.blockSteps(stmt.statements, self.scopeType(self.environment, stmt.slotNames)))
+        elif kind is If:
+            if self.isTruthy((yield from self.evalSteps(stmt.condition))):
+                return (yield from self.steps(stmt.thenBranch))
+            elif stmt.elseBranch is not None:
+                return (yield from self.steps(stmt.elseBranch))
+            return None
+        elif not self.needsSteps(stmt):
+            return self.execute(stmt)
+        elif kind is Expression:
+            yield from self.evalSteps(stmt.expression)
+        elif kind is Print:
+            value = yield from self.evalSteps(stmt.expression)
+            self.output.writeLine(self.stringify(value))
+        elif kind is Var:
+            value = yield from self.evalSteps(stmt.initializer)
+            if stmt.slot is None:
+                self.environment.define(stmt.name.lexeme, value)
+            else:
+                self.environment.defineAt(stmt.slot, stmt.name.lexeme, value)
+        elif kind is Return:
+            return ReturnValue((yield from self.evalSteps(stmt.value)))
+        return None
+
+    def blockSteps(self, statements: list[Stmt], environment):
+        previous = self.environment
+        self.environment = environment
+        try:
+            for statement in statements:
+                if self.needsSteps(statement):
+                    completion = yield from self.steps(statement)
+                else:
+                    # simple statements are counted here rather than
+                    # getting a generator of their own
+                    self.stepsLeft -= 1
+                    if self.stepsLeft <= 0:
+                        self.stepsLeft = self.stepBudget
+                        yield
+                    completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+        finally:
+            self.environment = previous
+        return None
+
+    # Like evaluate(), as a generator that returns the value, so the Lox
+    # functions an expression calls can yield too.
+    def evalSteps(self, expr: Expr):
+        if not self.hasCall(expr):
+            return self.evaluate(expr)
+
+        kind = type(expr)
+
+        if kind is Call:
+            callee = yield from self.evalSteps(expr.callee)
+            arguments = []
+            for argument in expr.arguments:
+                arguments.append((yield from self.evalSteps(argument)))
+
+            if type(callee) is LoxFunction and len(arguments) == callee.arity:
+                return (yield from self.callSteps(callee, arguments))
+            if type(callee) is LoxClass and len(arguments) == callee.arity:
+                instance = LoxInstance(callee)
+                initializer = callee.findMethod("init")
+                if initializer is not None:
+                    yield from self.callSteps(initializer.bind(instance), arguments)
+                return instance
+            # natives, and the errors for everything else
+            return self.callOp(expr, callee, arguments)
+        elif kind is Binary:
+            left = yield from self.evalSteps(expr.left)
+            right = yield from self.evalSteps(expr.right)
+            return self.binaryOp(expr.operator, left, right)
+        elif kind is Logical:
+            left = yield from self.evalSteps(expr.left)
+            if expr.operator.type == tokenType.OR:
+                if self.isTruthy(left): return left
+            else:
+                if not self.isTruthy(left): return left
+            return (yield from self.evalSteps(expr.right))
+        elif kind is Unary:
+            return self.unaryOp(expr.operator, (yield from self.evalSteps(expr.right)))
+        elif kind is Grouping:
+            return (yield from self.evalSteps(expr.expression))
+        elif kind is Assign:
+            value = yield from self.evalSteps(expr.value)
+            if expr.depth is None:
+                self.globals.assign(expr.name, value)
+            else:
+                self.environment.assignAt(expr.depth, expr.slot, expr.name.lexeme, value)
+            return value
+        elif kind is Get:
+            return self.getOp(expr, (yield from self.evalSteps(expr.object)))
+        elif kind is Set:
+            instance = yield from self.evalSteps(expr.object)
+            if type(instance) is not LoxInstance:
+                raise LoxRuntimeError(expr.name, "only instances have fields")
+            return self.setOp(expr, instance, (yield from self.evalSteps(expr.value)))
+        return self.evaluate(expr)
+
+    def callSteps(self, function: LoxFunction, arguments: list[object]):
+        declaration = function.declaration
+        frame = self.scopeType(function.closure, declaration.slotNames)
+        frame.bind(arguments)
+        completion = yield from self.blockSteps(declaration.body, frame)
+        if function.isInitializer:
+            return function.closure.getAt(0, 0, "this")
+        if completion is not None:
+            return completion.value
+        return None
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import io
+import os
+import sys
+import traceback
+
+# Runs lots of independent scripts on a process pool. Every script gets its
+# own lox instance and its own captured stdout; the pool's worker processes
+# stay alive for the whole batch, so interpreter startup and importing plox
+# is paid once per worker instead of once per script. Run it with
+# `plox.py --batch`, which passes on the same options a single run takes.
+
+def collectScripts(paths: list[str]) -> list[str]:
+    scripts = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, name) for name in files if name.endswith(".lox"))
+            scripts.extend(sorted(found))
+        else:
+            scripts.append(path)
+    return scripts
+
+def warmUp():
+    # runs once in each worker as it starts, so the first script it gets
+    # doesn't also pay for importing the interpreter
+    import plox
+
+def runScript(path: str, options: dict) -> tuple[str, int, str]:
+    from plox import lox
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            inst = lox(**options)
+            inst.runFile(path)
+            status = inst.exitStatus()
+        except Exception:
+            # same as an uncaught exception ending a single plox.py run
+            traceback.print_exc(file=out)
+            status = 1
+
+    return path, status, out.getvalue()
+
+def runBatch(paths: list[str], options: dict, workers: int|None = None):
+    # yields (path, exit status, output) in the order scripts finish
+    scripts = collectScripts(paths)
+    with ProcessPoolExecutor(max_workers=workers, initializer=warmUp) as pool:
+        futures = [pool.submit(runScript, script, options) for script in scripts]
+        for future in as_completed(futures):
+            yield future.result()
+
+def main(paths: list[str], options: dict, workers: int|None = None) -> int:
+    worst = 0
+    counts: dict[int, int] = {}
+
+    for path, status, output in runBatch(paths, options, workers):
+        print(f"==> {path} [exit {status}]")
+        if output:
+            print(output, end="" if output.endswith("\n") else "\n")
+        sys.stdout.flush()
+
+        counts[status] = counts.get(status, 0) + 1
+        worst = max(worst, status)
+
+    summary = ", ".join(f"{count} exited {status}" for status, count in sorted(counts.items()))
+    print(f"{sum(counts.values())} scripts: {summary or 'nothing to run'}", file=sys.stderr)
+    return worst
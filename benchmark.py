@@ -0,0 +1,831 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from plox import Interpreter, LoxFunction, Parser, ParserError, Scanner, lox
+import AST
+import STMT
+import rope
+from AST import Call, Expr, Get, Set
+from STMT import Block, Expression, Return, Stmt, While
+from environment import ArrayEnvironment, Environment
+from loxClass import LoxInstance
+from optimizer import Optimizer
+from outputSink import BufferedSink, CaptureSink
+from ploxRuntime import LoxRuntimeError
+from regexScanner import RegexScanner
+from resolver import Resolver
+from tokenStore import CompactScanner
+
+# Runs every workload in benchmarks/ (plus a generated one) through the
+# chosen scanner and backend, timing each phase on its own:
+#   scan     source -> tokens
+#   parse    tokens -> statements
+#   resolve  optimizer (if on) + resolver
+#   execute  the backend running the program, with its output thrown away
+# Peak memory is measured in one extra run under tracemalloc, since tracing
+# slows everything else down too much to time at the same time.
+#
+# --parse-throughput instead times just the parse phase of every parser on
+# the generated workload at a few sizes, from the same tokens, and reports
+# MB and tokens of source parsed per second.
+#
+# --compare NAME times one optimization against what it replaced; see
+# comparisons at the bottom.
+
+class WorkloadError(Exception):
+    pass
+
+benchmarkDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+def generateLargeSource(targetBytes: int = 1024 * 1024) -> str:
+    parts = []
+    size = 0
+    n = 0
+    while size < targetBytes:
+        part = (
+            f"var g{n} = {n} * 3 + 1;\n"
+            f"{{\n"
+            f"    var a = g{n} - 1;\n"
+            f"    var b = (a + {n % 7}) * (a - {n % 5});\n"
+            f"    if (b > a and a >= 0) g{n} = b / (a + 1); else g{n} = \"s{n}\" + \"!\";\n"
+            f"}}\n"
+        )
+        parts.append(part)
+        size += len(part)
+        n += 1
+    return "".join(parts)
+
+def loadWorkloads(names: list[str]|None = None, largeBytes: int = 1024 * 1024) -> dict[str, str]:
+    workloads = {}
+    for path in sorted(glob.glob(os.path.join(benchmarkDir, "*.lox"))):
+        with open(path, "r") as f:
+            workloads[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    workloads["large_generated"] = generateLargeSource(largeBytes)
+
+    if names:
+        missing = [name for name in names if name not in workloads]
+        if missing:
+            raise SystemExit(f"unknown workload(s): {', '.join(missing)}")
+        workloads = {name: workloads[name] for name in names}
+    return workloads
+
+def runPhases(source: str, options: dict) -> dict[str, float]:
+    inst = lox(**options)
+    times = {}
+
+    start = time.perf_counter()
+    tokens = inst.scannerType(inst, source).scanTokens()
+    times["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        statements = inst.parserType(inst, tokens).parse()
+    except ParserError:
+        raise WorkloadError("failed to parse")
+    times["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if inst.optimize:
+        statements = Optimizer().optimize(statements)
+    inst.resolverType(inst).resolve(statements)
+    times["resolve"] = time.perf_counter() - start
+
+    if inst.hasError:
+        raise WorkloadError("has errors")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        inst.interpreter.interperate(statements)
+        inst.output.flush()
+        times["execute"] = time.perf_counter() - start
+
+    if inst.hasError:
+        # e.g. functions on a backend without them
+        raise WorkloadError("not supported by this backend")
+    if inst.hasRunTimeError:
+        raise WorkloadError("hit a runtime error")
+
+    times["total"] = sum(times.values())
+    times["tokens"] = len(tokens)
+    return times
+
+def peakMemory(source: str, options: dict) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        runPhases(source, options)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark(workloads: dict[str, str], options: dict, repeat: int = 3) -> dict:
+    results = {}
+    for name, source in workloads.items():
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                runs = [runPhases(source, options) for _ in range(repeat)]
+        except WorkloadError as e:
+            print(f"{name:>18}: skipped, {e}", file=sys.stderr)
+            continue
+
+        best = {phase: min(run[phase] for run in runs) for phase in ("scan", "parse", "resolve", "execute", "total")}
+        best["tokens"] = runs[0]["tokens"]
+        best["bytes"] = len(source.encode())
+        best["peakMemory"] = peakMemory(source, options)
+        results[name] = best
+
+        print(f"{name:>18}: scan {best['scan']*1000:8.1f} ms  parse {best['parse']*1000:8.1f} ms  "
+              f"resolve {best['resolve']*1000:7.1f} ms  execute {best['execute']*1000:9.1f} ms  "
+              f"peak {best['peakMemory'] / 1e6:7.1f} MB", file=sys.stderr)
+
+    return {
+        "meta": {
+            "options": options,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def parseThroughput(sizes: list[int], repeat: int = 3) -> dict:
+    results = {}
+    for size in sizes:
+        source = generateLargeSource(size)
+        inst = lox()
+        tokens = inst.scannerType(inst, source).scanTokens()
+        megabytes = len(source.encode()) / 1e6
+
+        row = {"bytes": len(source.encode()), "tokens": len(tokens)}
+        for name, parserType in lox.parsers.items():
+            best = float("inf")
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter()
+                parserType(inst, tokens).parse()
+                best = min(best, time.perf_counter() - start)
+            row[name] = {"seconds": best, "MBps": megabytes / best, "tokensPerSecond": len(tokens) / best}
+        results[str(size)] = row
+
+        print(f"{megabytes:7.2f} MB: " + "  ".join(
+            f"{name} {row[name]['MBps']:6.2f} MB/s {row[name]['tokensPerSecond'] / 1e3:7.0f}k tokens/s" for name in lox.parsers),
+            file=sys.stderr)
+
+    return {
+        "meta": {
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+# --compare NAME runs one of the comparisons below instead: the same
+# programs two ways, an optimization against what it replaced, printing a
+# line per workload. Each takes --repeat (the fastest run is kept) and
+# scales its generated source from --large-size.
+
+# best of `repeat` runs of source, each on a fresh lox(**options) with its
+# interpreter swapped for makeInterpreter(inst) if given; returns the time
+# and the instance of the last run
+def timeExecute(source: str, repeat: int, makeInterpreter=None, **options) -> tuple[float, lox]:
+    best = float("inf")
+    for _ in range(repeat):
+        inst = lox(output=CaptureSink(), **options)
+        if makeInterpreter is not None:
+            inst.interpreter = makeInterpreter(inst)
+        statements = inst.compile(source)
+        start = time.perf_counter()
+        inst.interpreter.interperate(statements)
+        best = min(best, time.perf_counter() - start)
+    return best, inst
+
+# scopes: dict Environments against slot resolved ArrayEnvironments
+
+def compareScopes(repeat: int, largeBytes: int):
+    source = """
+    var total = 0;
+    for (var i = 0; i < 200; i = i + 1) {
+        var a = i;
+        for (var j = 0; j < 100; j = j + 1) {
+            var b = a + j;
+            var c = b * 2;
+            total = total + c - b;
+        }
+    }
+    print total;
+    """
+
+    for label, scopeType in (("dict", Environment), ("array", ArrayEnvironment)):
+        best, _ = timeExecute(source, repeat, lambda inst: Interpreter(inst, scopeType))
+        print(f"{label:>6} scopes: {best*1000:8.1f} ms")
+
+    names = ("a", "b", "c")
+    for label, scopeType in (("dict", Environment), ("array", ArrayEnvironment)):
+        outer = scopeType(None, names)
+        outer.defineAt(0, "a", 1.0)
+        start = time.perf_counter()
+        for _ in range(200000):
+            inner = scopeType(outer, names)
+            inner.defineAt(1, "b", outer.getAt(0, 0, "a"))
+            inner.assignAt(1, 0, "a", inner.getAt(0, 1, "b"))
+        print(f"{label:>6} scope enter + define/get/assign x200k: {(time.perf_counter() - start)*1000:8.1f} ms")
+
+# scanners: the character at a time Scanner against the one regex RegexScanner
+
+def generateScannerSource(targetBytes: int) -> str:
+    # comments, strings and keywords as well as the numbers and names
+    # generateLargeSource is mostly made of
+    chunk = """// generated benchmark source
+var total_{n} = 0;
+for (var i = 0; i < 100; i = i + 1) {
+    var label = "iteration number {n}";
+    if (i >= 50 and total_{n} != nil) {
+        total_{n} = total_{n} + i * 2.5 - (i / 3);
+    } else {
+        print label + "!";
+    }
+}
+"""
+    parts = []
+    size = 0
+    n = 0
+    while size < targetBytes:
+        part = chunk.replace("{n}", str(n))
+        parts.append(part)
+        size += len(part)
+        n += 1
+    return "".join(parts)
+
+def compareScanners(repeat: int, largeBytes: int):
+    source = generateScannerSource(largeBytes * 4)
+    megabytes = len(source.encode()) / (1024 * 1024)
+    print(f"scanning {megabytes:.1f} MB of generated lox")
+
+    results = {}
+    for label, scannerType in (("Scanner", Scanner), ("RegexScanner", RegexScanner)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tokens = scannerType(lox(), source).scanTokens()
+            best = min(best, time.perf_counter() - start)
+        results[label] = tokens
+        print(f"{label:>13}: {best:6.2f} s  {megabytes / best:6.2f} MB/s  {len(tokens)} tokens")
+
+    same = all(
+        (a.type, a.lexeme, a.literal, a.line) == (b.type, b.lexeme, b.literal, b.line)
+        for a, b in zip(results["Scanner"], results["RegexScanner"])
+    ) and len(results["Scanner"]) == len(results["RegexScanner"])
+    print(f"token streams match: {same}")
+
+# tokenStore: a list of Tokens against the columnar TokenStore, memory held
+# after scanning and the time to parse each
+
+def compareTokenStore(repeat: int, largeBytes: int):
+    source = generateScannerSource(largeBytes * 2)
+    megabytes = len(source.encode()) / (1024 * 1024)
+    print(f"{megabytes:.1f} MB of generated lox, source string is {sys.getsizeof(source) / 1e6:.1f} MB in memory")
+
+    for label, scannerType in (("list[Token]", RegexScanner), ("TokenStore", CompactScanner)):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        tokens = scannerType(lox(), source).scanTokens()
+        elapsed = time.perf_counter() - start
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>12}: {len(tokens)} tokens, {size / 1e6:7.1f} MB held, {peak / 1e6:7.1f} MB peak, scanned in {elapsed:.2f} s")
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            Parser(lox(), tokens).parse()
+            best = min(best, time.perf_counter() - start)
+        print(f"{'':>12}  parsed in {best:.2f} s")
+        del tokens
+
+# output: print() per line against the BufferedSink flush policies, writing
+# to a pipe that another process reads, the case that hurts the most
+
+class PrintSink:
+
+    # the old behaviour, one print() per line
+
+    def writeLine(self, text: str) -> None:
+        print(text)
+
+    def flush(self) -> None:
+        pass
+
+drainSource = "import os, shutil, sys\nshutil.copyfileobj(sys.stdin.buffer, open(os.devnull, 'wb'))"
+
+def compareOutput(repeat: int, largeBytes: int, lines: int = 200000):
+    source = f"""
+    for (var i = 0; i < {lines}; i = i + 1) {{
+        print i;
+        print "line";
+    }}
+    """
+
+    sinks = {
+        "print()": lambda: PrintSink(),
+        "line": lambda: BufferedSink(flush="line"),
+        "buffer": lambda: BufferedSink(flush="buffer"),
+        "capture": lambda: CaptureSink(),
+    }
+
+    # a separate Python that throws away whatever reaches its stdin, so
+    # stdout here is a pipe on every platform
+    reader = subprocess.Popen([sys.executable, "-c", drainSource], stdin=subprocess.PIPE, text=True)
+
+    realStdout = sys.stdout
+    sys.stdout = reader.stdin
+    try:
+        for backend in ("tree", "vm", "python"):
+            for name, makeSink in sinks.items():
+                best = float("inf")
+                for _ in range(repeat):
+                    inst = lox(backend=backend, output=makeSink())
+                    program = inst.compile(source)
+                    start = time.perf_counter()
+                    inst.interpreter.interperate(program)
+                    inst.output.flush()
+                    best = min(best, time.perf_counter() - start)
+                print(f"{backend:>7} {name:>8}: {best * 1000:8.1f} ms, {lines * 2 / best / 1e6:5.2f} M lines/s", file=realStdout)
+    finally:
+        sys.stdout = realStdout
+        reader.stdin.close()
+        reader.wait()
+
+# quicken: the generic tree walker against the quickening one
+
+def compareQuicken(repeat: int, largeBytes: int):
+    for name, source in loadWorkloads(largeBytes=largeBytes // 4).items():
+        generic, _ = timeExecute(source, repeat)
+        quickened, inst = timeExecute(source, repeat, quicken=True)
+
+        stats = inst.interpreter.stats()
+        print(f"{name:>18}: generic {generic * 1000:8.1f} ms  quickened {quickened * 1000:8.1f} ms  "
+              f"({generic / quickened:4.2f}x)  specialised {stats['specialised']:5}  "
+              f"generic {stats['generic']:5}  deopts {stats['deopts']}")
+
+# ropes: + copying strings every time against building Ropes
+
+def compareRopes(repeat: int, largeBytes: int):
+    threshold = rope.ropeThreshold
+
+    for size in (largeBytes // 16, largeBytes // 4, largeBytes):
+        source = f"""
+        var s = "";
+        for (var i = 0; i < {size // 16}; i = i + 1) {{
+            s = s + "0123456789abcdef";
+        }}
+        print s == "";
+        """
+
+        times = {}
+        for label, cutoff in (("plain", float("inf")), ("rope", threshold)):
+            rope.ropeThreshold = cutoff
+            try:
+                times[label], _ = timeExecute(source, repeat)
+            finally:
+                rope.ropeThreshold = threshold
+
+        print(f"{size // 1024:>6} KB: plain {times['plain'] * 1000:9.1f} ms  rope {times['rope'] * 1000:9.1f} ms  "
+              f"({times['plain'] / times['rope']:5.1f}x)")
+
+# properties: Get/Set inline caches and method caches against looking every
+# property up from scratch
+
+class UncachedInterpreter(Interpreter):
+
+    # the shape's field table, then the class chain, on every access, and
+    # methods are always bound before they're called
+
+    def visitCallExpr(self, expr: Call):
+        callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
+        return self.callOp(expr, callee, arguments)
+
+    def visitGetExpr(self, expr: Get):
+        instance = self.evaluate(expr.object)
+        if not isinstance(instance, LoxInstance):
+            raise LoxRuntimeError(expr.name, "only instances have properties")
+
+        name = expr.name.lexeme
+        slot = instance.shape.fields.get(name)
+        if slot is not None:
+            return instance.values[slot]
+        klass = instance.klass
+        while klass is not None:
+            method = klass.methods.get(name)
+            if method is not None:
+                return method.bind(instance)
+            klass = klass.superclass
+        raise LoxRuntimeError(expr.name, f"undefined property {name}")
+
+    def visitSetExpr(self, expr: Set):
+        instance = self.evaluate(expr.object)
+        if not isinstance(instance, LoxInstance):
+            raise LoxRuntimeError(expr.name, "only instances have fields")
+
+        value = self.evaluate(expr.value)
+        slot = instance.shape.fields.get(expr.name.lexeme)
+        if slot is None:
+            instance.shape = instance.shape.withField(expr.name.lexeme)
+            instance.values.append(value)
+        else:
+            instance.values[slot] = value
+        return value
+
+# runs every source with the interpreter made by makeInterpreter against the
+# usual Interpreter, checking both print the same
+def compareInterpreters(workloads: dict[str, str], repeat: int, label: str, makeInterpreter):
+    for name, source in workloads.items():
+        before, beforeInst = timeExecute(source, repeat, makeInterpreter)
+        after, afterInst = timeExecute(source, repeat)
+
+        assert beforeInst.output.getvalue() == afterInst.output.getvalue()
+        print(f"{name:>14}: {label} {before * 1000:8.1f} ms  now {after * 1000:8.1f} ms  ({before / after:4.2f}x)")
+
+def compareProperties(repeat: int, largeBytes: int):
+    compareInterpreters(loadWorkloads(["properties"]), repeat, "uncached", UncachedInterpreter)
+
+# async: how late a 1 ms timer fires while Lox scripts share the event loop,
+# blocking against a few step budgets
+
+def compareAsync(repeat: int, largeBytes: int, scripts: int = 20, iterations: int = 20000):
+    source = f"""
+    var total = 0;
+    for (var i = 0; i < {iterations}; i = i + 1) {{
+        total = total + i * 2;
+    }}
+    """
+
+    async def ticker(lateness: list[float], stop: asyncio.Event, period: float = 0.001):
+        # how far behind schedule the timer fires tells us how long the loop
+        # was kept busy by something else
+        while not stop.is_set():
+            expected = time.perf_counter() + period
+            await asyncio.sleep(period)
+            lateness.append(max(0.0, time.perf_counter() - expected))
+
+    async def run(budget: int|None):
+        lateness: list[float] = []
+        stop = asyncio.Event()
+        tick = asyncio.create_task(ticker(lateness, stop))
+        await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if budget is None:
+                # what happens without yielding: each script blocks the loop
+                async def blocking():
+                    lox().run(source)
+                await asyncio.gather(*(blocking() for _ in range(scripts)))
+            else:
+                await asyncio.gather(*(lox(stepBudget=budget).runAsync(source) for _ in range(scripts)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await tick
+
+        lateness.sort()
+        worst = lateness[-1] * 1000 if lateness else 0.0
+        p99 = lateness[int(len(lateness) * 0.99)] * 1000 if lateness else 0.0
+        label = "blocking" if budget is None else f"budget {budget}"
+        print(f"{label:>13}: {scripts} scripts in {elapsed:6.2f} s, timer ticks {len(lateness):5}, "
+              f"p99 late {p99:8.2f} ms, worst late {worst:8.2f} ms")
+
+    for budget in (None, 10000, 1000, 100):
+        asyncio.run(run(budget))
+
+# explicitStack: the recursive parser and interpreter against the explicit
+# stack ones, on deep nesting and then on ordinary programs
+
+def nestedSource(depth: int) -> dict[str, str]:
+    # one of each kind of deep nesting
+    return {
+        "grouping": f"print {'(' * depth}1{')' * depth};",
+        "binary": f"print {'1 + ' * depth}1;",
+        "right": f"var x; print {'x = ' * depth}1;",
+        "unary": f"print {'-' * depth}1;",
+        "blocks": f"{'{' * depth}print 1;{'}' * depth}",
+        "ifs": f"{'if (true) ' * depth}print 1;",
+    }
+
+def compareExplicitStack(repeat: int, largeBytes: int, depths: tuple[int, ...] = (20, 50, 1000, 100000)):
+    for depth in depths:
+        for name, source in nestedSource(depth).items():
+            times = {}
+            outputs = {}
+            for explicitStack in (False, True):
+                best = float("inf")
+                try:
+                    for _ in range(repeat):
+                        inst = lox(output=CaptureSink(), explicitStack=explicitStack)
+                        start = time.perf_counter()
+                        statements = inst.compile(source)
+                        inst.interpreter.interperate(statements)
+                        best = min(best, time.perf_counter() - start)
+                except RecursionError:
+                    best = None
+                times[explicitStack] = best
+                outputs[explicitStack] = inst.output.getvalue()
+
+            if times[False] is None:
+                recursive = "RecursionError"
+            else:
+                assert outputs[False] == outputs[True]
+                recursive = f"{times[False] * 1000:9.1f} ms"
+            print(f"{name:>9} x {depth:<6}: recursive {recursive:>14}  explicit stack {times[True] * 1000:9.1f} ms")
+
+    # the only difference here is the overhead
+    for name, source in loadWorkloads(largeBytes=largeBytes // 4).items():
+        recursive, _ = timeExecute(source, repeat, optimize=False)
+        explicit, _ = timeExecute(source, repeat, optimize=False, explicitStack=True)
+        print(f"{name:>18}: recursive {recursive * 1000:8.1f} ms  explicit stack {explicit * 1000:8.1f} ms  "
+              f"({recursive / explicit:4.2f}x)")
+
+# loops: `for` kept as a While with an increment, and blocks that declare
+# nothing running without a scope, against `for` desugared to a While whose
+# body is a block holding the body and the increment, and a scope for every
+# block. Counts the scopes made per iteration as well as timing.
+
+class CountingEnvironment(ArrayEnvironment):
+
+    created = 0
+
+    def __init__(self, enclosing, names=()):
+        CountingEnvironment.created += 1
+        super().__init__(enclosing, names)
+
+class DesugaringOptimizer(Optimizer):
+
+    # puts every increment back into a block with its loop's body
+    def visitWhileStmt(self, stmt: While):
+        stmt = super().visitWhileStmt(stmt)
+        if stmt is not None and stmt.increment is not None:
+            stmt.body = Block([stmt.body, Expression(stmt.increment)])
+            stmt.increment = None
+        return stmt
+
+class ScopedResolver(Resolver):
+
+    # a scope for every block, whether it declares anything or not
+    def visitBlockStmt(self, stmt: Block):
+        self.beginScope()
+        self.resolve(stmt.statements)
+        stmt.slotNames = self.endScope()
+
+loopWorkloads = {
+    # a counting loop whose body declares nothing
+    "simple": ("""
+    var total = 0;
+    for (var i = 0; i < 100000; i = i + 1) {
+        total = total + i;
+    }
+    print total;
+    """, 100000),
+    # a nested loop with an if in the body, still nothing declared
+    "nested": ("""
+    var hits = 0;
+    for (var i = 0; i < 300; i = i + 1) {
+        for (var j = 0; j < 300; j = j + 1) {
+            if (i == j) {
+                hits = hits + 1;
+            }
+        }
+    }
+    print hits;
+    """, 300 * 300),
+    # the body needs a scope of its own for `var square`
+    "locals": ("""
+    var total = 0;
+    for (var i = 0; i < 100000; i = i + 1) {
+        var square = i * i;
+        total = total + square;
+    }
+    print total;
+    """, 100000),
+}
+
+def compareLoops(repeat: int, largeBytes: int):
+    for name, (source, iterations) in loopWorkloads.items():
+        times = {}
+        scopes = {}
+        outputs = {}
+        for label, optimizerType, resolverType in (("desugared", DesugaringOptimizer, ScopedResolver), ("loop", Optimizer, Resolver)):
+            best = float("inf")
+            for _ in range(repeat):
+                inst = lox(output=CaptureSink())
+                inst.interpreter = Interpreter(inst, CountingEnvironment)
+                tokens = inst.scannerType(inst, source).scanTokens()
+                statements = optimizerType().optimize(Parser(inst, tokens).parse())
+                resolverType(inst).resolve(statements)
+                CountingEnvironment.created = 0
+                start = time.perf_counter()
+                inst.interpreter.interperate(statements)
+                best = min(best, time.perf_counter() - start)
+            times[label] = best
+            scopes[label] = CountingEnvironment.created / iterations
+            outputs[label] = inst.output.getvalue()
+
+        assert outputs["desugared"] == outputs["loop"]
+        print(f"{name:>8}: desugared {times['desugared'] * 1000:8.1f} ms {scopes['desugared']:5.2f} scopes/iteration  "
+              f"loop {times['loop'] * 1000:8.1f} ms {scopes['loop']:5.2f} scopes/iteration  "
+              f"({times['desugared'] / times['loop']:4.2f}x)")
+
+# returns: completion values for `return` against an exception raised by
+# the return statement and caught by the call
+
+class ReturnSignal(Exception):
+    def __init__(self, value: object):
+        self.value = value
+
+class ExceptionReturnInterpreter(Interpreter):
+
+    # blocks and loops still look at what their statements return, it's
+    # just always None here
+
+    def visitReturnStmt(self, stmt: Return):
+        value = None
+        if stmt.value is not None:
+            value = self.evaluate(stmt.value)
+        raise ReturnSignal(value)
+
+    def visitCallExpr(self, expr: Call):
+        callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
+
+        if type(callee) is not LoxFunction or len(arguments) != callee.arity:
+            return self.callOp(expr, callee, arguments)
+
+        declaration = callee.declaration
+        frame = self.scopeType(callee.closure, declaration.slotNames)
+        frame.bind(arguments)
+        try:
+            self.executeBlock(declaration.body, frame)
+        except ReturnSignal as returned:
+            return returned.value
+        return None
+
+returnWorkloads = {
+    # every call returns from inside an if, two blocks deep
+    "fib": """
+    fun fib(n) {
+        if (n < 2) return n;
+        return fib(n - 1) + fib(n - 2);
+    }
+    print fib(22);
+    """,
+    # returns from inside a loop inside nested blocks
+    "search": """
+    fun firstOver(limit, step) {
+        var i = 0;
+        while (true) {
+            {
+                {
+                    if (i > limit) return i;
+                }
+            }
+            i = i + step;
+        }
+    }
+    var total = 0;
+    for (var k = 0; k < 3000; k = k + 1) {
+        total = total + firstOver(10, 3);
+    }
+    print total;
+    """,
+}
+
+def compareReturns(repeat: int, largeBytes: int):
+    compareInterpreters(returnWorkloads, repeat, "exception", ExceptionReturnInterpreter)
+
+# nodes: the generated __slots__ node classes against plain ones with an
+# instance __dict__, in memory for a large resolved tree, and the
+# kind-indexed dispatch tables against going through accept()
+
+nodeTypes = [cls for module in (AST, STMT) for cls in vars(module).values()
+             if isinstance(cls, type) and issubclass(cls, (Expr, Stmt)) and cls not in (Expr, Stmt)]
+
+# the same classes as before __slots__: same constructor and accept(), but
+# every instance keeps its attributes in a __dict__
+plainTypes = {cls: type(cls.__name__, (), {"__init__": cls.__init__, "accept": cls.accept, "kind": cls.kind})
+              for cls in nodeTypes}
+
+def copyTree(node: object, types: dict[type, type]) -> object:
+    # a copy of a resolved tree built from `types`, annotations included
+    if isinstance(node, list):
+        return [copyTree(child, types) for child in node]
+    nodeType = types.get(type(node))
+    if nodeType is None:
+        # tokens and literal values stay shared
+        return node
+    copy = object.__new__(nodeType)
+    for name in type(node).__slots__:
+        if hasattr(node, name):
+            setattr(copy, name, copyTree(getattr(node, name), types))
+    return copy
+
+def countNodes(node: object) -> int:
+    if isinstance(node, list):
+        return sum(countNodes(child) for child in node)
+    if type(node) not in plainTypes:
+        return 0
+    return 1 + sum(countNodes(getattr(node, name)) for name in type(node).__slots__ if hasattr(node, name))
+
+def treeMemory(statements: list[Stmt], types: dict[type, type]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        copy = copyTree(statements, types)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del copy
+    return size
+
+class AcceptInterpreter(Interpreter):
+
+    # dispatches the way Interpreter did before the tables
+    def evaluate(self, expr: Expr) -> object:
+        return expr.accept(self)
+
+    def execute(self, stmt: Stmt) -> object:
+        return stmt.accept(self)
+
+def compareNodes(repeat: int, largeBytes: int):
+    slottedTypes = {cls: cls for cls in nodeTypes}
+    for size in (largeBytes, largeBytes * 4):
+        inst = lox(output=CaptureSink())
+        statements = inst.compile(generateLargeSource(size))
+        nodes = countNodes(statements)
+        plain = treeMemory(statements, plainTypes)
+        slotted = treeMemory(statements, slottedTypes)
+        print(f"{size / 1e6:5.2f} MB source, {nodes} nodes: dict {plain / 1e6:7.1f} MB ({plain / nodes:5.1f} B/node)  "
+              f"slots {slotted / 1e6:7.1f} MB ({slotted / nodes:5.1f} B/node)  ({plain / slotted:4.2f}x smaller)")
+
+    compareInterpreters(loadWorkloads(["numeric_loop", "properties", "string_concat"]), repeat, "accept", AcceptInterpreter)
+
+comparisons = {
+    "scopes": compareScopes,
+    "scanners": compareScanners,
+    "tokenStore": compareTokenStore,
+    "output": compareOutput,
+    "quicken": compareQuicken,
+    "ropes": compareRopes,
+    "properties": compareProperties,
+    "async": compareAsync,
+    "explicitStack": compareExplicitStack,
+    "loops": compareLoops,
+    "returns": compareReturns,
+    "nodes": compareNodes,
+}
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description="time plox workloads phase by phase")
+    argParser.add_argument("workloads", nargs="*", help="workload names (default: all)")
+    argParser.add_argument("--backend", choices=lox.backends, default="tree")
+    argParser.add_argument("--scanner", choices=lox.scanners, default="classic")
+    argParser.add_argument("--parser", choices=lox.parsers, default="recursive")
+    argParser.add_argument("--no-optimize", dest="optimize", action="store_false")
+    argParser.add_argument("--repeat", type=int, default=3, help="runs per workload, the fastest is kept (default: 3)")
+    argParser.add_argument("--large-size", type=float, default=1.0, help="size of the generated workload in MB (default: 1)")
+    argParser.add_argument("--parse-throughput", action="store_true", help="only time each parser on the generated workload at 0.25, 1 and 4 times --large-size")
+    argParser.add_argument("--compare", choices=comparisons, help="run one before/after comparison instead and print its table")
+    argParser.add_argument("-o", "--output", help="write JSON results here instead of stdout")
+    args = argParser.parse_args()
+
+    largeBytes = int(args.large_size * 1024 * 1024)
+    if args.compare:
+        comparisons[args.compare](args.repeat, largeBytes)
+        raise SystemExit(0)
+
+    if args.parse_throughput:
+        report = parseThroughput([int(largeBytes * scale) for scale in (0.25, 1, 4)], args.repeat)
+    else:
+        options = {"backend": args.backend, "scanner": args.scanner, "parser": args.parser, "optimize": args.optimize}
+        report = benchmark(loadWorkloads(args.workloads, largeBytes), options, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,363 @@
+from __future__ import annotations
+from array import array
+from enum import IntEnum
+import sys
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+
+class OpCode(IntEnum):
+
+    CONSTANT = 0
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+
+    POP = 4
+    POPN = 5
+
+    GET_LOCAL = 6
+    SET_LOCAL = 7
+    GET_GLOBAL = 8
+    SET_GLOBAL = 9
+    DEFINE_GLOBAL = 10
+
+    EQUAL = 11
+    NOT_EQUAL = 12
+    GREATER = 13
+    GREATER_EQUAL = 14
+    LESS = 15
+    LESS_EQUAL = 16
+
+    ADD = 17
+    SUBTRACT = 18
+    MULTIPLY = 19
+    DIVIDE = 20
+    NOT = 21
+    NEGATE = 22
+
+    PRINT = 23
+
+    JUMP = 24
+    JUMP_IF_FALSE = 25
+    JUMP_IF_TRUE = 26
+    LOOP = 27
+
+    RETURN = 28
+
+# how many operand units follow each opcode
+operandCount = {op: 0 for op in OpCode}
+for op in (OpCode.CONSTANT, OpCode.POPN, OpCode.GET_LOCAL, OpCode.SET_LOCAL,
+           OpCode.GET_GLOBAL, OpCode.SET_GLOBAL, OpCode.DEFINE_GLOBAL,
+           OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.JUMP_IF_TRUE, OpCode.LOOP):
+    operandCount[op] = 1
+
+class CompileError(RuntimeError):
+    pass
+
+class Chunk:
+
+    # Code is a flat array of unsigned 16 bit units: an opcode followed by its
+    # operand (if it has one). lines runs parallel to code so the VM can
+    # report runtime errors against the right source line.
+
+    def __init__(self):
+        self.code: array = array('H')
+        self.lines: array = array('I')
+        self.constants: list[object] = []
+        self.__constantIndex: dict[tuple[type, object], int] = {}
+
+    def write(self, unit: int, line: int) -> None:
+        self.code.append(unit)
+        self.lines.append(line)
+
+    def addConstant(self, value: object) -> int:
+        # keyed on type too so 1.0 and True don't end up sharing a slot
+        key = (type(value), value)
+        if key not in self.__constantIndex:
+            self.__constantIndex[key] = len(self.constants)
+            self.constants.append(value)
+        return self.__constantIndex[key]
+
+class Compiler(Expr.Visitor, Stmt.Visitor):
+
+    # Compiles resolved Stmt/Expr trees into a Chunk. Locals live on the VM
+    # stack (clox style): the compiler tracks which names occupy which stack
+    # slots and a block pops its locals off again when it ends.
+
+    def __init__(self, lox_inst):
+        self.lox_inst = lox_inst
+        self.chunk: Chunk = Chunk()
+        self.locals: list[tuple[str, int]] = []
+        self.scopeDepth: int = 0
+        self.line: int = 1
+
+    def compile(self, statements: list[Stmt]) -> Chunk:
+        for statement in statements:
+            self.compileStmt(statement)
+        self.emit(OpCode.RETURN)
+        return self.chunk
+
+    def compileStmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def compileExpr(self, expr: Expr) -> None:
+        expr.accept(self)
+
+    def error(self, msg: str):
+        self.lox_inst.report(self.line, "", msg)
+        raise CompileError(msg)
+
+    def emit(self, op: OpCode, operand: int|None = None) -> None:
+        self.chunk.write(op, self.line)
+        if operand is not None:
+            if operand > 0xffff:
+                self.error("too many constants or locals in one chunk")
+            self.chunk.write(operand, self.line)
+
+    def emitJump(self, op: OpCode) -> int:
+        self.emit(op, 0)
+        return len(self.chunk.code) - 1
+
+    def patchJump(self, operandAt: int) -> None:
+        distance = len(self.chunk.code) - (operandAt + 1)
+        if distance > 0xffff:
+            self.error("too much code to jump over")
+        self.chunk.code[operandAt] = distance
+
+    def emitLoop(self, loopStart: int) -> None:
+        distance = len(self.chunk.code) + 2 - loopStart
+        if distance > 0xffff:
+            self.error("loop body too large")
+        self.emit(OpCode.LOOP, distance)
+
+    def identifierConstant(self, name: Token) -> int:
+        return self.chunk.addConstant(name.lexeme)
+
+    def resolveLocal(self, name: Token) -> int|None:
+        for slot in range(len(self.locals) - 1, -1, -1):
+            if self.locals[slot][0] == name.lexeme:
+                return slot
+        return None
+
+    # functions and classes only run on the tree walker so far
+    def visitFunctionStmt(self, stmt: Function):
+        self.line = stmt.name.line
+        self.error("functions aren't supported by the vm backend")
+
+    def visitReturnStmt(self, stmt: Return):
+        self.line = stmt.keyword.line
+        self.error("functions aren't supported by the vm backend")
+
+    def visitCallExpr(self, expr: Call):
+        self.line = expr.paren.line
+        self.error("calls aren't supported by the vm backend")
+
+    def visitClassStmt(self, stmt: Class):
+        self.line = stmt.name.line
+        self.error("classes aren't supported by the vm backend")
+
+    def visitGetExpr(self, expr: Get):
+        self.line = expr.name.line
+        self.error("classes aren't supported by the vm backend")
+
+    def visitSetExpr(self, expr: Set):
+        self.line = expr.name.line
+        self.error("classes aren't supported by the vm backend")
+
+    def visitThisExpr(self, expr: This):
+        self.line = expr.keyword.line
+        self.error("classes aren't supported by the vm backend")
+
+    def visitSuperExpr(self, expr: Super):
+        self.line = expr.keyword.line
+        self.error("classes aren't supported by the vm backend")
+
+    def visitBlockStmt(self, stmt: Block):
+        self.scopeDepth += 1
+        for statement in stmt.statements:
+            self.compileStmt(statement)
+        self.scopeDepth -= 1
+
+        count = 0
+        while self.locals and self.locals[-1][1] > self.scopeDepth:
+            self.locals.pop()
+            count += 1
+
+        if count == 1:
+            self.emit(OpCode.POP)
+        elif count > 1:
+            self.emit(OpCode.POPN, count)
+
+    def visitVarStmt(self, stmt: Var):
+        self.line = stmt.name.line
+
+        if stmt.initializer is not None:
+            self.compileExpr(stmt.initializer)
+        else:
+            self.emit(OpCode.NIL)
+
+        if self.scopeDepth > 0:
+            # the initializer's value is already sitting in the new local's slot
+            self.locals.append((stmt.name.lexeme, self.scopeDepth))
+        else:
+            self.line = stmt.name.line
+            self.emit(OpCode.DEFINE_GLOBAL, self.identifierConstant(stmt.name))
+
+    def visitExpressionStmt(self, stmt: Expression):
+        self.compileExpr(stmt.expression)
+        self.emit(OpCode.POP)
+
+    def visitPrintStmt(self, stmt: Print):
+        self.compileExpr(stmt.expression)
+        self.emit(OpCode.PRINT)
+
+    def visitIfStmt(self, stmt: If):
+        self.compileExpr(stmt.condition)
+        thenJump = self.emitJump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        self.compileStmt(stmt.thenBranch)
+
+        elseJump = self.emitJump(OpCode.JUMP)
+        self.patchJump(thenJump)
+        self.emit(OpCode.POP)
+
+        if stmt.elseBranch is not None:
+            self.compileStmt(stmt.elseBranch)
+        self.patchJump(elseJump)
+
+    def visitWhileStmt(self, stmt: While):
+        loopStart = len(self.chunk.code)
+        self.compileExpr(stmt.condition)
+
+        exitJump = self.emitJump(OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        self.compileStmt(stmt.body)
+        if stmt.increment is not None:
+            self.compileExpr(stmt.increment)
+            self.emit(OpCode.POP)
+        self.emitLoop(loopStart)
+
+        self.patchJump(exitJump)
+        self.emit(OpCode.POP)
+
+    def visitLiteralExpr(self, expr: Literal):
+        if expr.value is None:
+            self.emit(OpCode.NIL)
+        elif expr.value is True:
+            self.emit(OpCode.TRUE)
+        elif expr.value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit(OpCode.CONSTANT, self.chunk.addConstant(expr.value))
+
+    def visitGroupingExpr(self, expr: Grouping):
+        self.compileExpr(expr.expression)
+
+    def visitVariableExpr(self, expr: Variable):
+        self.line = expr.name.line
+        slot = self.resolveLocal(expr.name)
+        if slot is not None:
+            self.emit(OpCode.GET_LOCAL, slot)
+        else:
+            self.emit(OpCode.GET_GLOBAL, self.identifierConstant(expr.name))
+
+    def visitAssignExpr(self, expr: Assign):
+        self.compileExpr(expr.value)
+        self.line = expr.name.line
+        slot = self.resolveLocal(expr.name)
+        if slot is not None:
+            self.emit(OpCode.SET_LOCAL, slot)
+        else:
+            self.emit(OpCode.SET_GLOBAL, self.identifierConstant(expr.name))
+
+    def visitLogicalExpr(self, expr: Logical):
+        self.compileExpr(expr.left)
+        self.line = expr.operator.line
+
+        if expr.operator.type == tokenType.OR:
+            endJump = self.emitJump(OpCode.JUMP_IF_TRUE)
+        else:
+            endJump = self.emitJump(OpCode.JUMP_IF_FALSE)
+
+        self.emit(OpCode.POP)
+        self.compileExpr(expr.right)
+        self.patchJump(endJump)
+
+    def visitUnaryExpr(self, expr: Unary):
+        self.compileExpr(expr.right)
+        self.line = expr.operator.line
+
+        match expr.operator.type:
+            case tokenType.minus:
+                self.emit(OpCode.NEGATE)
+            case tokenType.bang:
+                self.emit(OpCode.NOT)
+
+    binaryOps = {
+        tokenType.plus: OpCode.ADD,
+        tokenType.minus: OpCode.SUBTRACT,
+        tokenType.star: OpCode.MULTIPLY,
+        tokenType.slash: OpCode.DIVIDE,
+        tokenType.greater: OpCode.GREATER,
+        tokenType.greater_equal: OpCode.GREATER_EQUAL,
+        tokenType.lesser: OpCode.LESS,
+        tokenType.lesser_equal: OpCode.LESS_EQUAL,
+        tokenType.equal_equal: OpCode.EQUAL,
+        tokenType.bang_equal: OpCode.NOT_EQUAL,
+    }
+
+    def visitBinaryExpr(self, expr: Binary):
+        self.compileExpr(expr.left)
+        self.compileExpr(expr.right)
+        self.line = expr.operator.line
+        self.emit(self.binaryOps[expr.operator.type])
+
+def disassemble(chunk: Chunk, name: str = "chunk") -> str:
+    out = [f"== {name} =="]
+    offset = 0
+    lastLine = None
+
+    while offset < len(chunk.code):
+        op = OpCode(chunk.code[offset])
+        line = chunk.lines[offset]
+        lineCol = "   |" if line == lastLine else f"{line:4}"
+        lastLine = line
+
+        text = f"{offset:04} {lineCol} {op.name:<16}"
+        if operandCount[op]:
+            operand = chunk.code[offset + 1]
+            match op:
+                case OpCode.CONSTANT | OpCode.GET_GLOBAL | OpCode.SET_GLOBAL | OpCode.DEFINE_GLOBAL:
+                    text += f"{operand:4} '{chunk.constants[operand]}'"
+                case OpCode.JUMP | OpCode.JUMP_IF_FALSE | OpCode.JUMP_IF_TRUE:
+                    text += f"{operand:4} -> {offset + 2 + operand:04}"
+                case OpCode.LOOP:
+                    text += f"{operand:4} -> {offset + 2 - operand:04}"
+                case _:
+                    text += f"{operand:4}"
+
+        out.append(text.rstrip())
+        offset += 1 + operandCount[op]
+
+    return "\n".join(out)
+
+if __name__ == '__main__':
+    from plox import lox, Scanner, Parser
+    from resolver import Resolver
+
+    if len(sys.argv) < 2:
+        print("usage: bytecode.py <script.lox>")
+        exit(64)
+
+    inst = lox()
+    with open(sys.argv[1], "r") as f:
+        source = f.read()
+
+    statements = Parser(inst, Scanner(inst, source).scanTokens()).parse()
+    Resolver(inst).resolve(statements)
+    if inst.hasError:
+        exit(65)
+
+    print(disassemble(Compiler(inst).compile(statements), sys.argv[1]))
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from environment import ArrayEnvironment
+from ploxRuntime import LoxRuntimeError, isEqual, isTruthy, stringify
+from bytecode import CompileError
+
+# comparisons, equality and ! always give back a real bool, so conditions
+# built from them can be tested directly instead of going through isTruthy
+def producesBool(expr: Expr) -> bool:
+    if isinstance(expr, Grouping):
+        return producesBool(expr.expression)
+    if isinstance(expr, Unary):
+        return expr.operator.type == tokenType.bang
+    if isinstance(expr, Binary):
+        return expr.operator.type in (
+            tokenType.greater, tokenType.greater_equal,
+            tokenType.lesser, tokenType.lesser_equal,
+            tokenType.equal_equal, tokenType.bang_equal)
+    if isinstance(expr, Literal):
+        return isinstance(expr.value, bool)
+    return False
+
+class ClosureCompiler(Expr.Visitor, Stmt.Visitor):
+
+    # Alternative to Interpreter: walks the resolved tree once and turns every
+    # node into a plain Python closure taking the current scope. Operators are
+    # picked at compile time, so running the program is just closures calling
+    # closures with no accept()/visit dispatch and no tokenType matching.
+    #
+    # Locals live in ArrayEnvironments addressed by the resolver's slots and
+    # globals in a plain dict captured by the closures.
+
+    def __init__(self, lox_inst):
+        self.lox_inst = lox_inst
+        self.output = lox_inst.output
+        self.globals: dict[str, object] = {}
+
+    def compile(self, statements: list[Stmt]):
+        return tuple(self.compileStmt(statement) for statement in statements)
+
+    def compileStmt(self, stmt: Stmt):
+        return stmt.accept(self)
+
+    def compileExpr(self, expr: Expr):
+        return expr.accept(self)
+
+    def interperate(self, statements: list[Stmt]):
+        try:
+            program = self.compile(statements)
+        except CompileError:
+            return
+
+        try:
+            for statement in program:
+                statement(None)
+        except LoxRuntimeError as e:
+            self.lox_inst.runTimeError(e)
+
+    # for lox.prepare(): the closures capture this instance's globals dict,
+    # so they can't be shared between runs and are built in runPrepared();
+    # compiling here only reports anything this backend can't run
+    def prepare(self, statements: list[Stmt]) -> tuple[Stmt, ...]|None:
+        try:
+            self.compile(statements)
+        except CompileError:
+            return None
+        return tuple(statements)
+
+    def runPrepared(self, prepared: tuple[Stmt, ...]) -> None:
+        for statement in self.compile(prepared):
+            statement(None)
+
+    def compileCondition(self, expr: Expr):
+        condition = self.compileExpr(expr)
+        if producesBool(expr):
+            return condition
+
+        def truthy(env):
+            value = condition(env)
+            return value is not None and value is not False
+        return truthy
+
+    def unsupported(self, token: Token, msg: str):
+        self.lox_inst.report(token.line, "", msg)
+        raise CompileError(msg)
+
+    # functions and classes only run on the tree walker so far
+    def visitFunctionStmt(self, stmt: Function):
+        self.unsupported(stmt.name, "functions aren't supported by the closure backend")
+
+    def visitReturnStmt(self, stmt: Return):
+        self.unsupported(stmt.keyword, "functions aren't supported by the closure backend")
+
+    def visitCallExpr(self, expr: Call):
+        self.unsupported(expr.paren, "calls aren't supported by the closure backend")
+
+    def visitClassStmt(self, stmt: Class):
+        self.unsupported(stmt.name, "classes aren't supported by the closure backend")
+
+    def visitGetExpr(self, expr: Get):
+        self.unsupported(expr.name, "classes aren't supported by the closure backend")
+
+    def visitSetExpr(self, expr: Set):
+        self.unsupported(expr.name, "classes aren't supported by the closure backend")
+
+    def visitThisExpr(self, expr: This):
+        self.unsupported(expr.keyword, "classes aren't supported by the closure backend")
+
+    def visitSuperExpr(self, expr: Super):
+        self.unsupported(expr.keyword, "classes aren't supported by the closure backend")
+
+    def visitBlockStmt(self, stmt: Block):
+        statements = self.compile(stmt.statements)
+        names = stmt.slotNames
+
+        if names is None:
+            def unscopedBlock(env):
+                for statement in statements:
+                    statement(env)
+            return unscopedBlock
+
+        def block(env):
+            scope = ArrayEnvironment(env, names)
+            for statement in statements:
+                statement(scope)
+        return block
+
+    def visitExpressionStmt(self, stmt: Expression):
+        return self.compileExpr(stmt.expression)
+
+    def visitIfStmt(self, stmt: If):
+        condition = self.compileCondition(stmt.condition)
+        thenBranch = self.compileStmt(stmt.thenBranch)
+
+        if stmt.elseBranch is None:
+            def ifThen(env):
+                if condition(env):
+                    thenBranch(env)
+            return ifThen
+
+        elseBranch = self.compileStmt(stmt.elseBranch)
+
+        def ifThenElse(env):
+            if condition(env):
+                thenBranch(env)
+            else:
+                elseBranch(env)
+        return ifThenElse
+
+    def visitPrintStmt(self, stmt: Print):
+        value = self.compileExpr(stmt.expression)
+
+        writeLine = self.output.writeLine
+
+        def printStmt(env):
+            writeLine(stringify(value(env)))
+        return printStmt
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            initializer = self.compileExpr(stmt.initializer)
+        else:
+            initializer = lambda env: None
+
+        name = stmt.name.lexeme
+        slot = stmt.slot
+
+        if slot is None:
+            values = self.globals
+
+            def defineGlobal(env):
+                values[name] = initializer(env)
+            return defineGlobal
+
+        def defineLocal(env):
+            env.values[slot] = initializer(env)
+        return defineLocal
+
+    def visitWhileStmt(self, stmt: While):
+        condition = self.compileCondition(stmt.condition)
+        body = self.compileStmt(stmt.body)
+
+        if stmt.increment is None:
+            def whileStmt(env):
+                while condition(env):
+                    body(env)
+            return whileStmt
+
+        increment = self.compileExpr(stmt.increment)
+
+        def forStmt(env):
+            while condition(env):
+                body(env)
+                increment(env)
+        return forStmt
+
+    def visitLiteralExpr(self, expr: Literal):
+        value = expr.value
+        return lambda env: value
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.compileExpr(expr.expression)
+
+    def visitVariableExpr(self, expr: Variable):
+        slot = expr.slot
+
+        match expr.depth:
+            case None:
+                values = self.globals
+                name = expr.name
+
+                def getGlobal(env):
+                    try:
+                        return values[name.lexeme]
+                    except KeyError:
+                        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}. Lock tf in bruh") from None
+                return getGlobal
+            case 0:
+                return lambda env: env.values[slot]
+            case 1:
+                return lambda env: env.enclosing.values[slot]
+            case depth:
+                def getLocal(env):
+                    for _ in range(depth):
+                        env = env.enclosing
+                    return env.values[slot]
+                return getLocal
+
+    def visitAssignExpr(self, expr: Assign):
+        value = self.compileExpr(expr.value)
+        slot = expr.slot
+
+        match expr.depth:
+            case None:
+                values = self.globals
+                name = expr.name
+
+                def assignGlobal(env):
+                    result = value(env)
+                    if name.lexeme not in values:
+                        raise LoxRuntimeError(name, f"ts undefined: {name.lexeme}.")
+                    values[name.lexeme] = result
+                    return result
+                return assignGlobal
+            case 0:
+                def assignLocal(env):
+                    result = env.values[slot] = value(env)
+                    return result
+                return assignLocal
+            case depth:
+                def assignOuter(env):
+                    result = value(env)
+                    for _ in range(depth):
+                        env = env.enclosing
+                    env.values[slot] = result
+                    return result
+                return assignOuter
+
+    def visitLogicalExpr(self, expr: Logical):
+        left = self.compileExpr(expr.left)
+        right = self.compileExpr(expr.right)
+
+        if expr.operator.type == tokenType.OR:
+            def logicalOr(env):
+                value = left(env)
+                if isTruthy(value): return value
+                return right(env)
+            return logicalOr
+
+        def logicalAnd(env):
+            value = left(env)
+            if not isTruthy(value): return value
+            return right(env)
+        return logicalAnd
+
+    def visitUnaryExpr(self, expr: Unary):
+        right = self.compileExpr(expr.right)
+        operator = expr.operator
+
+        match operator.type:
+            case tokenType.minus:
+                def negate(env):
+                    value = right(env)
+                    if type(value) is float: return -value
+                    raise LoxRuntimeError(operator, "operand must be a number")
+                return negate
+            case tokenType.bang:
+                return lambda env: not isTruthy(right(env))
+
+        return lambda env: None
+
+    def visitBinaryExpr(self, expr: Binary):
+        left = self.compileExpr(expr.left)
+        right = self.compileExpr(expr.right)
+        operator = expr.operator
+
+        def numberError():
+            return LoxRuntimeError(operator, "operand must be a number")
+
+        match operator.type:
+            case tokenType.plus:
+                def add(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a + b
+                    if type(a) is str and type(b) is str: return a + b
+                    raise LoxRuntimeError(operator, "operands must be two numbers or strings")
+                return add
+            case tokenType.minus:
+                def subtract(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a - b
+                    raise numberError()
+                return subtract
+            case tokenType.star:
+                def multiply(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a * b
+                    raise numberError()
+                return multiply
+            case tokenType.slash:
+                def divide(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is not float or type(b) is not float: raise numberError()
+                    if b == 0: raise LoxRuntimeError(operator, "division by zero")
+                    return a / b
+                return divide
+            case tokenType.greater:
+                def greater(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a > b
+                    raise numberError()
+                return greater
+            case tokenType.greater_equal:
+                def greaterEqual(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a >= b
+                    raise numberError()
+                return greaterEqual
+            case tokenType.lesser:
+                def lesser(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a < b
+                    raise numberError()
+                return lesser
+            case tokenType.lesser_equal:
+                def lesserEqual(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float: return a <= b
+                    raise numberError()
+                return lesserEqual
+            case tokenType.equal_equal:
+                return lambda env: isEqual(left(env), right(env))
+            case tokenType.bang_equal:
+                return lambda env: not isEqual(left(env), right(env))
+
+        return lambda env: None
@@ -1,30 +1,134 @@
 from __future__ import annotations
+from ploxTokens import Token
+from ploxRuntime import LoxRuntimeError
 
 class Environment:
 
-    def __init__(self, enclosing: Environment|None = None):
+    # names is only there so Environment and ArrayEnvironment can be built the
+    # same way by the interpreter; a dict scope only uses them for bind()
+    def __init__(self, enclosing: Environment|None = None, names: tuple[str, ...] = ()):
         self.__enclosing: Environment|None = enclosing
+        self.__names: tuple[str, ...] = names
         self.__map = {}
 
+    # a call's arguments, which are the first names of its frame
+    def bind(self, arguments: list[object]) -> None:
+        for name, value in zip(self.__names, arguments):
+            self.__map[name] = value
+
     def define(self, name: str, value: object) -> None:
         self.__map[name] = value
 
-    def get(self, name: str) -> object:
-        if name in self.__map:
-            return self.__map[name]
+    # dict-like access for globals seeded from, or handed back to, python
+    def update(self, values: dict[str, object]) -> None:
+        self.__map.update(values)
+
+    def items(self):
+        return self.__map.items()
+
+    def get(self, name: Token) -> object:
+        if name.lexeme in self.__map:
+            return self.__map[name.lexeme]
 
         if self.__enclosing is not None:
             return self.__enclosing.get(name)
 
-        raise RuntimeError(f"Undefined variable {name}. Lock tf in bruh")
+        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}. Lock tf in bruh")
 
-    def assign(self, name: str, value: object) -> None:
-        if name in self.__map:
-            self.__map[name] = value
+    def assign(self, name: Token, value: object) -> None:
+        if name.lexeme in self.__map:
+            self.__map[name.lexeme] = value
             return
 
         if self.__enclosing is not None:
             self.__enclosing.assign(name, value)
             return
 
-        raise RuntimeError(f"ts undefined: {name}.")
+        raise LoxRuntimeError(name, f"ts undefined: {name.lexeme}.")
+
+    # the resolver already knows how many scopes up a local lives, so these
+    # skip the membership test on every level in between
+    def ancestor(self, distance: int) -> Environment:
+        environment = self
+        for _ in range(distance):
+            environment = environment.__enclosing
+        return environment
+
+    def defineAt(self, slot: int, name: str, value: object) -> None:
+        self.__map[name] = value
+
+    def getAt(self, distance: int, slot: int, name: str) -> object:
+        return self.ancestor(distance).__map[name]
+
+    def assignAt(self, distance: int, slot: int, name: str, value: object) -> None:
+        self.ancestor(distance).__map[name] = value
+
+class ArrayEnvironment:
+
+    # Compact local scope: values live in a list sized from the resolver's
+    # slot count and are addressed by slot number. The names tuple is shared
+    # with the Block node it came from, so entering a scope only allocates
+    # this object and its value list. Names are only consulted for errors
+    # and the by-name fallbacks below.
+
+    __slots__ = ("enclosing", "values", "names")
+
+    def __init__(self, enclosing: Environment|ArrayEnvironment|None = None, names: tuple[str, ...] = ()):
+        self.enclosing = enclosing
+        self.values: list[object] = [None] * len(names)
+        self.names: tuple[str, ...] = names
+
+    # a call's arguments go into the first slots of its frame in one go
+    def bind(self, arguments: list[object]) -> None:
+        self.values[:len(arguments)] = arguments
+
+    def defineAt(self, slot: int, name: str, value: object) -> None:
+        self.values[slot] = value
+
+    def getAt(self, distance: int, slot: int, name: str) -> object:
+        environment = self
+        while distance:
+            environment = environment.enclosing
+            distance -= 1
+        return environment.values[slot]
+
+    def assignAt(self, distance: int, slot: int, name: str, value: object) -> None:
+        environment = self
+        while distance:
+            environment = environment.enclosing
+            distance -= 1
+        environment.values[slot] = value
+
+    def ancestor(self, distance: int) -> Environment|ArrayEnvironment:
+        environment = self
+        for _ in range(distance):
+            environment = environment.enclosing
+        return environment
+
+    def define(self, name: str, value: object) -> None:
+        if name not in self.names:
+            raise RuntimeError(f"{name} has no slot in this scope, was the program resolved?")
+        self.values[self.names.index(name)] = value
+
+    def get(self, name: Token) -> object:
+        if name.lexeme in self.names:
+            return self.values[self.names.index(name.lexeme)]
+
+        if self.enclosing is not None:
+            return self.enclosing.get(name)
+
+        raise LoxRuntimeError(name, f"Undefined variable {name.lexeme}. Lock tf in bruh")
+
+    def assign(self, name: Token, value: object) -> None:
+        if name.lexeme in self.names:
+            self.values[self.names.index(name.lexeme)] = value
+            return
+
+        if self.enclosing is not None:
+            self.enclosing.assign(name, value)
+            return
+
+        raise LoxRuntimeError(name, f"ts undefined: {name.lexeme}.")
+
+    def __repr__(self):
+        return "{" + ", ".join(f"{name}: {value!r}" for name, value in zip(self.names, self.values)) + "}"
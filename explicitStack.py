@@ -0,0 +1,665 @@
+from __future__ import annotations
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from ploxRuntime import LoxRuntimeError
+from loxClass import LoxInstance
+from resolver import Resolver, declarations
+
+# plox only imports this module when explicit stacks are asked for, so
+# pulling Parser and Interpreter in from there doesn't make a cycle at
+# import time
+from plox import Interpreter, Parser, ParserError
+
+# The parser, resolver and tree walker all recurse once per level of nesting
+# (several Python frames per level: evaluate -> accept -> visit*, or
+# assignment -> Or -> ... -> primary), so a machine generated script with
+# a few thousand nested parentheses or blocks dies with a RecursionError.
+# These versions keep their pending work on lists instead and only ever go
+# one Python call deep per Lox function call, however deep the tree.
+#
+# The optimizer still recurses, so lox skips it in this mode.
+
+# binary operators: token -> (precedence, node type), higher binds tighter
+binaryOperators = {
+    tokenType.equal: (1, Assign),
+    tokenType.OR: (2, Logical),
+    tokenType.AND: (3, Logical),
+    tokenType.bang_equal: (4, Binary),
+    tokenType.equal_equal: (4, Binary),
+    tokenType.greater: (5, Binary),
+    tokenType.greater_equal: (5, Binary),
+    tokenType.lesser: (5, Binary),
+    tokenType.lesser_equal: (5, Binary),
+    tokenType.minus: (6, Binary),
+    tokenType.plus: (6, Binary),
+    tokenType.slash: (7, Binary),
+    tokenType.star: (7, Binary),
+}
+unaryPrecedence = 8
+
+# what else can sit on the operator stack: an open '(' and an open call
+grouping = "grouping"
+call = "call"
+
+class StackParser(Parser):
+
+    # Same grammar, errors and trees as Parser. Expressions are parsed by
+    # precedence climbing over an operand and an operator stack, with open
+    # parentheses and argument lists as markers on the operator stack.
+    # Statements that hold other statements (blocks, ifs, loops, function
+    # and class bodies) push a frame that collects their children as they
+    # are finished.
+
+    def expression(self) -> Expr:
+        operands: list[Expr] = []
+        # (precedence, kind, token, call arguments), kind being a node type
+        # or one of the markers above
+        operators: list[tuple] = []
+        markers = 0
+
+        while True:
+            # operand position: any number of prefix operators and '(' first
+            while True:
+                if self.match([tokenType.bang, tokenType.minus]):
+                    operators.append((unaryPrecedence, Unary, self.previous(), None))
+                elif self.match(tokenType.paren_l):
+                    operators.append((0, grouping, None, None))
+                    markers += 1
+                else:
+                    break
+            operands.append(self.operand())
+
+            # operator position: postfix calls and gets, closing parentheses,
+            # argument commas and binary operators, until one of them expects
+            # another operand
+            while True:
+                if self.match(tokenType.paren_l):
+                    if self.check(tokenType.paren_r):
+                        operands.append(Call(operands.pop(), self.advance(), []))
+                        continue
+                    operators.append((0, call, operands.pop(), []))
+                    markers += 1
+                    break
+
+                if self.match(tokenType.dot):
+                    name = self.consume(tokenType.identifier, "expected property name after '.'")
+                    operands.append(Get(operands.pop(), name))
+                    continue
+
+                nextType = self.peekType()
+                if nextType in binaryOperators:
+                    operator = self.advance()
+                    precedence, kind = binaryOperators[nextType]
+                    # assignment is right associative, everything else left
+                    if kind is Assign:
+                        self.reduce(operands, operators, precedence + 1)
+                    else:
+                        self.reduce(operands, operators, precedence)
+                    operators.append((precedence, kind, operator, None))
+                    break
+
+                if markers and nextType == tokenType.comma:
+                    self.reduce(operands, operators, 1)
+                    if operators[-1][1] is grouping:
+                        self.error(self.peek(), "expected ')' after expression")
+                    self.step()
+                    arguments = operators[-1][3]
+                    arguments.append(operands.pop())
+                    if len(arguments) >= 255:
+                        # reported but not raised, the parser isn't confused
+                        self.lox_inst.error(self.peek(), "can't have more than 255 arguments")
+                    break
+
+                if markers and nextType == tokenType.paren_r:
+                    self.reduce(operands, operators, 1)
+                    paren = self.advance()
+                    _, kind, callee, arguments = operators.pop()
+                    markers -= 1
+                    if kind is grouping:
+                        operands.append(Grouping(operands.pop()))
+                    else:
+                        arguments.append(operands.pop())
+                        operands.append(Call(callee, paren, arguments))
+                    continue
+
+                # nothing that continues the expression
+                self.reduce(operands, operators, 1)
+                if operators:
+                    if operators[-1][1] is grouping:
+                        self.error(self.peek(), "expected ')' after expression")
+                    self.error(self.peek(), "expected ')' after arguments")
+                return operands[0]
+
+    def reduce(self, operands: list[Expr], operators: list[tuple], precedence: int) -> None:
+        # applies the stacked operators that bind at least as tight as
+        # precedence, stopping at an open '(' or argument list
+        while operators and operators[-1][0] >= precedence:
+            _, kind, operator, _ = operators.pop()
+            right = operands.pop()
+            if kind is Unary:
+                operands.append(Unary(operator, right))
+            elif kind is Assign:
+                target = operands.pop()
+                if isinstance(target, Variable):
+                    operands.append(Assign(target.name, right))
+                elif isinstance(target, Get):
+                    operands.append(Set(target.object, target.name, right))
+                else:
+                    self.error(operator, "Bad assignment target.")
+            else:
+                operands.append(kind(operands.pop(), operator, right))
+
+    def operand(self) -> Expr:
+        # primary(), less the parenthesised expression
+        if self.match([tokenType.FALSE]): return Literal(False)
+        if self.match([tokenType.TRUE]): return Literal(True)
+        if self.match([tokenType.NIL]): return Literal(None)
+
+        if self.match([tokenType.string, tokenType.number]):
+            return Literal(self.previous().literal)
+
+        if self.match([tokenType.THIS]):
+            return This(self.previous())
+
+        if self.match([tokenType.SUPER]):
+            keyword = self.previous()
+            self.expect(tokenType.dot, "expected '.' after 'super'")
+            method = self.consume(tokenType.identifier, "expected superclass method name")
+            return Super(keyword, method)
+
+        if self.match([tokenType.identifier]):
+            return Variable(self.previous())
+
+        self.error(self.peek(), "expected expression")
+
+    def parse(self) -> list[Stmt]:
+        statements: list[Stmt] = []
+        while not self.isAtEnd():
+            statements.append(self.declaration())
+        return statements
+
+    def statements(self):
+        while not self.isAtEnd():
+            yield self.declaration()
+
+    # Frames are lists starting with what they're building:
+    #   ["block", statements]
+    #   ["body", name, params, statements]     a function or method body
+    #   ["class", name, superclass, methods]
+    #   ["if", condition, thenBranch]          thenBranch None until parsed
+    #   ["while", condition]
+    #   ["for", initializer, condition, increment]
+    # A finished statement is handed to the frame on top, which either wants
+    # more (returns None) or is finished itself and gets handed down.
+
+    def declaration(self) -> Stmt:
+        frames: list[list] = []
+        try:
+            while True:
+                stmt = self.begin(frames)
+                while stmt is not None:
+                    if not frames:
+                        return stmt
+                    stmt = self.resume(frames, stmt)
+        except ParserError:
+            self.synchronize()
+            raise
+
+    def begin(self, frames: list[list]) -> Stmt|None:
+        # a declaration is only allowed directly in a block, a body or at
+        # the top level; statement bodies of ifs and loops get statements
+        if not frames or frames[-1][0] in ("block", "body"):
+            if self.match([tokenType.CLASS]):
+                name = self.consume(tokenType.identifier, "expected class name")
+                superclass = None
+                if self.match(tokenType.lesser):
+                    superclass = Variable(self.consume(tokenType.identifier, "expected superclass name"))
+                self.expect(tokenType.brace_l, "a class body starts with '{'")
+                frames.append(["class", name, superclass, []])
+                return self.methods(frames)
+            if self.match([tokenType.FUN]):
+                return self.function(frames, "function")
+            if self.match([tokenType.VAR]):
+                return self.varDeclaration()
+
+        if self.match([tokenType.FOR]):
+            self.expect(tokenType.paren_l, "twin... how are you forgetting your '(' before the for loop...")
+            initializer = None
+            if self.match(tokenType.semicolon):
+                initializer = None
+            elif self.match(tokenType.VAR):
+                initializer = self.varDeclaration()
+            else:
+                initializer = self.expressionStatement()
+
+            condition = None
+            if not self.check(tokenType.semicolon):
+                condition = self.expression()
+            self.expect(tokenType.semicolon, "are we fr. where the FUCK is your ';' following the loop condition")
+
+            increment = None
+            if not self.check(tokenType.paren_r):
+                increment = self.expression()
+            self.expect(tokenType.paren_r, "come on man, where's the ')' after your clauses")
+
+            frames.append(["for", initializer, condition, increment])
+            return None
+
+        if self.match([tokenType.IF]):
+            self.expect(tokenType.paren_l, "where's the ( after 'if'?")
+            condition = self.expression()
+            self.expect(tokenType.paren_r, "hey twin, i think you forgot the ) after your condition")
+            frames.append(["if", condition, None])
+            return None
+
+        if self.match([tokenType.PRINT]):
+            value = self.expression()
+            self.expect(tokenType.semicolon, "Expect ; after value.")
+            return Print(value)
+
+        if self.match([tokenType.RETURN]):
+            keyword = self.previous()
+            value = None
+            if not self.check(tokenType.semicolon):
+                value = self.expression()
+            self.expect(tokenType.semicolon, "expected ';' after return value")
+            return Return(keyword, value)
+
+        if self.match([tokenType.WHILE]):
+            self.expect(tokenType.paren_l, "errm, twinnum... i think you forgot a '(' after while")
+            condition = self.expression()
+            self.expect(tokenType.paren_r, "ok atp this has to be intentional bruh, where's the ')' after your condition")
+            frames.append(["while", condition])
+            return None
+
+        if self.match([tokenType.brace_l]):
+            if self.check(tokenType.brace_r) or self.isAtEnd():
+                self.expect(tokenType.brace_r, "icl you need a } somewhere here.")
+                return Block([])
+            frames.append(["block", []])
+            return None
+
+        return self.expressionStatement()
+
+    def resume(self, frames: list[list], stmt: Stmt) -> Stmt|None:
+        frame = frames[-1]
+        match frame[0]:
+            case "block":
+                frame[1].append(stmt)
+                if not self.check(tokenType.brace_r) and not self.isAtEnd():
+                    return None
+                self.expect(tokenType.brace_r, "icl you need a } somewhere here.")
+                frames.pop()
+                return Block(frame[1])
+            case "body":
+                frame[3].append(stmt)
+                if not self.check(tokenType.brace_r) and not self.isAtEnd():
+                    return None
+                self.expect(tokenType.brace_r, "icl you need a } somewhere here.")
+                frames.pop()
+                return Function(frame[1], frame[2], frame[3])
+            case "class":
+                frame[3].append(stmt)
+                return self.methods(frames)
+            case "if":
+                if frame[2] is None and self.match(tokenType.ELSE):
+                    frame[2] = stmt
+                    return None
+                frames.pop()
+                if frame[2] is None:
+                    return If(frame[1], stmt, None)
+                return If(frame[1], frame[2], stmt)
+            case "while":
+                frames.pop()
+                return While(frame[1], stmt, None)
+            case "for":
+                frames.pop()
+                _, initializer, condition, increment = frame
+                if condition is None:
+                    condition = Literal(True)
+                loop = While(condition, stmt, increment)
+                if initializer is not None:
+                    return Block([initializer, loop])
+                return loop
+
+    def methods(self, frames: list[list]) -> Stmt|None:
+        # the rest of a class body, up to the next method that has a body
+        # to parse; the class frame is on top
+        frame = frames[-1]
+        while not self.check(tokenType.brace_r) and not self.isAtEnd():
+            method = self.function(frames, "method")
+            if method is None:
+                return None
+            frame[3].append(method)
+
+        self.expect(tokenType.brace_r, "icl you need a } after the class body.")
+        frames.pop()
+        return Class(frame[1], frame[2], frame[3])
+
+    def function(self, frames: list[list], kind: str) -> Stmt|None:
+        # everything up to the body's '{'; pushes a body frame unless the
+        # body is empty
+        name = self.consume(tokenType.identifier, f"expected {kind} name")
+        self.expect(tokenType.paren_l, f"where's the '(' after the {kind} name?")
+
+        params: list[Token] = []
+        if not self.check(tokenType.paren_r):
+            params.append(self.consume(tokenType.identifier, "expected parameter name"))
+            while self.match(tokenType.comma):
+                if len(params) >= 255:
+                    self.lox_inst.error(self.peek(), "can't have more than 255 parameters")
+                params.append(self.consume(tokenType.identifier, "expected parameter name"))
+
+        self.expect(tokenType.paren_r, "expected ')' after parameters")
+        self.expect(tokenType.brace_l, f"a {kind} body starts with '{{'")
+
+        if self.check(tokenType.brace_r) or self.isAtEnd():
+            self.expect(tokenType.brace_r, "icl you need a } somewhere here.")
+            return Function(name, params, [])
+        frames.append(["body", name, params, []])
+        return None
+
+    def varDeclaration(self) -> Stmt:
+        name = self.consume(tokenType.identifier, "Expecte variable name! ts pmo...")
+
+        initializer = None
+        if self.match([tokenType.equal]):
+            initializer = self.expression()
+
+        self.expect(tokenType.semicolon, "SYBAU And add a semicolon (;) after variable declaration bruh")
+        return Var(name, initializer)
+
+    def expressionStatement(self) -> Stmt:
+        expr = self.expression()
+        self.expect(tokenType.semicolon, "Expect ; after expression.")
+        return Expression(expr)
+
+# markers on the resolver's and interpreter's work stacks, next to nodes
+leaveScope = 0
+leaveFunction = 1
+leaveClass = 2
+enterMethod = 3
+runExpression = 4
+
+class StackResolver(Resolver):
+
+    # Resolver with the statement and expression walks done off work
+    # stacks. Leaving a scope, a function or a class is a marker pushed
+    # under the statements inside it, so it's handled once they're done.
+
+    def resolve(self, statements: list[Stmt]) -> None:
+        work: list = statements[::-1]
+
+        while work:
+            stmt = work.pop()
+            kind = type(stmt)
+
+            if kind is tuple:
+                marker = stmt[0]
+                if marker == leaveScope:
+                    stmt[1].slotNames = self.endScope()
+                elif marker == leaveFunction:
+                    stmt[1].slotNames = self.endScope()
+                    self.currentFunction = stmt[2]
+                elif marker == leaveClass:
+                    self.endScope()
+                    if stmt[1].superclass is not None:
+                        self.endScope()
+                    self.currentClass = stmt[2]
+                elif marker == enterMethod:
+                    self.beginFunction(stmt[1], stmt[2], work)
+                else:
+                    self.resolveExpr(stmt[1])
+            elif kind is Block:
+                if any(isinstance(statement, declarations) for statement in stmt.statements):
+                    self.beginScope()
+                    work.append((leaveScope, stmt))
+                else:
+                    stmt.slotNames = None
+                work.extend(stmt.statements[::-1])
+            elif kind is If:
+                self.resolveExpr(stmt.condition)
+                if stmt.elseBranch is not None:
+                    work.append(stmt.elseBranch)
+                work.append(stmt.thenBranch)
+            elif kind is While:
+                self.resolveExpr(stmt.condition)
+                if stmt.increment is not None:
+                    work.append((runExpression, stmt.increment))
+                work.append(stmt.body)
+            elif kind is Function:
+                stmt.slot = self.declare(stmt.name)
+                self.define(stmt.name)
+                self.beginFunction(stmt, "function", work)
+            elif kind is Class:
+                enclosing = self.currentClass
+                self.currentClass = "class"
+                stmt.slot = self.declare(stmt.name)
+                self.define(stmt.name)
+
+                if stmt.superclass is not None:
+                    if stmt.superclass.name.lexeme == stmt.name.lexeme:
+                        self.lox_inst.error(stmt.superclass.name, "a class can't inherit from itself")
+                    self.currentClass = "subclass"
+                    self.resolveExpr(stmt.superclass)
+                    self.beginScope()
+                    self.scopes[-1]["super"] = [0, True]
+
+                self.beginScope()
+                self.scopes[-1]["this"] = [0, True]
+                work.append((leaveClass, stmt, enclosing))
+                for function in reversed(stmt.methods):
+                    work.append((enterMethod, function, "initializer" if function.name.lexeme == "init" else "method"))
+            else:
+                # Var, Expression, Print, Return: expressions only
+                stmt.accept(self)
+
+    def beginFunction(self, stmt: Function, kind: str, work: list) -> None:
+        work.append((leaveFunction, stmt, self.currentFunction))
+        self.currentFunction = kind
+        self.beginScope()
+        for param in stmt.params:
+            self.declare(param)
+            self.define(param)
+        work.extend(stmt.body[::-1])
+
+    def resolveExpr(self, expr: Expr) -> None:
+        work = [expr]
+        while work:
+            expr = work.pop()
+            kind = type(expr)
+            if kind is Binary or kind is Logical:
+                work.append(expr.right)
+                work.append(expr.left)
+            elif kind is Grouping:
+                work.append(expr.expression)
+            elif kind is Unary:
+                work.append(expr.right)
+            elif kind is Assign:
+                self.resolveLocal(expr, expr.name)
+                work.append(expr.value)
+            elif kind is Call:
+                work.extend(expr.arguments[::-1])
+                work.append(expr.callee)
+            elif kind is Get:
+                expr.cache = None
+                work.append(expr.object)
+            elif kind is Set:
+                expr.cache = None
+                work.append(expr.value)
+                work.append(expr.object)
+            elif kind is not Literal:
+                # Variable, This, Super: nothing underneath
+                expr.accept(self)
+
+class StackInterpreter(Interpreter):
+
+    # Tree walker with one loop for statements and one for expressions.
+    # Expressions push their operands, then themselves again as a
+    # (node, stage) pair to be finished once the operand values are on the
+    # value stack. Blocks push (leaveScope, previous environment) under their
+    # statements, loops push themselves back under their body.
+    #
+    # Calls still go through callOp(), so each Lox call is one Python level
+    # deeper, the same as in Interpreter.
+
+    def evaluate(self, expr: Expr) -> object:
+        # leaves are common enough to skip setting up the stacks for
+        kind = type(expr)
+        if kind is Literal:
+            return expr.value
+        if kind is Variable:
+            if expr.depth is None:
+                return self.globals.get(expr.name)
+            return self.environment.getAt(expr.depth, expr.slot, expr.name.lexeme)
+
+        values: list[object] = []
+        work: list = [expr]
+        isTruthy = self.isTruthy
+        push = work.append
+        pop = work.pop
+        pushValue = values.append
+        popValue = values.pop
+
+        while work:
+            expr = pop()
+            kind = type(expr)
+
+            if kind is tuple:
+                expr, stage = expr
+                kind = type(expr)
+                if kind is Binary:
+                    right = popValue()
+                    values[-1] = self.binaryOp(expr.operator, values[-1], right)
+                elif kind is Logical:
+                    if isTruthy(values[-1]) == (expr.operator.type == tokenType.OR):
+                        continue
+                    popValue()
+                    push(expr.right)
+                elif kind is Unary:
+                    values[-1] = self.unaryOp(expr.operator, values[-1])
+                elif kind is Call:
+                    count = len(expr.arguments)
+                    arguments = values[len(values) - count:]
+                    del values[len(values) - count:]
+                    values[-1] = self.callOp(expr, values[-1], arguments)
+                elif kind is Assign:
+                    if expr.depth is None:
+                        self.globals.assign(expr.name, values[-1])
+                    else:
+                        self.environment.assignAt(expr.depth, expr.slot, expr.name.lexeme, values[-1])
+                elif kind is Get:
+                    values[-1] = self.getOp(expr, values[-1])
+                elif stage == 0:
+                    # Set, with the object evaluated: checked before the value is
+                    if type(values[-1]) is not LoxInstance:
+                        raise LoxRuntimeError(expr.name, "only instances have fields")
+                else:
+                    value = popValue()
+                    values[-1] = self.setOp(expr, values[-1], value)
+            elif kind is Literal:
+                pushValue(expr.value)
+            elif kind is Variable:
+                if expr.depth is None:
+                    pushValue(self.globals.get(expr.name))
+                else:
+                    pushValue(self.environment.getAt(expr.depth, expr.slot, expr.name.lexeme))
+            elif kind is Binary:
+                # `i < 10`, `n * 2` and the like are common enough to be
+                # worth not going round the loop for their operands
+                left = expr.left
+                right = expr.right
+                if type(right) is Literal and type(left) is Literal:
+                    pushValue(self.binaryOp(expr.operator, left.value, right.value))
+                elif type(right) is Literal and type(left) is Variable:
+                    if left.depth is None:
+                        left = self.globals.get(left.name)
+                    else:
+                        left = self.environment.getAt(left.depth, left.slot, left.name.lexeme)
+                    pushValue(self.binaryOp(expr.operator, left, right.value))
+                else:
+                    push((expr, 0))
+                    push(right)
+                    push(left)
+            elif kind is Grouping:
+                push(expr.expression)
+            elif kind is Logical or kind is Unary:
+                push((expr, 0))
+                push(expr.right if kind is Unary else expr.left)
+            elif kind is Call:
+                push((expr, 0))
+                work.extend(expr.arguments[::-1])
+                push(expr.callee)
+            elif kind is Assign:
+                push((expr, 0))
+                push(expr.value)
+            elif kind is Get:
+                push((expr, 0))
+                push(expr.object)
+            elif kind is Set:
+                push((expr, 1))
+                push(expr.value)
+                push((expr, 0))
+                push(expr.object)
+            else:
+                # This, Super: nothing underneath
+                pushValue(expr.accept(self))
+
+        return values[0]
+
+    def execute(self, stmt: Stmt) -> ReturnValue|None:
+        # so are statements with no statements inside
+        kind = type(stmt)
+        if kind is Expression:
+            self.evaluate(stmt.expression)
+            return None
+        if kind is not Block and kind is not If and kind is not While:
+            return super().execute(stmt)
+
+        environment = self.environment
+        work: list = [stmt]
+
+        try:
+            while work:
+                stmt = work.pop()
+                kind = type(stmt)
+
+                if kind is Expression:
+                    self.evaluate(stmt.expression)
+                elif kind is tuple:
+                    if stmt[0] == leaveScope:
+                        self.environment = stmt[1]
+                    else:
+                        self.evaluate(stmt[1])
+                elif kind is Block:
+                    if stmt.slotNames is not None:
+                        work.append((leaveScope, self.environment))
+                        self.environment = self.scopeType(self.environment, stmt.slotNames)
+                    work.extend(stmt.statements[::-1])
+                elif kind is If:
+                    if self.isTruthy(self.evaluate(stmt.condition)):
+                        work.append(stmt.thenBranch)
+                    elif stmt.elseBranch is not None:
+                        work.append(stmt.elseBranch)
+                elif kind is While:
+                    if self.isTruthy(self.evaluate(stmt.condition)):
+                        # back round once the body and increment are done
+                        work.append(stmt)
+                        if stmt.increment is not None:
+                            work.append((runExpression, stmt.increment))
+                        work.append(stmt.body)
+                elif kind is Print:
+                    self.output.writeLine(self.stringify(self.evaluate(stmt.expression)))
+                else:
+                    # Var, Function, Class, Return
+                    completion = stmt.accept(self)
+                    if completion is not None:
+                        # a return: drop whatever is left, the scopes it was
+                        # in are undone below
+                        return completion
+        finally:
+            self.environment = environment
+
+        return None
@@ -1,6 +1,15 @@
 from __future__ import annotations
 import io
 
+# Node types are written as
+#   "Name : field: Type, field: Type ; annotation, annotation"
+# Fields are what the parser passes to the constructor. Annotations are
+# attributes later passes fill in (resolved slots, inline caches); they get a
+# slot like the fields do but aren't constructor arguments. Every node class
+# has __slots__, so a tree of them carries no per-node __dict__, plus
+# __match_args__ for its fields and a `kind` int, its index in the module's
+# dispatch table.
+
 def tabs(tabCount: int):
     return '\t'*tabCount
 
@@ -9,8 +18,19 @@ def forwardDeclare(file: io.TextIOWrapper, name: str):
     file.write(f"{tabs(1)}def accept(self, visitor):\n")
     file.write(f"{tabs(2)}pass\n\n")
 
+def parseType(type: str) -> tuple[str, list[str], list[str]]:
+    head, _, annotations = type.partition(";")
+    name, _, fields = head.partition(":")
+    # split on ", " only, so `dict[str, int]` style types would survive
+    fields = [field.strip(" ") for field in fields.split(", ")]
+    annotations = [annotation.strip(" ") for annotation in annotations.split(",") if annotation.strip(" ")]
+    return name.strip(" "), fields, annotations
+
+def tupleOf(names: list[str]) -> str:
+    return "(" + ", ".join(f'"{name}"' for name in names) + ("," if len(names) == 1 else "") + ")"
+
 def defineVisitor(file: io.TextIOWrapper, basename: str, types: list[str]):
-    
+
     file.write(f"{tabs(1)}class Visitor:\n")
 
     file.write("\n")
@@ -20,17 +40,22 @@ def defineVisitor(file: io.TextIOWrapper, basename: str, types: list[str]):
 
     for type in types:
         typename = type.split(":")[0]
-        file.write(f"{tabs(2)}def visit{typename.strip(' ')}{basename.strip(' ')}(self, {basename.lower()}: {typename}):\n")
+        file.write(f"{tabs(2)}def visit{typename.strip(' ')}{basename.strip(' ')}(self, {basename.lower()}: {typename}) -> object:\n")
         file.write(f"{tabs(3)}pass\n")
         file.write("\n")
 
-def defineClass(file: io.TextIOWrapper, name: str, basename: str, fields: list[str]):
+def defineClass(file: io.TextIOWrapper, name: str, basename: str, fields: list[str], annotations: list[str], kind: int):
 
     tabCount = 0
+    names = [field.split(':')[0].strip(' ') for field in fields]
 
     file.write(f"class {name.strip(' ')}({basename}):\n")
     file.write("\n")
     tabCount += 1
+    file.write(f"{tabs(tabCount)}__slots__ = {tupleOf(names + annotations)}\n")
+    file.write(f"{tabs(tabCount)}__match_args__ = {tupleOf(names)}\n")
+    file.write(f"{tabs(tabCount)}kind = {kind}\n")
+    file.write("\n")
     file.write(f"{tabs(tabCount)}def __init__(self, {', '.join([field.strip(' ') for field in fields])}):\n")
     tabCount += 1
     for field in fields:
@@ -38,13 +63,28 @@ def defineClass(file: io.TextIOWrapper, name: str, basename: str, fields: list[s
     tabCount -= 1
 
     file.write("\n")
-    file.write(f"{tabs(tabCount)}def accept(self, visitor):\n")
+    file.write(f"{tabs(tabCount)}def accept(self, visitor: {basename}.Visitor) -> object:\n")
     tabCount += 1
     file.write(f"{tabs(tabCount)}return visitor.visit{name.strip(' ')}{basename.strip(' ')}(self)\n")
 
     pass
 
-def generateAST(out_dir: str, basename: str, types: list[str]):
+def defineDispatch(file: io.TextIOWrapper, basename: str, classnames: list[str]):
+    prefix = basename.lower()
+
+    file.write(f"# kind -> the Visitor method for that {basename}\n")
+    file.write(f"{prefix}Visits = (\n")
+    for name in classnames:
+        file.write(f"{tabs(1)}\"visit{name}{basename}\",\n")
+    file.write(")\n")
+    file.write("\n")
+
+    file.write("# A visitor's methods in kind order, for visitors that dispatch with\n")
+    file.write(f"# table[{prefix}.kind]({prefix}) instead of a call through accept() first.\n")
+    file.write(f"def {prefix}Dispatch(visitor: {basename}.Visitor) -> list:\n")
+    file.write(f"{tabs(1)}return [getattr(visitor, name) for name in {prefix}Visits]\n")
+
+def generateAST(out_dir: str, basename: str, types: list[str], imports: list[str]):
     path = out_dir + ".py"
 
     with open(path, "w") as file:
@@ -53,21 +93,24 @@ def generateAST(out_dir: str, basename: str, types: list[str]):
 
         classnames = [type.split(":")[0].strip(" ") for type in types]
 
-        # import plox
         file.write("from __future__ import annotations\n")
-        file.write("from plox import Token\n")
+        for line in imports:
+            file.write(line + "\n")
 
         file.write("\n")
-        
+
         # Not needed actually because of annotations
         # for name in classnames:
         #     forwardDeclare(file, name)
         # file.write("\n")
-        
+
         # Generate AST base class
         file.write(f"class {basename}:\n")
         tabCount += 1
 
+        file.write("\n")
+        # empty, so the subclasses' __slots__ aren't undone by a __dict__ here
+        file.write(f"{tabs(tabCount)}__slots__ = ()\n")
         file.write("\n")
         file.write(f"{tabs(tabCount)}def __init__(self):\n")
 
@@ -80,35 +123,44 @@ def generateAST(out_dir: str, basename: str, types: list[str]):
 
         defineVisitor(file, basename, classnames)
 
-        for type in types:
-            split_str = type.split(":")
-            classname = (split_str[0]).strip(" ")
+        file.write(f"{tabs(tabCount)}def accept(self, visitor: {basename}.Visitor) -> object:\n")
+        file.write(f"{tabs(tabCount + 1)}pass\n")
+        file.write("\n")
+
+        for kind, type in enumerate(types):
+            classname, fields, annotations = parseType(type)
 
-            defineClass(file, classname, basename, type[len(split_str[0])+1:].split(","))
+            defineClass(file, classname, basename, fields, annotations, kind)
             file.write("\n")
 
+        defineDispatch(file, basename, classnames)
+
 
 if __name__ == '__main__':
-    
-    #generateAST("AST", "Expr",  
-    #            ["Assign   : name: Token, value: Expr",
-    #             "Binary   : left: Expr, operator: Token, right: Expr",
-    #             "Call     : callee: Expr, paren: Token, arguments: list[Expr]",
-    #             "Get      : object: Expr, name: Token",
-    #             "Grouping : expression: Expr",
-    #             "Literal  : value: any",
-    #             "Logical  : left: Expr, operator: Token, right: Expr",
-    #             "Set      : object: Expr, name: Token, value: Expr",
-    #             "Super    : keyword: Token, method: Token",
-    #             "This     : keyword: Token",
-    #             "Unary    : operator: Token, right: Expr",
-    #             "Variable : name: Token"])
-
-                
+
+    generateAST("AST", "Expr",
+                ["Assign   : name: Token, value: Expr ; depth, slot",
+                 "Binary   : left: Expr, operator: Token, right: Expr",
+                 "Call     : callee: Expr, paren: Token, arguments: list[Expr]",
+                 "Get      : object: Expr, name: Token ; cache",
+                 "Grouping : expression: Expr",
+                 "Literal  : value: object",
+                 "Logical  : left: Expr, operator: Token, right: Expr",
+                 "Set      : object: Expr, name: Token, value: Expr ; cache",
+                 "Super    : keyword: Token, method: Token ; depth, slot",
+                 "This     : keyword: Token ; depth, slot",
+                 "Unary    : operator: Token, right: Expr",
+                 "Variable : name: Token ; depth, slot"],
+                ["from ploxTokens import *"])
+
     generateAST("STMT", "Stmt", [
-        "Block      : statements: list[Stmt]",
+        "Block      : statements: list[Stmt] ; slotNames",
+        "Class      : name: Token, superclass: Variable|None, methods: list[Function] ; slot",
         "Expression : expression: Expr",
-        "If         : condition: Expr, thenBranch: Stmt, elseBranch: Stmt",
+        "Function   : name: Token, params: list[Token], body: list[Stmt] ; slot, slotNames",
+        "If         : condition: Expr, thenBranch: Stmt, elseBranch: Stmt|None",
         "Print      : expression: Expr",
-        "Var        : name: Token, initializer: Expr",
-        "While      : condition: Expr, body: Stmt"])
\ No newline at end of file
+        "Return     : keyword: Token, value: Expr|None",
+        "Var        : name: Token, initializer: Expr|None ; slot",
+        "While      : condition: Expr, body: Stmt, increment: Expr|None"],
+                ["from AST import Token, Expr"])
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from ploxRuntime import LoxCallable
+
+class Shape:
+
+    # Hidden class: which field lives in which slot of an instance's value
+    # list. Instances start out with their class's rootShape, the empty shape
+    # of the interpreter that declared it, and move to a child shape every
+    # time they get a field they didn't have, so instances that get the same
+    # fields in the same order (anything set up by one init()) end up
+    # sharing one Shape. A shape never changes once made, which is what
+    # lets Get/Set sites cache "for this shape, the field is in slot n".
+
+    __slots__ = ("fields", "transitions")
+
+    def __init__(self, fields: dict[str, int]):
+        self.fields: dict[str, int] = fields
+        # field name -> the shape an instance moves to when it's added
+        self.transitions: dict[str, Shape] = {}
+
+    def withField(self, name: str) -> Shape:
+        shape = self.transitions.get(name)
+        if shape is None:
+            fields = dict(self.fields)
+            fields[name] = len(fields)
+            # setdefault so two threads adding the same field agree on one
+            shape = self.transitions.setdefault(name, Shape(fields))
+        return shape
+
+    def __repr__(self) -> str:
+        return f"Shape({', '.join(self.fields)})"
+
+class LoxInstance:
+
+    __slots__ = ("klass", "shape", "values")
+
+    def __init__(self, klass: LoxClass):
+        self.klass: LoxClass = klass
+        self.shape: Shape = klass.rootShape
+        self.values: list[object] = []
+
+    def __str__(self) -> str:
+        return f"{self.klass.name} instance"
+
+class LoxClass(LoxCallable):
+
+    # Methods are looked up through the superclass chain once per name and
+    # then kept in methodCache, misses included. Lox has no way to change a
+    # class's methods once it's declared, so nothing in the cache, or in a
+    # Get site's cache of a method, ever goes stale.
+
+    def __init__(self, name: str, superclass: LoxClass|None, methods: dict[str, LoxCallable], rootShape: Shape):
+        self.name: str = name
+        self.superclass: LoxClass|None = superclass
+        self.methods: dict[str, LoxCallable] = methods
+        # the interpreter's empty shape, so the shape tree lives as long as
+        # the interpreter and its classes rather than the process
+        self.rootShape: Shape = rootShape
+        self.methodCache: dict[str, LoxCallable|None] = {}
+        # calling the class takes whatever init() takes
+        initializer = self.findMethod("init")
+        self.arity: int = initializer.arity if initializer is not None else 0
+
+    def findMethod(self, name: str) -> LoxCallable|None:
+        cache = self.methodCache
+        if name in cache:
+            return cache[name]
+
+        klass = self
+        method = None
+        while klass is not None:
+            method = klass.methods.get(name)
+            if method is not None:
+                break
+            klass = klass.superclass
+
+        cache[name] = method
+        return method
+
+    def call(self, interpreter, arguments: list[object]) -> object:
+        instance = LoxInstance(self)
+        initializer = self.findMethod("init")
+        if initializer is not None:
+            initializer.bind(instance).call(interpreter, arguments)
+        return instance
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import inspect
+import time
+
+from ploxRuntime import LoxCallable, toLoxValue
+from rope import Rope
+
+# Python functions Lox code can call. Everything in `natives` is defined as
+# a global in every tree-walking interpreter when it is created, so register
+# functions before making the lox instance that should see them. Natives
+# only ever see and return plain str, never a Rope.
+
+class NativeFunction(LoxCallable):
+
+    def __init__(self, name: str, arity: int, function):
+        self.name: str = name
+        self.arity: int = arity
+        self.function = function
+
+    def call(self, interpreter, arguments: list[object]) -> object:
+        arguments = [argument.flatten() if type(argument) is Rope else argument for argument in arguments]
+        result = self.function(*arguments)
+        if type(result) is Rope:
+            result = result.flatten()
+        return toLoxValue(result)
+
+    def __str__(self) -> str:
+        return "<native fn>"
+
+natives: dict[str, NativeFunction] = {}
+
+def registerNative(name: str, function, arity: int|None = None) -> NativeFunction:
+    if arity is None:
+        arity = len(inspect.signature(function).parameters)
+    native = natives[name] = NativeFunction(name, arity, function)
+    return native
+
+# decorator form of registerNative, named after the function by default
+def native(name: str|None = None, arity: int|None = None):
+    def register(function):
+        registerNative(name or function.__name__, function, arity)
+        return function
+    return register
+
+@native()
+def clock() -> float:
+    # seconds on a monotonic clock, only meaningful as a difference
+    return time.perf_counter()
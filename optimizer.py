@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from ploxRuntime import isEqual, isTruthy
+
+class Optimizer(Expr.Visitor, Stmt.Visitor):
+
+    # Runs between Parser.parse() and the Resolver. Every visit returns the
+    # node that should take the visited node's place (statements may also
+    # return None to be dropped):
+    #   - Binary/Unary/Logical over Literals fold into a Literal
+    #   - Grouping wrappers disappear
+    #   - If/While with a constant condition keep only the branch that runs
+    #
+    # Anything that would fail at runtime (1 + "a", -"b", 1 / 0) is left
+    # alone so it raises its Lox runtime error from its own line when it's
+    # executed.
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized = []
+        for statement in statements:
+            statement = self.optimizeStmt(statement)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    def optimizeStmt(self, stmt: Stmt) -> Stmt|None:
+        return stmt.accept(self)
+
+    def optimizeExpr(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def visitBlockStmt(self, stmt: Block):
+        stmt.statements = self.optimize(stmt.statements)
+        return stmt
+
+    def visitExpressionStmt(self, stmt: Expression):
+        stmt.expression = self.optimizeExpr(stmt.expression)
+        # a bare constant can't do anything
+        if isinstance(stmt.expression, Literal):
+            return None
+        return stmt
+
+    def visitPrintStmt(self, stmt: Print):
+        stmt.expression = self.optimizeExpr(stmt.expression)
+        return stmt
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer = self.optimizeExpr(stmt.initializer)
+        return stmt
+
+    def visitFunctionStmt(self, stmt: Function):
+        stmt.body = self.optimize(stmt.body)
+        return stmt
+
+    def visitClassStmt(self, stmt: Class):
+        for method in stmt.methods:
+            method.body = self.optimize(method.body)
+        return stmt
+
+    def visitReturnStmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value = self.optimizeExpr(stmt.value)
+        return stmt
+
+    def visitIfStmt(self, stmt: If):
+        stmt.condition = self.optimizeExpr(stmt.condition)
+        stmt.thenBranch = self.optimizeStmt(stmt.thenBranch)
+        if stmt.elseBranch is not None:
+            stmt.elseBranch = self.optimizeStmt(stmt.elseBranch)
+
+        if isinstance(stmt.condition, Literal):
+            if isTruthy(stmt.condition.value):
+                return stmt.thenBranch
+            return stmt.elseBranch
+
+        # the branches were statements before, keep them statements
+        if stmt.thenBranch is None:
+            stmt.thenBranch = Block([])
+        return stmt
+
+    def visitWhileStmt(self, stmt: While):
+        stmt.condition = self.optimizeExpr(stmt.condition)
+
+        if isinstance(stmt.condition, Literal) and not isTruthy(stmt.condition.value):
+            return None
+
+        stmt.body = self.optimizeStmt(stmt.body)
+        if stmt.body is None:
+            stmt.body = Block([])
+
+        if stmt.increment is not None:
+            stmt.increment = self.optimizeExpr(stmt.increment)
+            # same as a bare constant statement
+            if isinstance(stmt.increment, Literal):
+                stmt.increment = None
+        return stmt
+
+    def visitLiteralExpr(self, expr: Literal):
+        return expr
+
+    def visitVariableExpr(self, expr: Variable):
+        return expr
+
+    def visitAssignExpr(self, expr: Assign):
+        expr.value = self.optimizeExpr(expr.value)
+        return expr
+
+    def visitCallExpr(self, expr: Call):
+        expr.callee = self.optimizeExpr(expr.callee)
+        expr.arguments = [self.optimizeExpr(argument) for argument in expr.arguments]
+        return expr
+
+    def visitGetExpr(self, expr: Get):
+        expr.object = self.optimizeExpr(expr.object)
+        return expr
+
+    def visitSetExpr(self, expr: Set):
+        expr.object = self.optimizeExpr(expr.object)
+        expr.value = self.optimizeExpr(expr.value)
+        return expr
+
+    def visitThisExpr(self, expr: This):
+        return expr
+
+    def visitSuperExpr(self, expr: Super):
+        return expr
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.optimizeExpr(expr.expression)
+
+    def visitLogicalExpr(self, expr: Logical):
+        expr.left = self.optimizeExpr(expr.left)
+        expr.right = self.optimizeExpr(expr.right)
+
+        if not isinstance(expr.left, Literal):
+            return expr
+
+        if expr.operator.type == tokenType.OR:
+            return expr.left if isTruthy(expr.left.value) else expr.right
+        return expr.right if isTruthy(expr.left.value) else expr.left
+
+    def visitUnaryExpr(self, expr: Unary):
+        expr.right = self.optimizeExpr(expr.right)
+
+        if not isinstance(expr.right, Literal):
+            return expr
+
+        value = expr.right.value
+        match expr.operator.type:
+            case tokenType.minus:
+                if isinstance(value, float):
+                    return Literal(-value)
+            case tokenType.bang:
+                return Literal(not isTruthy(value))
+
+        return expr
+
+    def visitBinaryExpr(self, expr: Binary):
+        expr.left = self.optimizeExpr(expr.left)
+        expr.right = self.optimizeExpr(expr.right)
+
+        if not (isinstance(expr.left, Literal) and isinstance(expr.right, Literal)):
+            return expr
+
+        left = expr.left.value
+        right = expr.right.value
+        numbers = isinstance(left, float) and isinstance(right, float)
+
+        match expr.operator.type:
+            case tokenType.plus:
+                if numbers or (isinstance(left, str) and isinstance(right, str)):
+                    return Literal(left + right)
+            case tokenType.minus if numbers:
+                return Literal(left - right)
+            case tokenType.star if numbers:
+                return Literal(left * right)
+            case tokenType.slash if numbers and right != 0:
+                return Literal(left / right)
+            case tokenType.greater if numbers:
+                return Literal(left > right)
+            case tokenType.greater_equal if numbers:
+                return Literal(left >= right)
+            case tokenType.lesser if numbers:
+                return Literal(left < right)
+            case tokenType.lesser_equal if numbers:
+                return Literal(left <= right)
+            case tokenType.equal_equal:
+                return Literal(isEqual(left, right))
+            case tokenType.bang_equal:
+                return Literal(not isEqual(left, right))
+
+        return expr
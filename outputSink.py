@@ -0,0 +1,78 @@
+from __future__ import annotations
+import sys
+from typing import TextIO
+
+# Where the output of lox `print` statements goes. Every backend writes
+# through a sink's writeLine() instead of calling print(), so output can be
+# batched into few large writes, or kept in memory when lox is embedded.
+# Error messages don't go through the sink; lox flushes it before reporting
+# one so the two still come out in order.
+
+class BufferedSink:
+
+    # Collects lines and writes them to the stream in one go. The flush
+    # policy is one of
+    #   "line"    write and flush every line, like print() to a terminal
+    #   "buffer"  write once bufferSize characters are waiting
+    #   "auto"    "line" if the stream is a terminal, "buffer" otherwise
+    # Whatever is left is written by flush(), which lox calls when a run
+    # ends. With no stream given it writes to whatever sys.stdout is at the
+    # time, so contextlib.redirect_stdout() keeps working.
+
+    policies = ("auto", "line", "buffer")
+
+    def __init__(self, stream: TextIO|None = None, flush: str = "auto", bufferSize: int = 64 * 1024):
+        if flush not in self.policies:
+            raise ValueError(f"unknown flush policy '{flush}', pick one of {', '.join(self.policies)}")
+        self.stream: TextIO|None = stream
+        self.policy: str = flush
+        self.bufferSize: int = bufferSize
+        self.parts: list[str] = []
+        self.size: int = 0
+        self.lineBuffered: bool|None = None if flush == "auto" else flush == "line"
+
+    def writeLine(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text) + 1
+
+        if self.size >= self.bufferSize:
+            self.flush()
+        elif self.lineBuffered is None:
+            # decided on the first write, when the stream in use is known
+            stream = self.stream or sys.stdout
+            self.lineBuffered = stream.isatty() if hasattr(stream, "isatty") else False
+            if self.lineBuffered:
+                self.flush()
+        elif self.lineBuffered:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.parts:
+            return
+
+        parts = self.parts
+        self.parts = []
+        self.size = 0
+
+        stream = self.stream or sys.stdout
+        parts.append("")
+        stream.write("\n".join(parts))
+        stream.flush()
+
+class CaptureSink:
+
+    # Keeps everything in memory for the embedder to pick up; nothing is
+    # ever written anywhere.
+
+    def __init__(self):
+        self.lines: list[str] = []
+        self.writeLine = self.lines.append
+
+    def flush(self) -> None:
+        pass
+
+    def getvalue(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+    def clear(self) -> None:
+        self.lines.clear()
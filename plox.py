@@ -1,10 +1,24 @@
 from __future__ import annotations
 from enum import Enum
+from typing import Iterable, Iterator, Mapping
 import sys
 
 from AST import *
 from STMT import *
-from environment import Environment
+from environment import Environment, ArrayEnvironment
+from resolver import Resolver
+from optimizer import Optimizer
+from regexScanner import RegexScanner
+from tokenStore import CompactScanner, TokenStore, typesByCode
+from scriptCache import ScriptCache
+from closureCompiler import ClosureCompiler
+from vm import VM
+from transpiler import Transpiler
+from outputSink import BufferedSink, CaptureSink
+from rope import Rope, concat
+from natives import natives
+from loxClass import LoxClass, LoxInstance, Shape
+from ploxRuntime import LoxCallable, LoxRuntimeError, isEqual, isTruthy, stringify, toLoxValue
 from treePrinter import ASTPrinter
 from ploxTokens import *
 
@@ -35,7 +49,7 @@ class Scanner:
 
         return False
 
-    def peek(self, dist: int = 1):
+    def peek(self, dist: int = 0):
         if self.current + dist >= len(self.source):
             return '\0'
         return self.source[self.current + dist]
@@ -50,39 +64,18 @@ class Scanner:
 
         def number():
             while self.peek().isnumeric(): self.advance()
-            if self.peek() == '.' and self.peek(2).isnumeric():
+            if self.peek() == '.' and self.peek(1).isnumeric():
                 self.advance()
                 while self.peek().isnumeric(): self.advance()
-            self.advance()
-            self.addToken(tokenType.number, float(self.source[self.start:self.current-1]))
+            self.addToken(tokenType.number, float(self.source[self.start:self.current]))
 
         def identifier():
-            while self.peek().isalnum():
+            while self.peek().isalnum() or self.peek() == '_':
                 self.advance()
-            self.advance()
-
-            keywordMap = {
-                "and": tokenType.AND,
-                "class": tokenType.CLASS,
-                "else": tokenType.ELSE,
-                "false": tokenType.FALSE,
-                "fun": tokenType.FUN,
-                "for": tokenType.FOR,
-                "if": tokenType.IF,
-                "nil": tokenType.NIL,
-                "or": tokenType.OR,
-                "print": tokenType.PRINT,
-                "return": tokenType.RETURN,
-                "super": tokenType.SUPER,
-                "this": tokenType.THIS,
-                "true": tokenType.TRUE,
-                "var": tokenType.VAR,
-                "while": tokenType.WHILE
-            }
 
             text = self.source[self.start:self.current]
-            if text in keywordMap:
-                self.addToken(keywordMap[text])
+            if text in keywords:
+                self.addToken(keywords[text])
             else:
                 self.addToken(tokenType.identifier, literal=text)
 
@@ -122,7 +115,7 @@ class Scanner:
                 if not self.match('/'):
                     self.addToken(tokenType.slash)
                 else:
-                    while self.source[self.current] != '\n' and self.current < len(self.source):
+                    while self.current < len(self.source) and self.source[self.current] != '\n':
                         self.current += 1
             case('\r'):
                 pass
@@ -134,87 +127,137 @@ class Scanner:
                 self.line += 1
                 pass
             case('"'):
-                self.current += 1
-                tmp: str = ""
                 while self.current < len(self.source) and self.source[self.current] != '"':
-                    tmp += self.source[self.current]
-                    if tmp == '\n':
+                    if self.source[self.current] == '\n':
                         self.line += 1
                     self.current += 1
-                
+
+                # slice once instead of growing a string a character at a time
+                value = self.source[self.start + 1:self.current]
+
                 if self.current < len(self.source):
                     self.current += 1
 
-                self.addToken(tokenType.string, tmp)
+                self.addToken(tokenType.string, value)
             case _:
                 if c.isnumeric():
                     number()
-                elif c.isalpha():
+                elif c.isalpha() or c == '_':
                     identifier()
                 else:
-                    self.lox_inst.error(self.lox_inst, self.line, "invalid character")
+                    self.lox_inst.report(self.line, "", "invalid character")
 
     def scanTokens(self):
         while self.current < len(self.source):
             self.start = self.current
             self.scanToken()
+        self.start = self.current
         self.addToken(tokenType.EOF)
         return self.tokens
 
+    # Same tokens as scanTokens(), handed out as soon as each one is scanned
+    # so a Parser can start before the whole source has been tokenized.
+    def iterTokens(self):
+        while self.current < len(self.source):
+            self.start = self.current
+            self.scanToken()
+            if self.tokens:
+                yield from self.tokens
+                self.tokens.clear()
+        self.start = self.current
+        self.addToken(tokenType.EOF)
+        yield from self.tokens
+        self.tokens.clear()
+
 class ParserError(RuntimeError):
     pass
-    
-class LoxRuntimeError(RuntimeError):
-    def __init__(self, token: Token, msg: str):
-        super().__init__(msg)
-        self.token = token
-        self.msg = msg
 
 class Parser:
 
-    def __init__(self, lox_inst: lox, tokens: list[Token]):
+    # The parser only ever looks at the current token and the one before it,
+    # so it pulls tokens one at a time from any iterable (a list or a
+    # generator) rather than indexing into a list. A TokenStore is read in
+    # place instead: token types straight out of its arrays, and a Token is
+    # only made for a token the parser hands on to the tree or to an error
+    # message, so punctuation and keywords never become objects at all.
+    # Anything that just moves past a token uses step() or expect(), which
+    # don't make one; peek(), previous(), advance() and consume() do.
+
+    def __init__(self, lox_inst: lox, tokens: Iterable[Token]):
         self.lox_inst: lox = lox_inst
-        self.tokens: list[Token] = tokens
-        self.current: int = 0
+        self.store: TokenStore|None = tokens if isinstance(tokens, TokenStore) else None
+        # the store's index of the current token
+        self.index: int = 0
+        if self.store is None:
+            self.tokens: Iterator[Token] = iter(tokens)
+            self.__current: Token|None = next(self.tokens)
+            self.__currentType: tokenType = self.__current.type
+        else:
+            self.__current = None
+            self.__currentType = typesByCode[self.store.types[0]]
+        self.__previous: Token|None = None
 
     def error(self, tok: Token, msg: str):
         self.lox_inst.error(tok, msg)
         raise ParserError
 
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        if self.__current is None:
+            self.__current = self.store[self.index]
+        return self.__current
+
+    def peekType(self) -> tokenType:
+        return self.__currentType
 
     def previous(self) -> Token:
-        return self.tokens[self.current - 1]
+        if self.__previous is None and self.index > 0:
+            self.__previous = self.store[self.index - 1]
+        return self.__previous
 
     def isAtEnd(self) -> bool:
-        return self.peek().type == tokenType.EOF
+        return self.__currentType is tokenType.EOF
+
+    # moves to the next token without making a Token for the one passed
+    def step(self) -> None:
+        if self.__currentType is tokenType.EOF:
+            return
+        if self.store is None:
+            self.__previous = self.__current
+            self.__current = next(self.tokens)
+            self.__currentType = self.__current.type
+        else:
+            self.__previous = None
+            self.__current = None
+            self.index += 1
+            self.__currentType = typesByCode[self.store.types[self.index]]
 
     def advance(self) -> Token:
-        if not self.isAtEnd():
-            self.current += 1
+        self.step()
         return self.previous()
 
     def check(self, type: tokenType) -> bool:
-        if self.isAtEnd():
-            return False
-        else:
-            # print(f"check {self.peek().type} == {type} ? {self.peek().type == type}")
-            return self.peek().type == type
+        return self.__currentType is type and type is not tokenType.EOF
 
-    def consume(self, type: tokenType, message: str):
+    def consume(self, type: tokenType, message: str) -> Token:
         if self.check(type): return self.advance()
         self.error(self.peek(), message)
 
+    # consume() for a token nothing keeps
+    def expect(self, type: tokenType, message: str) -> None:
+        if self.check(type):
+            self.step()
+        else:
+            self.error(self.peek(), message)
+
     def synchronize(self):
-        self.advance()
+        self.step()
 
         while not self.isAtEnd():
 
             if self.previous().type == tokenType.semicolon:
                 return
             
-            if self.peek().type not in [
+            if self.peekType() not in [
                 tokenType.CLASS,
                 tokenType.FUN,
                 tokenType.FOR,
@@ -225,17 +268,17 @@ class Parser:
                 tokenType.RETURN]:
                 return
             
-            self.advance()
+            self.step()
 
     def match(self, tokenTypes: list[tokenType]|tokenType) -> bool:
         if isinstance(tokenTypes, tokenType):
             if self.check(tokenTypes):
-                self.advance()
+                self.step()
                 return True
         else:
             for type in tokenTypes:
                 if self.check(type):
-                    self.advance()
+                    self.step()
                     return True
         return False
 
@@ -269,6 +312,8 @@ class Parser:
             if isinstance(expr, Variable):
                 name: Token = expr.name
                 return Assign(name, value)
+            if isinstance(expr, Get):
+                return Set(expr.object, expr.name, value)
             
             self.error(equals, "Bad assignment target.")
 
@@ -323,35 +368,70 @@ class Parser:
             right = self.unary()
             return Unary(operator, right)
         
-        return self.primary()
+        return self.call()
+
+    def call(self):
+        expr = self.primary()
+
+        while True:
+            if self.match(tokenType.paren_l):
+                expr = self.finishCall(expr)
+            elif self.match(tokenType.dot):
+                name = self.consume(tokenType.identifier, "expected property name after '.'")
+                expr = Get(expr, name)
+            else:
+                return expr
+
+    def finishCall(self, callee: Expr) -> Expr:
+        arguments: list[Expr] = []
+
+        if not self.check(tokenType.paren_r):
+            arguments.append(self.expression())
+            while self.match(tokenType.comma):
+                if len(arguments) >= 255:
+                    # reported but not raised, the parser isn't confused
+                    self.lox_inst.error(self.peek(), "can't have more than 255 arguments")
+                arguments.append(self.expression())
+
+        paren = self.consume(tokenType.paren_r, "expected ')' after arguments")
+        return Call(callee, paren, arguments)
 
     def primary(self):
 
         if self.match([tokenType.FALSE]): return Literal(False)
         if self.match([tokenType.TRUE]): return Literal(True)
-        if self.match([tokenType.NIL]): return Literal(tokenType.NIL)
+        if self.match([tokenType.NIL]): return Literal(None)
 
         if self.match([tokenType.string, tokenType.number]):
             return Literal(self.previous().literal)
     
+        if self.match([tokenType.THIS]):
+            return This(self.previous())
+
+        if self.match([tokenType.SUPER]):
+            keyword = self.previous()
+            self.expect(tokenType.dot, "expected '.' after 'super'")
+            method = self.consume(tokenType.identifier, "expected superclass method name")
+            return Super(keyword, method)
+
         if self.match([tokenType.identifier]):
             return Variable(self.previous())
     
         if self.match([tokenType.paren_l]):
             expr = self.expression()
-            self.consume(tokenType.paren_r, "expected ')' after expression")
+            self.expect(tokenType.paren_r, "expected ')' after expression")
             return Grouping(expr)
 
         self.error(self.peek(), "expected expression")
 
     def __printStatement(self) -> Stmt:
         value: Expr = self.expression()
-        self.consume(tokenType.semicolon, "Expect ; after value.")
+        self.expect(tokenType.semicolon, "Expect ; after value.")
         return Print(value)
     
     def __expressionStatement(self) -> Stmt:
         expr: Expr = self.expression()
-        self.consume(tokenType.semicolon, "Expect ; after expression.")
+        self.expect(tokenType.semicolon, "Expect ; after expression.")
         return Expression(expr)
     
     def __block(self):
@@ -360,13 +440,13 @@ class Parser:
         while (not self.check(tokenType.brace_r)) and (not self.isAtEnd()):
             statements.append(self.__declaration())
 
-        self.consume(tokenType.brace_r, "icl you need a } somewhere here.")
+        self.expect(tokenType.brace_r, "icl you need a } somewhere here.")
         return statements
 
     def __ifStatement(self):
-        self.consume(tokenType.paren_l, "where's the ( after 'if'?")
+        self.expect(tokenType.paren_l, "where's the ( after 'if'?")
         condition = self.expression()
-        self.consume(tokenType.paren_r, "hey twin, i think you forgot the ) after your condition")
+        self.expect(tokenType.paren_r, "hey twin, i think you forgot the ) after your condition")
 
         thenBranch = self.__statement()
         elseBranch = None
@@ -377,17 +457,17 @@ class Parser:
 
     def __whileStatement(self):
 
-        self.consume(tokenType.paren_l, "errm, twinnum... i think you forgot a '(' after while")
+        self.expect(tokenType.paren_l, "errm, twinnum... i think you forgot a '(' after while")
         condition = self.expression()
-        self.consume(tokenType.paren_r, "ok atp this has to be intentional bruh, where's the ')' after your condition")
+        self.expect(tokenType.paren_r, "ok atp this has to be intentional bruh, where's the ')' after your condition")
 
         body = self.__statement()
 
-        return While(condition, body)
+        return While(condition, body, None)
 
     def __forStatement(self):
 
-        self.consume(tokenType.paren_l, "twin... how are you forgetting your '(' before the for loop...")
+        self.expect(tokenType.paren_l, "twin... how are you forgetting your '(' before the for loop...")
         initializer = None
 
         if self.match(tokenType.semicolon):
@@ -400,25 +480,22 @@ class Parser:
         condition: Expr = None
         if not self.check(tokenType.semicolon):
             condition = self.expression()
-        self.consume(tokenType.semicolon, "are we fr. where the FUCK is your ';' following the loop condition")
+        self.expect(tokenType.semicolon, "are we fr. where the FUCK is your ';' following the loop condition")
 
         increment = None
         if not self.check(tokenType.paren_r):
             increment = self.expression()
 
-        self.consume(tokenType.paren_r, "come on man, where's the ')' after your clauses")
+        self.expect(tokenType.paren_r, "come on man, where's the ')' after your clauses")
 
         body = self.__statement()
 
-        if increment is not None:
-            body = Block(
-                [body, Expression(increment)]
-            )
-
         if condition is None:
             condition = Literal(True)
         
-        body = While(condition, body)
+        # the increment stays on the While rather than going in a block with
+        # the body, so running it doesn't cost a block every iteration
+        body = While(condition, body, increment)
 
         if initializer is not None:
             body = Block([initializer, body])
@@ -426,10 +503,21 @@ class Parser:
         return body
 
 
+    def __returnStatement(self) -> Stmt:
+        keyword = self.previous()
+
+        value = None
+        if not self.check(tokenType.semicolon):
+            value = self.expression()
+
+        self.expect(tokenType.semicolon, "expected ';' after return value")
+        return Return(keyword, value)
+
     def __statement(self) -> Stmt:
         if self.match([tokenType.FOR]): return self.__forStatement()
         if self.match([tokenType.IF]): return self.__ifStatement()
         if self.match([tokenType.PRINT]): return self.__printStatement()
+        if self.match([tokenType.RETURN]): return self.__returnStatement()
         if self.match([tokenType.WHILE]): return self.__whileStatement()
         if self.match([tokenType.brace_l]): return Block(self.__block())
         
@@ -437,6 +525,10 @@ class Parser:
 
     def __declaration(self) -> Stmt:
         try:
+            if self.match([tokenType.CLASS]):
+                return self.__classDeclaration()
+            if self.match([tokenType.FUN]):
+                return self.__function("function")
             if self.match([tokenType.VAR]):
                 return self.__varDeclaration()
             return self.__statement()
@@ -444,6 +536,40 @@ class Parser:
             self.synchronize()
             raise err
     
+    def __classDeclaration(self) -> Stmt:
+        name: Token = self.consume(tokenType.identifier, "expected class name")
+
+        superclass = None
+        if self.match(tokenType.lesser):
+            superclass = Variable(self.consume(tokenType.identifier, "expected superclass name"))
+
+        self.expect(tokenType.brace_l, "a class body starts with '{'")
+
+        methods: list[Function] = []
+        while not self.check(tokenType.brace_r) and not self.isAtEnd():
+            methods.append(self.__function("method"))
+
+        self.expect(tokenType.brace_r, "icl you need a } after the class body.")
+        return Class(name, superclass, methods)
+
+    def __function(self, kind: str) -> Stmt:
+        name: Token = self.consume(tokenType.identifier, f"expected {kind} name")
+        self.expect(tokenType.paren_l, f"where's the '(' after the {kind} name?")
+
+        params: list[Token] = []
+        if not self.check(tokenType.paren_r):
+            params.append(self.consume(tokenType.identifier, "expected parameter name"))
+            while self.match(tokenType.comma):
+                if len(params) >= 255:
+                    self.lox_inst.error(self.peek(), "can't have more than 255 parameters")
+                params.append(self.consume(tokenType.identifier, "expected parameter name"))
+
+        self.expect(tokenType.paren_r, "expected ')' after parameters")
+        self.expect(tokenType.brace_l, f"a {kind} body starts with '{{'")
+        body = self.__block()
+
+        return Function(name, params, body)
+
     def __varDeclaration(self) -> Stmt:
         name: Token = self.consume(tokenType.identifier, "Expecte variable name! ts pmo...");
         
@@ -451,7 +577,7 @@ class Parser:
         if self.match([tokenType.equal]):
             initializer = self.expression()
     
-        self.consume(tokenType.semicolon, "SYBAU And add a semicolon (;) after variable declaration bruh")
+        self.expect(tokenType.semicolon, "SYBAU And add a semicolon (;) after variable declaration bruh")
         
         return Var(name, initializer)
     
@@ -464,15 +590,225 @@ class Parser:
         
         return statements
 
+    # parse() one top level declaration at a time
+    def statements(self):
+        while not self.isAtEnd():
+            yield self.__declaration()
+
+# binding power of each level of the expression grammar, loosest first
+precNone = 0
+precAssignment = 1
+precOr = 2
+precAnd = 3
+precEquality = 4
+precComparison = 5
+precTerm = 6
+precFactor = 7
+precUnary = 8
+precCall = 9
+
+class PrattParser(Parser):
+
+    # Parser with the expression grammar (assignment down to primary) done
+    # by one precedence climbing loop over prefixRules and infixRules below,
+    # instead of a method per precedence level that each match() a list of
+    # token types. A token is looked up once, in a dict, whatever level it
+    # ends up at. Statements are parsed by Parser as before, and the trees
+    # and errors are the same.
+
+    def expression(self) -> Expr:
+        return self.parsePrecedence(precAssignment)
+
+    def parsePrecedence(self, precedence: int) -> Expr:
+        prefix = prefixRules.get(self.peekType())
+        if prefix is None:
+            self.error(self.peek(), "expected expression")
+        self.step()
+        expr = prefix(self)
+
+        while True:
+            rule = infixRules.get(self.peekType())
+            if rule is None or rule[0] < precedence:
+                return expr
+            self.step()
+            expr = rule[1](self, expr)
+
+    # Rules run with the token that picked them just passed, and only ask
+    # previous() for it when it goes into the tree.
+
+    def parseLiteral(self) -> Expr:
+        return Literal(self.previous().literal)
+
+    def parseVariable(self) -> Expr:
+        return Variable(self.previous())
+
+    def parseThis(self) -> Expr:
+        return This(self.previous())
+
+    def parseSuper(self) -> Expr:
+        keyword = self.previous()
+        self.expect(tokenType.dot, "expected '.' after 'super'")
+        method = self.consume(tokenType.identifier, "expected superclass method name")
+        return Super(keyword, method)
+
+    def parseGrouping(self) -> Expr:
+        expr = self.expression()
+        self.expect(tokenType.paren_r, "expected ')' after expression")
+        return Grouping(expr)
+
+    def parseUnary(self) -> Expr:
+        return Unary(self.previous(), self.parsePrecedence(precUnary))
+
+    def parseBinary(self, left: Expr) -> Expr:
+        operator = self.previous()
+        # left associative: the right operand only takes tighter operators
+        return Binary(left, operator, self.parsePrecedence(infixRules[operator.type][0] + 1))
+
+    def parseLogical(self, left: Expr) -> Expr:
+        operator = self.previous()
+        return Logical(left, operator, self.parsePrecedence(infixRules[operator.type][0] + 1))
+
+    def parseAssign(self, target: Expr) -> Expr:
+        equals = self.previous()
+        # right associative, and like Parser the value is parsed before the
+        # target is checked
+        value = self.parsePrecedence(precAssignment)
+
+        if isinstance(target, Variable):
+            return Assign(target.name, value)
+        if isinstance(target, Get):
+            return Set(target.object, target.name, value)
+
+        self.error(equals, "Bad assignment target.")
+
+    def parseCall(self, callee: Expr) -> Expr:
+        return self.finishCall(callee)
+
+    def parseGet(self, object: Expr) -> Expr:
+        name = self.consume(tokenType.identifier, "expected property name after '.'")
+        return Get(object, name)
+
+# token that can start an expression -> parses the rest of it
+prefixRules = {
+    tokenType.number: PrattParser.parseLiteral,
+    tokenType.string: PrattParser.parseLiteral,
+    tokenType.FALSE: lambda parser: Literal(False),
+    tokenType.TRUE: lambda parser: Literal(True),
+    tokenType.NIL: lambda parser: Literal(None),
+    tokenType.identifier: PrattParser.parseVariable,
+    tokenType.THIS: PrattParser.parseThis,
+    tokenType.SUPER: PrattParser.parseSuper,
+    tokenType.paren_l: PrattParser.parseGrouping,
+    tokenType.bang: PrattParser.parseUnary,
+    tokenType.minus: PrattParser.parseUnary,
+}
+
+# token that can follow an expression -> (precedence, parses the rest given
+# the expression so far)
+infixRules = {
+    tokenType.equal: (precAssignment, PrattParser.parseAssign),
+    tokenType.OR: (precOr, PrattParser.parseLogical),
+    tokenType.AND: (precAnd, PrattParser.parseLogical),
+    tokenType.bang_equal: (precEquality, PrattParser.parseBinary),
+    tokenType.equal_equal: (precEquality, PrattParser.parseBinary),
+    tokenType.greater: (precComparison, PrattParser.parseBinary),
+    tokenType.greater_equal: (precComparison, PrattParser.parseBinary),
+    tokenType.lesser: (precComparison, PrattParser.parseBinary),
+    tokenType.lesser_equal: (precComparison, PrattParser.parseBinary),
+    tokenType.minus: (precTerm, PrattParser.parseBinary),
+    tokenType.plus: (precTerm, PrattParser.parseBinary),
+    tokenType.slash: (precFactor, PrattParser.parseBinary),
+    tokenType.star: (precFactor, PrattParser.parseBinary),
+    tokenType.paren_l: (precCall, PrattParser.parseCall),
+    tokenType.dot: (precCall, PrattParser.parseGet),
+}
+
+class ReturnValue:
+
+    # What a statement hands back when it ends abnormally. Executing a
+    # statement normally returns None; `return` returns one of these instead,
+    # and every statement that runs other statements (blocks, loops, ifs)
+    # stops and passes it straight up, until the call that ran the function
+    # body takes the value out. Unwinding this way costs a compare per
+    # statement instead of raising through every try/finally in between.
+    __slots__ = ("value",)
+
+    def __init__(self, value: object):
+        self.value = value
+
+class LoxFunction(LoxCallable):
+
+    # A Lox function plus the scope it was declared in. Calling it makes one
+    # frame holding the parameters, then the body's own locals, in the slots
+    # the resolver gave them; the arguments are copied into the first slots
+    # in one go. Methods get bound to an instance by wrapping the closure in
+    # a one slot scope holding `this`.
+
+    thisNames = ("this",)
+
+    def __init__(self, declaration: Function, closure: Environment|ArrayEnvironment,
+                 isInitializer: bool = False, scopeType: type = ArrayEnvironment):
+        self.declaration: Function = declaration
+        self.closure: Environment|ArrayEnvironment = closure
+        self.isInitializer: bool = isInitializer
+        self.scopeType: type = scopeType
+        self.arity: int = len(declaration.params)
+
+    def bind(self, instance: LoxInstance) -> LoxFunction:
+        environment = self.scopeType(self.closure, self.thisNames)
+        environment.defineAt(0, "this", instance)
+        return LoxFunction(self.declaration, environment, self.isInitializer, self.scopeType)
+
+    def call(self, interpreter: Interpreter, arguments: list[object]) -> object:
+        frame = self.scopeType(self.closure, self.declaration.slotNames)
+        frame.bind(arguments)
+        completion = interpreter.executeBlock(self.declaration.body, frame)
+        if self.isInitializer:
+            # init() always hands back the instance, even from a bare return
+            return self.closure.getAt(0, 0, "this")
+        if completion is not None:
+            return completion.value
+        return None
+
+    def __str__(self) -> str:
+        return f"<fn {self.declaration.name.lexeme}>"
+
 class Interpreter(Expr.Visitor, Stmt.Visitor):
 
-    def __init__(self, lox_inst: lox):
+    def __init__(self, lox_inst: lox, scopeType: type = ArrayEnvironment):
         self.lox_inst: lox = lox_inst
-        self.environment: Environment = Environment()
+        self.output = lox_inst.output
+        # block scopes are ArrayEnvironments unless told otherwise, globals
+        # always stay a dict since they're looked up by name
+        self.scopeType: type = scopeType
+        self.globals: Environment = Environment()
+        self.environment: Environment = self.globals
+        # visit methods indexed by node kind, so evaluate and execute skip accept()
+        self.exprTable: list = exprDispatch(self)
+        self.stmtTable: list = stmtDispatch(self)
+        # every instance this interpreter makes starts out with this shape
+        self.rootShape: Shape = Shape({})
+
+        for name, function in natives.items():
+            self.globals.define(name, function)
     
     def visitWhileStmt(self, stmt):
-        while self.isTruthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.body)
+        condition = stmt.condition
+        body = stmt.body
+        increment = stmt.increment
+
+        if increment is None:
+            while self.isTruthy(self.evaluate(condition)):
+                completion = self.execute(body)
+                if completion is not None:
+                    return completion
+            return None
+
+        while self.isTruthy(self.evaluate(condition)):
+            completion = self.execute(body)
+            if completion is not None:
+                return completion
+            self.evaluate(increment)
         return None
 
     def visitLogicalExpr(self, expr):
@@ -487,29 +823,44 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
 
     def visitIfStmt(self, stmt: If):
         if self.isTruthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.thenBranch)
+            return self.execute(stmt.thenBranch)
         elif stmt.elseBranch is not None:
-            self.execute(stmt.elseBranch)
+            return self.execute(stmt.elseBranch)
         return None
 
     def visitBlockStmt(self, stmt):
-        self.__executeBlock(stmt.statements, Environment(self.environment))
-
-    def __executeBlock(self, statements: list[Stmt], environment: Environment):
+        if stmt.slotNames is None:
+            # declares nothing, so the resolver gave it no scope
+            for statement in stmt.statements:
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+            return None
+        return self.executeBlock(stmt.statements, self.scopeType(self.environment, stmt.slotNames))
+
+    # runs statements until one of them completes abnormally (see ReturnValue)
+    # and returns that completion, or None
+    def executeBlock(self, statements: list[Stmt], environment: Environment) -> ReturnValue|None:
         previous: Environment = self.environment
 
         try:
 
             self.environment = environment
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
             
         finally:
             self.environment = previous
+        return None
 
     def visitAssignExpr(self, expr):
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+        if expr.depth is None:
+            self.globals.assign(expr.name, value)
+        else:
+            self.environment.assignAt(expr.depth, expr.slot, expr.name.lexeme, value)
         return value
 
     def visitVarStmt(self, stmt: Var):
@@ -517,18 +868,207 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         if stmt.initializer is not None:
             value = self.evaluate(stmt.initializer)
         
-        self.environment.define(stmt.name.lexeme, value)
+        if stmt.slot is None:
+            self.environment.define(stmt.name.lexeme, value)
+        else:
+            self.environment.defineAt(stmt.slot, stmt.name.lexeme, value)
         return None
     
+    def visitFunctionStmt(self, stmt: Function):
+        function = LoxFunction(stmt, self.environment, False, self.scopeType)
+        if stmt.slot is None:
+            self.environment.define(stmt.name.lexeme, function)
+        else:
+            self.environment.defineAt(stmt.slot, stmt.name.lexeme, function)
+        return None
+
+    def visitReturnStmt(self, stmt: Return):
+        value = None
+        if stmt.value is not None:
+            value = self.evaluate(stmt.value)
+        return ReturnValue(value)
+
+    def visitCallExpr(self, expr: Call):
+        callee = expr.callee
+        if type(callee) is Get:
+            # obj.method(...): a method hit in the Get's cache is run straight
+            # on the instance, without making a bound LoxFunction first
+            instance = self.evaluate(callee.object)
+            cache = callee.cache
+            if (type(instance) is LoxInstance and cache is not None and cache[0] is instance.shape
+                    and len(cache) == 3 and cache[1] is instance.klass):
+                arguments = [self.evaluate(argument) for argument in expr.arguments]
+                return self.invokeOp(expr, cache[2], instance, arguments)
+            callee = self.getOp(callee, instance)
+        else:
+            callee = self.evaluate(callee)
+        arguments = [self.evaluate(argument) for argument in expr.arguments]
+        return self.callOp(expr, callee, arguments)
+
+    # what method.bind(instance) then calling it does, minus the LoxFunction
+    def invokeOp(self, expr: Call, method: LoxFunction, instance: LoxInstance, arguments: list[object]) -> object:
+        declaration = method.declaration
+        if len(arguments) != method.arity:
+            raise LoxRuntimeError(expr.paren, f"expected {method.arity} arguments but got {len(arguments)}")
+
+        this = self.scopeType(method.closure, LoxFunction.thisNames)
+        this.defineAt(0, "this", instance)
+        frame = self.scopeType(this, declaration.slotNames)
+        frame.bind(arguments)
+        completion = self.executeBlock(declaration.body, frame)
+        if method.isInitializer:
+            return instance
+        if completion is not None:
+            return completion.value
+        return None
+
+    def callOp(self, expr: Call, callee: object, arguments: list[object]) -> object:
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(expr.paren, "can only call functions and classes")
+        if len(arguments) != callee.arity:
+            raise LoxRuntimeError(expr.paren, f"expected {callee.arity} arguments but got {len(arguments)}")
+
+        if type(callee) is LoxFunction and not callee.isInitializer:
+            # the common case, without going through call()
+            declaration = callee.declaration
+            frame = self.scopeType(callee.closure, declaration.slotNames)
+            frame.bind(arguments)
+            completion = self.executeBlock(declaration.body, frame)
+            if completion is not None:
+                return completion.value
+            return None
+
+        return callee.call(self, arguments)
+
+    def visitClassStmt(self, stmt: Class):
+        superclass = None
+        if stmt.superclass is not None:
+            superclass = self.evaluate(stmt.superclass)
+            if not isinstance(superclass, LoxClass):
+                raise LoxRuntimeError(stmt.superclass.name, "superclass must be a class")
+
+        # methods close over a scope holding `super`, the resolver put it there
+        environment = self.environment
+        if superclass is not None:
+            environment = self.scopeType(environment, ("super",))
+            environment.defineAt(0, "super", superclass)
+
+        methods = {}
+        for method in stmt.methods:
+            methods[method.name.lexeme] = LoxFunction(method, environment, method.name.lexeme == "init", self.scopeType)
+
+        klass = LoxClass(stmt.name.lexeme, superclass, methods, self.rootShape)
+        if stmt.slot is None:
+            self.environment.define(stmt.name.lexeme, klass)
+        else:
+            self.environment.defineAt(stmt.slot, stmt.name.lexeme, klass)
+        return None
+
+    # Get and Set keep an inline cache on their node, a single tuple so it's
+    # always read and replaced whole. For Get:
+    #   (shape, slot)                a field, valid for instances of that shape
+    #   (shape, klass, method)       a method, valid while the instance has
+    #                                that shape (so no field hides it) and is
+    #                                of that class (shapes are shared between
+    #                                classes)
+    # and for Set:
+    #   (shape, slot, None)          an existing field
+    #   (shape, slot, nextShape)     adding a field, which goes at the end
+    # Shapes never change and neither do a class's methods, so a hit is
+    # always right, whichever run filled the cache. The visit methods repeat
+    # getOp() and setOp()'s hit paths inline, which saves a Python call on
+    # every hit; a method hit directly under a Call is handled there instead.
+    def visitGetExpr(self, expr: Get):
+        instance = self.evaluate(expr.object)
+        cache = expr.cache
+        if cache is not None and type(instance) is LoxInstance and cache[0] is instance.shape:
+            if len(cache) == 2:
+                return instance.values[cache[1]]
+            if cache[1] is instance.klass:
+                return cache[2].bind(instance)
+        return self.getProperty(expr, instance)
+
+    def getOp(self, expr: Get, instance: object) -> object:
+        if type(instance) is LoxInstance:
+            cache = expr.cache
+            if cache is not None and cache[0] is instance.shape:
+                if len(cache) == 2:
+                    return instance.values[cache[1]]
+                if cache[1] is instance.klass:
+                    return cache[2].bind(instance)
+        return self.getProperty(expr, instance)
+
+    def getProperty(self, expr: Get, instance: object) -> object:
+        if not isinstance(instance, LoxInstance):
+            raise LoxRuntimeError(expr.name, "only instances have properties")
+
+        name = expr.name.lexeme
+        shape = instance.shape
+        slot = shape.fields.get(name)
+        if slot is not None:
+            expr.cache = (shape, slot)
+            return instance.values[slot]
+
+        method = instance.klass.findMethod(name)
+        if method is not None:
+            expr.cache = (shape, instance.klass, method)
+            return method.bind(instance)
+
+        raise LoxRuntimeError(expr.name, f"undefined property {name}")
+
+    def visitSetExpr(self, expr: Set):
+        instance = self.evaluate(expr.object)
+        if type(instance) is not LoxInstance:
+            raise LoxRuntimeError(expr.name, "only instances have fields")
+
+        value = self.evaluate(expr.value)
+        cache = expr.cache
+        if cache is not None and cache[0] is instance.shape and cache[2] is None:
+            instance.values[cache[1]] = value
+            return value
+        return self.setOp(expr, instance, value)
+
+    def setOp(self, expr: Set, instance: LoxInstance, value: object) -> object:
+        cache = expr.cache
+        shape = instance.shape
+        if cache is None or cache[0] is not shape:
+            slot = shape.fields.get(expr.name.lexeme)
+            if slot is None:
+                nextShape = shape.withField(expr.name.lexeme)
+                cache = expr.cache = (shape, nextShape.fields[expr.name.lexeme], nextShape)
+            else:
+                cache = expr.cache = (shape, slot, None)
+
+        if cache[2] is None:
+            instance.values[cache[1]] = value
+        else:
+            instance.shape = cache[2]
+            instance.values.append(value)
+        return value
+
+    def visitThisExpr(self, expr: This):
+        return self.environment.getAt(expr.depth, expr.slot, "this")
+
+    def visitSuperExpr(self, expr: Super):
+        superclass = self.environment.getAt(expr.depth, expr.slot, "super")
+        # `this` is always in the scope just inside the one holding `super`
+        instance = self.environment.getAt(expr.depth - 1, 0, "this")
+        method = superclass.findMethod(expr.method.lexeme)
+        if method is None:
+            raise LoxRuntimeError(expr.method, f"undefined property {expr.method.lexeme}")
+        return method.bind(instance)
+
     def visitVariableExpr(self, expr: Variable):
-        return self.environment.get(expr.name)
+        if expr.depth is None:
+            return self.globals.get(expr.name)
+        return self.environment.getAt(expr.depth, expr.slot, expr.name.lexeme)
 
     def visitExpressionStmt(self, stmt: Expression) -> None:
         self.evaluate(stmt.expression)
         
     def visitPrintStmt(self, stmt: Print):
         val = self.evaluate(stmt.expression)
-        print(self.stringify(val))
+        self.output.writeLine(self.stringify(val))
 
     def visitLiteralExpr(self, expr: Literal):
         return expr.value
@@ -537,53 +1077,61 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         return self.evaluate(expr.expression)
 
     def visitUnaryExpr(self, expr: Unary) -> object:
+        return self.unaryOp(expr.operator, self.evaluate(expr.right))
+
+    def visitBinaryExpr(self, expr: Binary):
+        left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
-        
-        match(right.operator.type):
+        return self.binaryOp(expr.operator, left, right)
+
+    # the operators on already evaluated operands, split out so subclasses
+    # that evaluate operands themselves can fall back on them
+    def unaryOp(self, operator: Token, right: object) -> object:
+        match(operator.type):
             case(tokenType.minus):
+                self.checkNumberOperand(operator, right)
                 return -float(right)
             case(tokenType.bang):
                 return not self.isTruthy(right)
         return None
 
-    def visitBinaryExpr(self, expr: Binary):
-        left = self.evaluate(expr.left)
-        right = self.evaluate(expr.right)
-
-        match(expr.operator.type):
+    def binaryOp(self, operator: Token, left: object, right: object) -> object:
+        match(operator.type):
             case(tokenType.minus):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
                 return float(left) - float(right)
             case(tokenType.slash):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
+                if right == 0:
+                    raise LoxRuntimeError(operator, "division by zero")
                 return float(left) / float(right)
             case(tokenType.star):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
                 return float(left) * float(right)
             case(tokenType.plus):
                 if isinstance(left, float) and isinstance(right, float):
                     return float(left) + float(right)
-                if isinstance(left, str) and isinstance(right, str):
-                    return str(left) + str(right)
+                if isinstance(left, (str, Rope)) and isinstance(right, (str, Rope)):
+                    return concat(left, right)
                 
-                raise LoxRuntimeError(expr.operator, "operands must be two numbers or strings")
+                raise LoxRuntimeError(operator, "operands must be two numbers or strings")
             
             case(tokenType.greater):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
                 return float(left) > float(right)
             case(tokenType.greater_equal):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
                 return float(left) >= float(right)
             case(tokenType.lesser):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
                 return float(left) < float(right)
             case(tokenType.lesser_equal):
-                self.checkNumberOperands(expr.operator, left, right)
+                self.checkNumberOperands(operator, left, right)
                 return float(left) <= float(right)
             
             case(tokenType.bang_equal):
                 return not self.isEqual(left, right)
-            case(tokenType.equal):
+            case(tokenType.equal_equal):
                 return self.isEqual(left, right)
             
         return None
@@ -596,30 +1144,15 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         if isinstance(left, float) and isinstance(right, float): return
         raise LoxRuntimeError(operator, "operand must be a number")
 
-    def isEqual(self, left: object, right: object) -> bool:
-        if left is None and right is None: return True
-        if left is None: return False
-
-        return left == right
-
-    def isTruthy(self, obj: object) -> bool:
-        if obj is None: return False
-        if isinstance(obj, bool): return bool(obj)
-        return True
-
-    def stringify(self, value: object):
-        if value is None: return "nil"
-
-        if isinstance(value, float):
-            return f"{round(value, 2)}"
-
-        return str(value)
+    isEqual = staticmethod(isEqual)
+    isTruthy = staticmethod(isTruthy)
+    stringify = staticmethod(stringify)
     
     def evaluate(self, expr: Expr) -> object:
-        return expr.accept(self)
+        return self.exprTable[expr.kind](expr)
 
-    def execute(self, stmt: Stmt) -> None:
-        stmt.accept(self)
+    def execute(self, stmt: Stmt) -> ReturnValue|None:
+        return self.stmtTable[stmt.kind](stmt)
 
     def interperate(self, statements: list[Stmt]):
         try:
@@ -630,16 +1163,131 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         except Exception as e:
             raise e
 
+    # Every backend splits interperate() in two for lox.prepare(): prepare()
+    # does the per-program work once and returns something nothing writes to
+    # later, runPrepared() runs it against this instance's globals and lets
+    # runtime errors through to the caller. A tree walker has nothing to do
+    # ahead of time.
+    def prepare(self, statements: list[Stmt]) -> tuple[Stmt, ...]|None:
+        return tuple(statements)
+
+    def runPrepared(self, prepared: tuple[Stmt, ...]) -> None:
+        for statement in prepared:
+            self.execute(statement)
+
+class Program:
+
+    # A script compiled by lox.prepare(): the resolved tree, or whatever the
+    # backend turned it into, and nothing else. Executing it never writes to
+    # any of that, bar the inline caches on Get/Set nodes, which are only
+    # ever swapped whole for another entry that's just as valid; each
+    # execute() gets a new backend instance with its own globals, so one
+    # Program can serve any number of runs, on any number of threads,
+    # without scanning or parsing again.
+
+    __slots__ = ("lox_inst", "backendType", "prepared")
+
+    def __init__(self, lox_inst: lox, backendType: type, prepared: object):
+        self.lox_inst: lox = lox_inst
+        self.backendType: type = backendType
+        self.prepared: object = prepared
+
+    # runs with globals seeded from the mapping and returns the globals as
+    # they are afterwards, less natives only the tree walker defines as
+    # globals, so every backend returns the same dict; runtime errors are
+    # raised as LoxRuntimeError.
+    # Printed lines go to output, or a BufferedSink on stdout of its own so
+    # runs never share a buffer.
+    def execute(self, globals: Mapping[str, object]|None = None, output=None) -> dict[str, object]:
+        backend = self.backendType(self.lox_inst)
+        backend.output = output if output is not None else BufferedSink()
+        if globals:
+            backend.globals.update({name: toLoxValue(value) for name, value in globals.items()})
+        try:
+            backend.runPrepared(self.prepared)
+        finally:
+            backend.output.flush()
+        return {name: value.flatten() if type(value) is Rope else value for name, value in backend.globals.items()
+                if natives.get(name) is not value}
+
 class lox:
 
-    def __init__(self, lexOut: str = "") -> None:
+    backends = {
+        "tree": Interpreter,
+        "closure": ClosureCompiler,
+        "vm": VM,
+        "python": Transpiler,
+    }
+
+    scanners = {
+        "classic": Scanner,
+        "regex": RegexScanner,
+        "compact": CompactScanner,
+    }
+
+    parsers = {
+        "recursive": Parser,
+        "pratt": PrattParser,
+    }
+
+    def __init__(self, lexOut: str = "", backend: str = "tree", optimize: bool = True, scanner: str = "classic",
+                 cacheDir: str|None = None, cacheSize: int = 64 * 1024 * 1024, profile: bool = False,
+                 stepBudget: int|None = None, output: BufferedSink|CaptureSink|None = None,
+                 quicken: bool = False, explicitStack: bool = False, parser: str = "recursive",
+                 wholeFile: bool = False) -> None:
         self.hasError = False
+        # where print statements write; anything with writeLine() and flush()
+        self.output: BufferedSink|CaptureSink = output if output is not None else BufferedSink()
         self.hasRunTimeError = False
         self.lexOut: str = lexOut
-        self.interpreter: Interpreter = Interpreter(self)
+        self.optimize: bool = optimize
+        if scanner not in self.scanners:
+            raise ValueError(f"unknown scanner '{scanner}', pick one of {', '.join(self.scanners)}")
+        self.scannerType: type = self.scanners[scanner]
+        self.cache: ScriptCache|None = ScriptCache(cacheDir, cacheSize) if cacheDir is not None else None
+        if parser not in self.parsers:
+            raise ValueError(f"unknown parser '{parser}', pick one of {', '.join(self.parsers)}")
+        self.parserType: type = self.parsers[parser]
+        self.resolverType: type = Resolver
+        self.explicitStack: bool = explicitStack
+        # compile all of a file before running any of it, see runStream()
+        self.wholeFile: bool = wholeFile
+        if backend not in self.backends:
+            raise ValueError(f"unknown backend '{backend}', pick one of {', '.join(self.backends)}")
+        if profile:
+            if backend != "tree":
+                raise ValueError("profiling is only supported by the tree backend")
+            from profiler import ProfilingInterpreter
+            self.interpreter = ProfilingInterpreter(self)
+        elif quicken:
+            if backend != "tree":
+                raise ValueError("quickening is only supported by the tree backend")
+            from quickening import QuickeningInterpreter
+            self.interpreter = QuickeningInterpreter(self)
+        elif explicitStack:
+            # parse, resolve and run without recursing per level of nesting
+            if backend != "tree":
+                raise ValueError("explicit stacks are only supported by the tree backend")
+            from explicitStack import StackInterpreter, StackParser, StackResolver
+            self.parserType = StackParser
+            self.resolverType = StackResolver
+            # the optimizer recurses
+            self.optimize = False
+            self.interpreter = StackInterpreter(self)
+        elif stepBudget is not None:
+            # statements to run between handing control back to the event loop
+            if backend != "tree":
+                raise ValueError("async execution is only supported by the tree backend")
+            if stepBudget < 1:
+                raise ValueError("stepBudget has to be at least 1")
+            from asyncInterpreter import AsyncInterpreter
+            self.interpreter = AsyncInterpreter(self, stepBudget)
+        else:
+            self.interpreter: Interpreter|ClosureCompiler|VM|Transpiler = self.backends[backend](self)
         pass
 
     def report(self, line: int, where: str, msg: str):
+        self.output.flush()
         print(f"[line {line}] Error {where}: {msg}")
         self.hasError = True
 
@@ -649,32 +1297,97 @@ class lox:
         else:
             self.report(tok.line, f"at '{tok.lexeme}'", msg)
 
+    # what plox.py exits with: 65 for compile errors, 70 for runtime errors
+    def exitStatus(self) -> int:
+        if self.hasError:
+            return 65
+        if self.hasRunTimeError:
+            return 70
+        return 0
+
     def runTimeError(self, err: LoxRuntimeError):
+        self.output.flush()
         print(f"{err.msg}\n[line {err.token.line}]")
         self.hasRunTimeError = True
 
-    def run(self, line: str):
-        scanner = Scanner(self, line)
-        tokens = scanner.scanTokens()
-        
-        parser = Parser(self, tokens)
-
+    # scan, parse, optimize and resolve; None if any of it reported an error
+    def compile(self, source: str) -> list[Stmt]|None:
         try:
-            statements = parser.parse()
+            return self.compileTokens(self.scannerType(self, source).scanTokens())
         except ParserError as err:
             print(f"Parsing error: {err}")
-            return
-        
+            return None
+
+    # parse, optimize and resolve tokens from any iterable; None if any of it
+    # reported an error, and a ParserError is left to the caller
+    def compileTokens(self, tokens: Iterable[Token]) -> list[Stmt]|None:
+        statements = self.parserType(self, tokens).parse()
+
+        if self.hasError:
+            return None
+
+        return self.compileStatements(statements)
+
+    # optimize and resolve parsed statements; None if either reported an error
+    def compileStatements(self, statements: list[Stmt]) -> list[Stmt]|None:
+        if self.optimize:
+            statements = Optimizer().optimize(statements)
+
+        self.resolverType(self).resolve(statements)
+
         if self.hasError:
+            return None
+
+        return statements
+
+    # compile once for Program.execute() to run as often as needed; None if
+    # the source has errors (which are reported as usual)
+    def prepare(self, source: str) -> Program|None:
+        statements = self.compile(source)
+
+        if statements is not None:
+            backendType = type(self.interpreter)
+            if backendType not in self.backends.values() and not self.explicitStack:
+                # profiling and async interpreters carry per-instance settings
+                backendType = Interpreter
+            prepared = backendType(self).prepare(statements)
+            if prepared is not None:
+                return Program(self, backendType, prepared)
+
+        self.hasError = False
+        return None
+
+    def run(self, line: str):
+        statements = self.compile(line)
+
+        if statements is None:
             self.hasError = False
             return
         
-        self.interpreter.interperate(statements)
+        try:
+            self.interpreter.interperate(statements)
+        finally:
+            self.output.flush()
 
         if self.hasRunTimeError:
             self.hasRunTimeError = False
             return
 
+    async def runAsync(self, source: str):
+        # like runStream() for a whole source, but cooperative: needs an
+        # instance made with a stepBudget, and yields to the running event
+        # loop every stepBudget statements. Errors stay flagged.
+        if not hasattr(self.interpreter, "interperateAsync"):
+            raise RuntimeError("runAsync needs a lox instance created with a stepBudget")
+
+        try:
+            for statements in self.streamStatements(source):
+                await self.interpreter.interperateAsync(statements)
+                if self.hasRunTimeError:
+                    return
+        finally:
+            self.output.flush()
+
     def runPrompt(self):
         while True:
             inp = ""
@@ -687,22 +1400,144 @@ class lox:
     def runFile(self, fname: str):
 
         with open(fname, "r") as f:
-            for line in f.readlines():
-                self.run(line)
+            source = f.read()
+
+        self.runStream(source)
+
+    # everything besides the source that decides what tree runStream() builds
+    def cacheOptions(self) -> str:
+        return (f"optimize={self.optimize} scanner={self.scannerType.__name__} "
+                f"parser={self.parserType.__name__} explicitStack={self.explicitStack}")
+
+    def runStream(self, source: str):
+        # Scans the whole source as one unit, lazily: the scanner is a
+        # generator feeding the parser, and each top level statement is
+        # compiled and run as soon as it has been parsed, so neither the token
+        # list nor the whole program's tree ever exists at once. Statements
+        # before an error have already run by the time it's reported, unless
+        # the instance was made with wholeFile.
+        #
+        # Unlike run(), errors are left flagged so the exit code reflects them.
+        try:
+            for statements in self.streamStatements(source):
+                self.interpreter.interperate(statements)
+                if self.hasRunTimeError:
+                    return
+        finally:
+            self.output.flush()
+
+    # What runStream() and runAsync() run, in order. Normally that's one top
+    # level statement at a time, compiled just before it runs, and stopping
+    # at the first error. With wholeFile, or when the cache has a tree for
+    # this source, it's the whole program at once.
+    def streamStatements(self, source: str):
+        if self.wholeFile:
+            statements = self.compileStream(source)
+            if statements is not None:
+                yield statements
+            return
 
-if __name__ == '__main__':
-    
-    interp = lox("lexout.txt")
+        if self.cache is not None:
+            statements = self.cache.load(source, self.cacheOptions())
+            if statements is not None:
+                yield statements
+                return
+
+        # a tree is only worth caching once all of it compiled and ran, so
+        # this keeps what has run so far and stores it at the end
+        compiled: list[Stmt]|None = [] if self.cache is not None else None
+        parser = self.parserType(self, self.scannerType(self, source).iterTokens())
+        try:
+            for statement in parser.statements():
+                if self.hasError:
+                    return
+                statements = self.compileStatements([statement])
+                if statements is None:
+                    return
+                yield statements
+                if self.hasError:
+                    return
+                if compiled is not None:
+                    compiled.extend(statements)
+        except ParserError:
+            return
+
+        if compiled is not None:
+            self.cache.store(source, compiled, self.cacheOptions())
+
+    # what runStream() runs with wholeFile: the cached tree or a newly
+    # compiled (and then cached) one, None after reporting an error
+    def compileStream(self, source: str) -> list[Stmt]|None:
+        statements = None
+        if self.cache is not None:
+            statements = self.cache.load(source, self.cacheOptions())
 
-    if len(sys.argv) > 1:
-        interp.runFile(sys.argv[1])
+        if statements is None:
+            try:
+                statements = self.compileTokens(self.scannerType(self, source).iterTokens())
+            except ParserError:
+                return None
+            if statements is None:
+                return None
+            if self.cache is not None:
+                self.cache.store(source, statements, self.cacheOptions())
+
+        return statements
+
+def main(argv: list[str]|None = None) -> int:
+
+    import argparse
+
+    argParser = argparse.ArgumentParser(description="lox, but in python")
+    argParser.add_argument("script", nargs="?", help="script to run, starts the REPL if left out")
+    argParser.add_argument("--batch", nargs="+", metavar="PATH", help="run many scripts (or directories of them) on a process pool")
+    argParser.add_argument("-j", "--workers", type=int, default=None, help="worker processes for --batch (default: one per CPU)")
+    argParser.add_argument("--backend", choices=lox.backends, default="tree", help="execution engine (default: tree)")
+    argParser.add_argument("--no-optimize", dest="optimize", action="store_false", help="skip constant folding and dead branch pruning")
+    argParser.add_argument("--scanner", choices=lox.scanners, default="classic", help="tokenizer to use; compact only saves memory where all tokens are held, like the REPL (default: classic)")
+    argParser.add_argument("--parser", choices=lox.parsers, default="recursive", help="expression parser to use (default: recursive)")
+    argParser.add_argument("--cache-dir", help="keep parsed scripts in this directory and reuse them while the source is unchanged")
+    argParser.add_argument("--cache-size", type=float, default=64, help="size limit of the cache directory in MB (default: 64)")
+    argParser.add_argument("--quicken", action="store_true", help="let operators specialise on the types they see (tree backend)")
+    argParser.add_argument("--whole-file", action="store_true", help="compile all of the script before running any of it, so nothing runs if part of it has a syntax error")
+    argParser.add_argument("--explicit-stack", action="store_true", help="parse and run without Python recursion, for very deeply nested scripts (tree backend)")
+    argParser.add_argument("--flush", choices=BufferedSink.policies, default="auto", help="when printed output is written: every line, when the buffer fills, or line-by-line only on a terminal (default: auto)")
+    argParser.add_argument("--profile", action="store_true", help="print time spent per source line to stderr when done (tree backend)")
+    argParser.add_argument("--profile-collapsed", metavar="PATH", help="also write the profile as collapsed stacks for flamegraph tools")
+    args = argParser.parse_args(argv)
+
+    if args.batch is not None:
+        import batch
+        options = {"backend": args.backend, "scanner": args.scanner, "parser": args.parser, "optimize": args.optimize,
+                   "cacheDir": args.cache_dir, "cacheSize": int(args.cache_size * 1024 * 1024), "wholeFile": args.whole_file}
+        return batch.main(args.batch, options, args.workers)
+
+    profiling = args.profile or args.profile_collapsed is not None
+    interp = lox("lexout.txt", backend=args.backend, optimize=args.optimize, scanner=args.scanner,
+                 cacheDir=args.cache_dir, cacheSize=int(args.cache_size * 1024 * 1024), profile=profiling,
+                 output=BufferedSink(flush=args.flush), quicken=args.quicken, explicitStack=args.explicit_stack,
+                 parser=args.parser, wholeFile=args.whole_file)
+
+    if args.script is not None:
+        interp.runFile(args.script)
     else:
         interp.runPrompt()
-    
-    if interp.hasError:
-        exit(65)
 
-    if interp.hasRunTimeError:
-        exit(70)
-    
-    exit(0)
+    if profiling:
+        source = None
+        if args.script is not None:
+            with open(args.script, "r") as f:
+                source = f.read()
+        print(interp.interpreter.report(source), file=sys.stderr)
+        if args.profile_collapsed is not None:
+            with open(args.profile_collapsed, "w") as f:
+                f.write(interp.interpreter.collapsed())
+
+    return interp.exitStatus()
+
+if __name__ == '__main__':
+    # Run main() from the module imported as `plox`, not from this __main__
+    # copy of it, so classes like ParserError are the same objects here as
+    # in the modules that import plox (explicitStack, quickening, ...).
+    from plox import main
+    exit(main())
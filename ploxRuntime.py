@@ -0,0 +1,53 @@
+from __future__ import annotations
+from ploxTokens import Token
+
+class LoxRuntimeError(RuntimeError):
+    def __init__(self, token: Token, msg: str):
+        super().__init__(msg)
+        self.token = token
+        self.msg = msg
+
+class LoxCallable:
+
+    # Anything a Lox call expression can call. arity is a plain attribute,
+    # fixed when the callable is made, so a call checks it with one compare.
+    arity: int = 0
+
+    def call(self, interpreter, arguments: list[object]) -> object:
+        raise NotImplementedError
+
+# Value semantics shared by every backend, so they can't drift apart.
+
+def isEqual(left: object, right: object) -> bool:
+    if left is None and right is None: return True
+    if left is None: return False
+
+    return left == right
+
+def isTruthy(obj: object) -> bool:
+    if obj is None: return False
+    if isinstance(obj, bool): return bool(obj)
+    return True
+
+def stringify(value: object):
+    # print is mostly handed strings and whole numbers, which need neither
+    # the rounding nor the isinstance checks
+    kind = type(value)
+    if kind is str: return value
+    if kind is float:
+        if value.is_integer(): return str(value)
+        return str(round(value, 2))
+
+    if value is None: return "nil"
+
+    return str(value)
+
+# values handed in from python (e.g. Program.execute() globals); lox only has
+# floats for numbers, so ints are widened and anything without a lox
+# counterpart is refused
+def toLoxValue(value: object) -> object:
+    if value is None or isinstance(value, (bool, float, str)):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    raise TypeError(f"can't pass a {type(value).__name__} to lox")
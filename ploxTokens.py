@@ -50,6 +50,25 @@ class tokenType(Enum):
     WHILE = 37
 
     EOF = 38
+
+keywords = {
+    "and": tokenType.AND,
+    "class": tokenType.CLASS,
+    "else": tokenType.ELSE,
+    "false": tokenType.FALSE,
+    "fun": tokenType.FUN,
+    "for": tokenType.FOR,
+    "if": tokenType.IF,
+    "nil": tokenType.NIL,
+    "or": tokenType.OR,
+    "print": tokenType.PRINT,
+    "return": tokenType.RETURN,
+    "super": tokenType.SUPER,
+    "this": tokenType.THIS,
+    "true": tokenType.TRUE,
+    "var": tokenType.VAR,
+    "while": tokenType.WHILE
+}
     
 class Token:
 
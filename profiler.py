@@ -0,0 +1,131 @@
+from __future__ import annotations
+from time import perf_counter
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from environment import ArrayEnvironment
+
+# plox only imports this module when profiling is asked for, so pulling
+# Interpreter in from there doesn't make a cycle at import time
+from plox import Interpreter
+
+class ProfilingInterpreter(Interpreter):
+
+    # Interpreter that times every statement and expression it runs. It is a
+    # separate subclass rather than a flag on Interpreter so the normal tree
+    # walker pays nothing when profiling is off.
+    #
+    # Every node is counted under (source line, node kind) with its hit
+    # count, cumulative (inclusive) time and self time. The same timings are
+    # also kept per call path for collapsed-stack output.
+
+    def __init__(self, lox_inst, scopeType: type = ArrayEnvironment):
+        super().__init__(lox_inst, scopeType)
+        # (line, label) -> [hits, cumulative seconds, self seconds]
+        self.stats: dict[tuple[int, str], list] = {}
+        # "frame;frame;frame" -> self seconds
+        self.stacks: dict[str, float] = {}
+        self.nodeLines: dict[Expr|Stmt, int] = {}
+        self.nodeLabels: dict[Expr|Stmt, str] = {}
+        # [stack path, time spent in children, line]
+        self.frames: list[list] = [["", 0.0, 0]]
+        # how many times each (line, label) is currently on the stack, so
+        # nested or repeated entries don't count their time twice
+        self.active: dict[tuple[int, str], int] = {}
+
+    def evaluate(self, expr: Expr) -> object:
+        return self.profile(expr)
+
+    def execute(self, stmt: Stmt) -> object:
+        return self.profile(stmt)
+
+    def profile(self, node: Expr|Stmt) -> object:
+        parent = self.frames[-1]
+
+        line = self.nodeLines.get(node)
+        if line is None:
+            line = self.nodeLines[node] = self.lineOf(node) or parent[2]
+        label = self.nodeLabels.get(node)
+        if label is None:
+            label = self.nodeLabels[node] = self.labelOf(node)
+
+        key = (line, label)
+        active = self.active.get(key, 0)
+        self.active[key] = active + 1
+
+        path = f"{parent[0]};{label}@{line}" if parent[0] else f"{label}@{line}"
+        frame = [path, 0.0, line]
+        self.frames.append(frame)
+
+        start = perf_counter()
+        try:
+            return node.accept(self)
+        finally:
+            elapsed = perf_counter() - start
+            self.frames.pop()
+            self.active[key] = active
+            parent[1] += elapsed
+            selfTime = elapsed - frame[1]
+
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = [0, 0.0, 0.0]
+            stat[0] += 1
+            if not active:
+                stat[1] += elapsed
+            stat[2] += selfTime
+            self.stacks[path] = self.stacks.get(path, 0.0) + selfTime
+
+    def labelOf(self, node: Expr|Stmt) -> str:
+        kind = type(node).__name__
+        operator = getattr(node, "operator", None)
+        if isinstance(operator, Token):
+            return f"{kind}({operator.lexeme})"
+        name = getattr(node, "name", None)
+        if isinstance(name, Token):
+            return f"{kind}({name.lexeme})"
+        return kind
+
+    def lineOf(self, node: Expr|Stmt|None) -> int|None:
+        # nodes like Literal, Block or Print carry no token of their own, so
+        # they borrow the first line found underneath them (or their parent's)
+        if node is None:
+            return None
+
+        for attr in ("operator", "name", "keyword", "paren"):
+            token = getattr(node, attr, None)
+            if isinstance(token, Token):
+                return token.line
+
+        match node:
+            case Block():
+                return self.lineOf(node.statements[0]) if node.statements else None
+            case If() | While():
+                return self.lineOf(node.condition)
+            case Print() | Expression() | Grouping():
+                return self.lineOf(node.expression)
+        return None
+
+    def report(self, source: str|None = None, limit: int|None = None) -> str:
+        sourceLines = source.splitlines() if source is not None else []
+
+        rows = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+
+        out = [f"{'line':>6} {'node':<24} {'hits':>10} {'cum ms':>10} {'self ms':>10}  source"]
+        for (line, label), (hits, cumulative, selfTime) in rows:
+            text = sourceLines[line - 1].strip() if 0 < line <= len(sourceLines) else ""
+            out.append(f"{line:>6} {label:<24} {hits:>10} {cumulative * 1000:>10.2f} {selfTime * 1000:>10.2f}  {text}")
+        return "\n".join(out)
+
+    def collapsed(self) -> str:
+        # flamegraph.pl / speedscope style: "frame;frame;frame value", with
+        # self time in whole microseconds as the value
+        lines = []
+        for path, selfTime in sorted(self.stacks.items()):
+            micros = int(round(selfTime * 1e6))
+            if micros > 0:
+                lines.append(f"{path} {micros}")
+        return "\n".join(lines) + "\n"
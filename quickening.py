@@ -0,0 +1,262 @@
+from __future__ import annotations
+import operator
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from environment import ArrayEnvironment
+from ploxRuntime import isTruthy
+from rope import Rope, concat
+
+# plox only imports this module when quickening is asked for, so pulling
+# Interpreter in from there doesn't make a cycle at import time
+from plox import Interpreter
+
+# what a specialised Binary does once its operand types are known; anything
+# not in here (mixed types, errors) always goes through Interpreter.binaryOp
+numberOps = {
+    tokenType.minus: operator.sub,
+    tokenType.star: operator.mul,
+    tokenType.plus: operator.add,
+    tokenType.greater: operator.gt,
+    tokenType.greater_equal: operator.ge,
+    tokenType.lesser: operator.lt,
+    tokenType.lesser_equal: operator.le,
+    tokenType.equal_equal: operator.eq,
+    tokenType.bang_equal: operator.ne,
+}
+
+# strings may be plain str or Ropes made by +
+stringTypes = (str, Rope)
+stringOps = {
+    tokenType.plus: concat,
+    tokenType.equal_equal: operator.eq,
+    tokenType.bang_equal: operator.ne,
+}
+
+class QuickeningInterpreter(Interpreter):
+
+    # Tree walker whose Binary, Unary and Logical nodes specialise themselves
+    # on the operand types they actually see. For its first `warmup`
+    # evaluations a node runs the generic code and records the operand
+    # types; if they were the same every time and there's a variant for them
+    # (number/number arithmetic and comparisons, string/string + and ==,
+    # negating a number, ! or and/or on a bool) the node is handed that
+    # variant. A variant only checks `type(x) is float` and goes straight to
+    # the operation, skipping the operator match, isinstance checks and
+    # float() calls.
+    #
+    # When a guard fails the node deoptimises: the value is computed the
+    # generic way, the node forgets its variant and warms up again. After
+    # maxDeopts of those it stays generic for good.
+    #
+    # The specialised state lives in this interpreter, keyed by node, not on
+    # the nodes themselves, so trees can still be shared (lox.prepare()) and
+    # run by other backends.
+
+    def __init__(self, lox_inst, warmup: int = 8, maxDeopts: int = 4, scopeType: type = ArrayEnvironment):
+        super().__init__(lox_inst, scopeType)
+        self.warmup: int = warmup
+        self.maxDeopts: int = maxDeopts
+        # node -> the handler it runs now
+        self.handlers: dict[Expr, object] = {}
+        # node -> [evaluations seen, operand types, or None once they varied]
+        self.feedback: dict[Expr, list] = {}
+        # node -> how often it has deoptimised
+        self.deopts: dict[Expr, int] = {}
+        # nodes that gave up on specialising
+        self.generics: set[Expr] = set()
+        self.specialisations: int = 0
+        # variant handlers are shared by every node with the same operator
+        # and operand types
+        self.variants: dict[tuple, object] = {}
+
+    def visitBinaryExpr(self, expr: Binary):
+        handler = self.handlers.get(expr)
+        if handler is not None:
+            return handler(expr)
+
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        self.observe(expr, (type(left), type(right)))
+        return self.binaryOp(expr.operator, left, right)
+
+    def visitUnaryExpr(self, expr: Unary):
+        handler = self.handlers.get(expr)
+        if handler is not None:
+            return handler(expr)
+
+        right = self.evaluate(expr.right)
+        self.observe(expr, type(right))
+        return self.unaryOp(expr.operator, right)
+
+    def visitLogicalExpr(self, expr: Logical):
+        handler = self.handlers.get(expr)
+        if handler is not None:
+            return handler(expr)
+
+        left = self.evaluate(expr.left)
+        self.observe(expr, type(left))
+        return self.logicalOp(expr, left)
+
+    def logicalOp(self, expr: Logical, left: object) -> object:
+        if expr.operator.type == tokenType.OR:
+            if isTruthy(left): return left
+        else:
+            if not isTruthy(left): return left
+        return self.evaluate(expr.right)
+
+    def observe(self, expr: Expr, kind: object) -> None:
+        seen = self.feedback.get(expr)
+        if seen is None:
+            self.feedback[expr] = [1, kind]
+            return
+
+        if seen[1] != kind:
+            seen[1] = None
+        seen[0] += 1
+        if seen[0] < self.warmup:
+            return
+
+        del self.feedback[expr]
+        handler = self.variant(expr, seen[1]) if seen[1] is not None else None
+        if handler is None:
+            # types vary, or nothing to specialise on: stop recording
+            self.handlers[expr] = self.generic(expr)
+            self.generics.add(expr)
+        else:
+            self.handlers[expr] = handler
+            self.specialisations += 1
+
+    def deoptimise(self, expr: Expr) -> None:
+        count = self.deopts[expr] = self.deopts.get(expr, 0) + 1
+        if count >= self.maxDeopts:
+            self.handlers[expr] = self.generic(expr)
+            self.generics.add(expr)
+        else:
+            del self.handlers[expr]
+
+    def generic(self, expr: Expr):
+        evaluate = self.evaluate
+        match expr:
+            case Binary():
+                binaryOp = self.binaryOp
+                return lambda expr: binaryOp(expr.operator, evaluate(expr.left), evaluate(expr.right))
+            case Unary():
+                unaryOp = self.unaryOp
+                return lambda expr: unaryOp(expr.operator, evaluate(expr.right))
+            case Logical():
+                logicalOp = self.logicalOp
+                return lambda expr: logicalOp(expr, evaluate(expr.left))
+
+    def variant(self, expr: Expr, kind: object):
+        key = (type(expr), expr.operator.type, kind)
+        if key in self.variants:
+            return self.variants[key]
+
+        handler = None
+        match expr:
+            case Binary():
+                if kind == (float, float) and expr.operator.type == tokenType.slash:
+                    handler = self.divideVariant()
+                elif kind == (float, float) and expr.operator.type in numberOps:
+                    handler = self.binaryVariant(float, numberOps[expr.operator.type])
+                elif kind[0] in stringTypes and kind[1] in stringTypes and expr.operator.type in stringOps:
+                    handler = self.stringVariant(stringOps[expr.operator.type])
+            case Unary():
+                if kind is float and expr.operator.type == tokenType.minus:
+                    handler = self.unaryVariant(float, operator.neg)
+                elif kind is bool and expr.operator.type == tokenType.bang:
+                    handler = self.unaryVariant(bool, operator.not_)
+            case Logical():
+                if kind is bool:
+                    handler = self.logicalVariant(expr.operator.type == tokenType.OR)
+
+        self.variants[key] = handler
+        return handler
+
+    def binaryVariant(self, operandType: type, op):
+        evaluate = self.evaluate
+        deoptimise = self.deoptimise
+        binaryOp = self.binaryOp
+
+        def binary(expr):
+            left = evaluate(expr.left)
+            right = evaluate(expr.right)
+            if type(left) is operandType and type(right) is operandType:
+                return op(left, right)
+            deoptimise(expr)
+            return binaryOp(expr.operator, left, right)
+        return binary
+
+    def divideVariant(self):
+        evaluate = self.evaluate
+        deoptimise = self.deoptimise
+        binaryOp = self.binaryOp
+
+        # a zero divisor is still two floats, so it raises through binaryOp
+        # without counting as a deopt
+        def binary(expr):
+            left = evaluate(expr.left)
+            right = evaluate(expr.right)
+            if type(left) is float and type(right) is float:
+                if right:
+                    return left / right
+                return binaryOp(expr.operator, left, right)
+            deoptimise(expr)
+            return binaryOp(expr.operator, left, right)
+        return binary
+
+    def stringVariant(self, op):
+        evaluate = self.evaluate
+        deoptimise = self.deoptimise
+        binaryOp = self.binaryOp
+
+        def binary(expr):
+            left = evaluate(expr.left)
+            right = evaluate(expr.right)
+            if (type(left) is str or type(left) is Rope) and (type(right) is str or type(right) is Rope):
+                return op(left, right)
+            deoptimise(expr)
+            return binaryOp(expr.operator, left, right)
+        return binary
+
+    def unaryVariant(self, operandType: type, op):
+        evaluate = self.evaluate
+        deoptimise = self.deoptimise
+        unaryOp = self.unaryOp
+
+        def unary(expr):
+            right = evaluate(expr.right)
+            if type(right) is operandType:
+                return op(right)
+            deoptimise(expr)
+            return unaryOp(expr.operator, right)
+        return unary
+
+    def logicalVariant(self, isOr: bool):
+        # with a bool on the left, truthiness is the value itself
+        evaluate = self.evaluate
+        deoptimise = self.deoptimise
+        logicalOp = self.logicalOp
+
+        def logical(expr):
+            left = evaluate(expr.left)
+            if type(left) is bool:
+                if left is isOr: return left
+                return evaluate(expr.right)
+            deoptimise(expr)
+            return logicalOp(expr, left)
+        return logical
+
+    def stats(self) -> dict[str, object]:
+        # for tuning warmup/maxDeopts: how much got specialised and which
+        # nodes kept changing their mind
+        return {
+            "specialisations": self.specialisations,
+            "specialised": len(self.handlers) - len(self.generics),
+            "generic": len(self.generics),
+            "deopts": sum(self.deopts.values()),
+            "deoptsByNode": sorted(((expr.operator.line, expr.operator.lexeme, count) for expr, count in self.deopts.items()),
+                                   key=lambda item: item[2], reverse=True),
+        }
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import re
+
+from ploxTokens import *
+
+operators = {
+    "(": tokenType.paren_l,
+    ")": tokenType.paren_r,
+    "{": tokenType.brace_l,
+    "}": tokenType.brace_r,
+    ",": tokenType.comma,
+    ".": tokenType.dot,
+    "-": tokenType.minus,
+    "+": tokenType.plus,
+    ";": tokenType.semicolon,
+    "*": tokenType.star,
+    "/": tokenType.slash,
+    "!": tokenType.bang,
+    "!=": tokenType.bang_equal,
+    "=": tokenType.equal,
+    "==": tokenType.equal_equal,
+    ">": tokenType.greater,
+    ">=": tokenType.greater_equal,
+    "<": tokenType.lesser,
+    "<=": tokenType.lesser_equal,
+}
+
+# One alternative per token class, tried in order. Group numbers are what
+# the scanner dispatches on (match.lastindex), so keep them in sync with the
+# constants below.
+masterPattern = re.compile(r"""
+    ([ \t\r]+)                      # 1 whitespace
+  | (\n)                            # 2 newline
+  | (//[^\n]*)                      # 3 comment
+  | (\d+(?:\.\d+)?)                 # 4 number
+  | ([^\W\d]\w*)                    # 5 identifier or keyword
+  | ("[^"]*"?)                      # 6 string, closing quote optional like Scanner
+  | ([!=<>]=|[(){},.\-+;*/!=<>])    # 7 operator
+  | (.)                             # 8 anything else is an error
+""", re.VERBOSE)
+
+WHITESPACE = 1
+NEWLINE = 2
+COMMENT = 3
+NUMBER = 4
+IDENTIFIER = 5
+STRING = 6
+OPERATOR = 7
+INVALID = 8
+
+class RegexScanner:
+
+    # Drop-in replacement for plox.Scanner: same constructor and scanTokens(),
+    # same Token stream, but the whole source is cut up by one precompiled
+    # regex via re.finditer instead of a method call per character.
+
+    def __init__(self, lox_inst, source: str = ""):
+        self.lox_inst = lox_inst
+        self.source: str = source
+        self.tokens: list[Token] = []
+        self.line: int = 1
+
+    def scanTokens(self) -> list[Token]:
+        self.tokens.extend(self.iterTokens())
+        return self.tokens
+
+    def iterTokens(self):
+        line = self.line
+
+        for match in masterPattern.finditer(self.source):
+            kind = match.lastindex
+
+            if kind == WHITESPACE or kind == COMMENT:
+                continue
+
+            if kind == NEWLINE:
+                line += 1
+                continue
+
+            text = match.group()
+
+            if kind == IDENTIFIER:
+                keyword = keywords.get(text)
+                if keyword is not None:
+                    yield Token(keyword, text, line)
+                else:
+                    yield Token(tokenType.identifier, text, line, text)
+            elif kind == OPERATOR:
+                yield Token(operators[text], text, line)
+            elif kind == NUMBER:
+                yield Token(tokenType.number, text, line, float(text))
+            elif kind == STRING:
+                value = text[1:-1] if len(text) > 1 and text[-1] == '"' else text[1:]
+                line += value.count("\n")
+                yield Token(tokenType.string, text, line, value)
+            else:
+                self.lox_inst.report(line, "", "invalid character")
+
+        self.line = line
+        yield Token(tokenType.EOF, "", line)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+
+# statements that put a name in the scope they're in
+declarations = (Var, Function, Class)
+
+class Resolver(Expr.Visitor, Stmt.Visitor):
+
+    # Walks the tree once before it runs and pins every Variable/Assign to a
+    # (depth, slot) coordinate: depth is how many scopes up the variable was
+    # declared and slot is its index in that scope, in declaration order.
+    # Globals get depth = slot = None and are still looked up by name.
+    #
+    # The coordinates are stored on the nodes themselves:
+    #   Variable/Assign -> .depth, .slot
+    #   Var             -> .slot
+    #   Block           -> .slotNames (names of the block's locals by slot),
+    #                      or None if it declares nothing and so gets no
+    #                      scope at all
+    #   Function        -> .slot, and .slotNames for its frame: parameters
+    #                      first, then the body's top level locals
+    #   Class           -> .slot
+    #   This/Super      -> .depth, .slot, like a Variable named this/super
+    #   Get/Set         -> .cache, the interpreter's inline cache, empty
+    #
+    # Methods are resolved inside a scope holding only `this`, inside one
+    # holding only `super` if the class has a superclass, which is exactly
+    # the environments the interpreter wraps around them.
+
+    def __init__(self, lox_inst):
+        self.lox_inst = lox_inst
+        # one dict per open block, name -> [slot, initialized]
+        self.scopes: list[dict[str, list]] = []
+        # what we're inside of, for the errors only some places allow:
+        # None, "function", "method" or "initializer"
+        self.currentFunction: str|None = None
+        # None, "class" or "subclass"
+        self.currentClass: str|None = None
+
+    def resolve(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            self.resolveStmt(statement)
+
+    def resolveStmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def resolveExpr(self, expr: Expr) -> None:
+        expr.accept(self)
+
+    def beginScope(self) -> None:
+        self.scopes.append({})
+
+    def endScope(self) -> tuple[str, ...]:
+        return tuple(self.scopes.pop())
+
+    def declare(self, name: Token) -> int|None:
+        if not self.scopes:
+            return None
+
+        scope = self.scopes[-1]
+        if name.lexeme in scope:
+            self.lox_inst.error(name, "there's already a variable with this name in this scope")
+            return scope[name.lexeme][0]
+
+        slot = len(scope)
+        scope[name.lexeme] = [slot, False]
+        return slot
+
+    def define(self, name: Token) -> None:
+        if not self.scopes:
+            return
+        self.scopes[-1][name.lexeme][1] = True
+
+    def resolveLocal(self, expr: Variable|Assign|This|Super, name: Token) -> None:
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name.lexeme in scope:
+                expr.depth = depth
+                expr.slot = scope[name.lexeme][0]
+                return
+
+        expr.depth = None
+        expr.slot = None
+
+    def visitBlockStmt(self, stmt: Block):
+        # a block only needs a scope if it declares something directly in
+        # it; anything nested opens its own. Without one its statements
+        # resolve, and later run, in the enclosing scope.
+        if not any(isinstance(statement, declarations) for statement in stmt.statements):
+            self.resolve(stmt.statements)
+            stmt.slotNames = None
+            return
+
+        self.beginScope()
+        self.resolve(stmt.statements)
+        stmt.slotNames = self.endScope()
+
+    def visitVarStmt(self, stmt: Var):
+        stmt.slot = self.declare(stmt.name)
+        if stmt.initializer is not None:
+            self.resolveExpr(stmt.initializer)
+        self.define(stmt.name)
+
+    def visitFunctionStmt(self, stmt: Function):
+        # defined before the body is resolved so the function can recurse
+        stmt.slot = self.declare(stmt.name)
+        self.define(stmt.name)
+        self.resolveFunction(stmt, "function")
+
+    def resolveFunction(self, stmt: Function, kind: str) -> None:
+        enclosing = self.currentFunction
+        self.currentFunction = kind
+
+        self.beginScope()
+        for param in stmt.params:
+            self.declare(param)
+            self.define(param)
+        self.resolve(stmt.body)
+        stmt.slotNames = self.endScope()
+
+        self.currentFunction = enclosing
+
+    def visitClassStmt(self, stmt: Class):
+        enclosing = self.currentClass
+        self.currentClass = "class"
+
+        stmt.slot = self.declare(stmt.name)
+        self.define(stmt.name)
+
+        if stmt.superclass is not None:
+            if stmt.superclass.name.lexeme == stmt.name.lexeme:
+                self.lox_inst.error(stmt.superclass.name, "a class can't inherit from itself")
+            self.currentClass = "subclass"
+            self.resolveExpr(stmt.superclass)
+            self.beginScope()
+            self.scopes[-1]["super"] = [0, True]
+
+        self.beginScope()
+        self.scopes[-1]["this"] = [0, True]
+        for method in stmt.methods:
+            self.resolveFunction(method, "initializer" if method.name.lexeme == "init" else "method")
+        self.endScope()
+
+        if stmt.superclass is not None:
+            self.endScope()
+
+        self.currentClass = enclosing
+
+    def visitReturnStmt(self, stmt: Return):
+        if self.currentFunction is None:
+            self.lox_inst.error(stmt.keyword, "can't return from top-level code")
+        if stmt.value is not None:
+            if self.currentFunction == "initializer":
+                self.lox_inst.error(stmt.keyword, "can't return a value from an initializer")
+            self.resolveExpr(stmt.value)
+
+    def visitExpressionStmt(self, stmt: Expression):
+        self.resolveExpr(stmt.expression)
+
+    def visitIfStmt(self, stmt: If):
+        self.resolveExpr(stmt.condition)
+        self.resolveStmt(stmt.thenBranch)
+        if stmt.elseBranch is not None:
+            self.resolveStmt(stmt.elseBranch)
+
+    def visitPrintStmt(self, stmt: Print):
+        self.resolveExpr(stmt.expression)
+
+    def visitWhileStmt(self, stmt: While):
+        self.resolveExpr(stmt.condition)
+        self.resolveStmt(stmt.body)
+        if stmt.increment is not None:
+            self.resolveExpr(stmt.increment)
+
+    def visitVariableExpr(self, expr: Variable):
+        if self.scopes:
+            entry = self.scopes[-1].get(expr.name.lexeme)
+            if entry is not None and not entry[1]:
+                self.lox_inst.error(expr.name, "can't read a local variable in its own initializer")
+
+        self.resolveLocal(expr, expr.name)
+
+    def visitAssignExpr(self, expr: Assign):
+        self.resolveExpr(expr.value)
+        self.resolveLocal(expr, expr.name)
+
+    def visitBinaryExpr(self, expr: Binary):
+        self.resolveExpr(expr.left)
+        self.resolveExpr(expr.right)
+
+    def visitCallExpr(self, expr: Call):
+        self.resolveExpr(expr.callee)
+        for argument in expr.arguments:
+            self.resolveExpr(argument)
+
+    def visitGetExpr(self, expr: Get):
+        expr.cache = None
+        self.resolveExpr(expr.object)
+
+    def visitSetExpr(self, expr: Set):
+        expr.cache = None
+        self.resolveExpr(expr.value)
+        self.resolveExpr(expr.object)
+
+    def visitThisExpr(self, expr: This):
+        if self.currentClass is None:
+            self.lox_inst.error(expr.keyword, "can't use 'this' outside of a class")
+            return
+        self.resolveLocal(expr, expr.keyword)
+
+    def visitSuperExpr(self, expr: Super):
+        if self.currentClass is None:
+            self.lox_inst.error(expr.keyword, "can't use 'super' outside of a class")
+        elif self.currentClass != "subclass":
+            self.lox_inst.error(expr.keyword, "can't use 'super' in a class with no superclass")
+        self.resolveLocal(expr, expr.keyword)
+
+    def visitLogicalExpr(self, expr: Logical):
+        self.resolveExpr(expr.left)
+        self.resolveExpr(expr.right)
+
+    def visitUnaryExpr(self, expr: Unary):
+        self.resolveExpr(expr.right)
+
+    def visitGroupingExpr(self, expr: Grouping):
+        self.resolveExpr(expr.expression)
+
+    def visitLiteralExpr(self, expr: Literal):
+        pass
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+# Strings built by + in the tree walker. `s = s + piece` in a loop copies all
+# of s every time, since s is still held by its variable, so building a
+# string that way is quadratic. Once a result would be at least
+# ropeThreshold characters, + makes a Rope instead: the pieces in a list,
+# joined only when somebody looks at the value (printing, ==, handing it
+# back to python). Shorter strings stay plain str, which is cheaper to make.
+
+ropeThreshold = 256
+
+class Rope:
+
+    # The first `count` entries of `parts`, joined, are this rope's value.
+    # Appending to a rope whose list nobody else has appended to just
+    # appends to the shared list and hands out a Rope with a bigger count,
+    # so a chain of `s = s + x` is amortised O(1) per step and never copies
+    # the text. If the list has already been extended by someone else (the
+    # old s was appended to twice) the parts are copied first.
+
+    __slots__ = ("parts", "count", "length", "flat")
+
+    def __init__(self, parts: list[str], length: int):
+        self.parts: list[str] = parts
+        self.count: int = len(parts)
+        self.length: int = length
+        self.flat: str|None = None
+
+    def flatten(self) -> str:
+        if self.flat is None:
+            parts = self.parts if len(self.parts) == self.count else self.parts[:self.count]
+            self.flat = "".join(parts)
+            # later appends start from the joined text instead of the pieces
+            self.parts = [self.flat]
+            self.count = 1
+        return self.flat
+
+    def pieces(self) -> list[str]:
+        return self.parts[:self.count]
+
+    __str__ = flatten
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is Rope:
+            other = other.flatten()
+        return self.flatten() == other
+
+    def __hash__(self) -> int:
+        return hash(self.flatten())
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f"Rope({self.count} parts, {self.length} chars)"
+
+# + on two strings, either of which may be a Rope
+def concat(left: str|Rope, right: str|Rope) -> str|Rope:
+    if type(left) is str:
+        if type(right) is str:
+            if len(left) + len(right) < ropeThreshold:
+                return left + right
+            return Rope([left, right], len(left) + len(right))
+        return Rope([left] + right.pieces(), len(left) + right.length)
+
+    parts = left.parts
+    if len(parts) != left.count:
+        parts = parts[:left.count]
+    if type(right) is str:
+        parts.append(right)
+        return Rope(parts, left.length + len(right))
+    parts.extend(right.pieces())
+    return Rope(parts, left.length + right.length)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import hashlib
+import os
+import pickle
+import stat
+import sys
+import tempfile
+import time
+import zlib
+
+from STMT import Stmt
+
+# Anything that changes what the front end produces has to invalidate the
+# cache, so the stamp covers the modules that define and build the tree
+# plus the Python version (pickle layouts aren't promised across versions).
+# plox.py holds both the recursive and the Pratt parser.
+frontEndModules = ("AST.py", "STMT.py", "ploxTokens.py", "plox.py", "optimizer.py", "resolver.py",
+                   "regexScanner.py", "tokenStore.py", "explicitStack.py")
+formatVersion = 1
+magic = b"PLXC"
+
+def versionStamp() -> str:
+    digest = hashlib.sha256(f"{formatVersion}:{sys.version_info[:2]}".encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in frontEndModules:
+        with open(os.path.join(here, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+# Unpickling runs whatever code the pickle asks it to, so an entry is only
+# ever loaded from a directory nobody but us can write to, and only if we
+# wrote it ourselves. Where there are no owners or mode bits to go by
+# (Windows) the directory is trusted as is.
+def private(info: os.stat_result) -> bool:
+    if not hasattr(os, "getuid"):
+        return True
+    return info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+class ScriptCache:
+
+    # .pyc style cache of parsed, optimised and resolved programs. Entries
+    # are keyed by a hash of the source, the options that shape the tree and
+    # the interpreter's version stamp, and stored as zlib compressed pickles.
+    #
+    # Writes go to a temp file in the cache directory and are os.replace()d
+    # into place, so several processes can fill the cache at once and a
+    # reader only ever sees a complete entry. Once the directory grows past
+    # maxBytes the least recently used entries are deleted; loading an entry
+    # touches it. Temp files left behind by a writer that died before its
+    # os.replace() are deleted once they're staleAfter seconds old.
+    #
+    # A directory that someone else owns or can write to is never read from
+    # or written to (see private()), so the cache just misses there.
+
+    suffix = ".ploxc"
+    tempSuffix = ".tmp"
+    staleAfter = 10 * 60
+
+    def __init__(self, directory: str, maxBytes: int = 64 * 1024 * 1024):
+        self.directory: str = directory
+        self.maxBytes: int = maxBytes
+        self.stamp: str = versionStamp()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def trusted(self) -> bool:
+        try:
+            return private(os.stat(self.directory))
+        except OSError:
+            return False
+
+    def key(self, source: str, options: str = "") -> str:
+        digest = hashlib.sha256(source.encode())
+        digest.update(f"\0{options}\0{self.stamp}".encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, source: str, options: str = "") -> list[Stmt]|None:
+        if not self.trusted():
+            return None
+
+        path = self.path(self.key(source, options))
+        try:
+            with open(path, "rb") as f:
+                if not private(os.fstat(f.fileno())):
+                    return None
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            if not data.startswith(magic):
+                raise ValueError("not a plox cache entry")
+            statements = pickle.loads(zlib.decompress(data[len(magic):]))
+        except Exception:
+            # half written by something other than us, or otherwise damaged
+            self.remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return statements
+
+    def store(self, source: str, statements: list[Stmt], options: str = "") -> bool:
+        if not self.trusted():
+            return False
+
+        try:
+            data = magic + zlib.compress(pickle.dumps(statements, pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, RecursionError):
+            return False
+
+        fd, tmpPath = tempfile.mkstemp(dir=self.directory, suffix=self.tempSuffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmpPath, self.path(self.key(source, options)))
+        except OSError:
+            self.remove(tmpPath)
+            return False
+
+        self.evict()
+        return True
+
+    def remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                # another process evicted it under us
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def removeStaleTemps(self) -> None:
+        cutoff = time.time() - self.staleAfter
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.tempSuffix):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    self.remove(entry.path)
+            except OSError:
+                continue
+
+    def evict(self) -> None:
+        self.removeStaleTemps()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.maxBytes:
+            return
+
+        for _, size, path in sorted(entries):
+            self.remove(path)
+            total -= size
+            if total <= self.maxBytes:
+                return
+
+    def clear(self) -> None:
+        for _, _, path in self.entries():
+            self.remove(path)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import subprocess
+import sys
+
+from outputSink import BufferedSink
+from plox import ParserError, lox
+from ploxTokens import Token
+
+# Helpers shared by the tests: running Lox source in-process or through the
+# plox.py command line, and the fixture programs in fixtures/. A fixture
+# lists the output it should produce in `// expect: ` comments, one per
+# line of output, and its exit status in an `// exit: ` comment (0 if it
+# has none).
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(testDir)
+fixtureDir = os.path.join(testDir, "fixtures")
+
+# fixtures every backend can run; the rest use functions or classes, which
+# only the tree walking interpreters have
+coreFixtures = ("core", "divideByZero", "syntaxError", "runtimeError")
+
+# Every way of running a script that must print exactly what the plain tree
+# walker prints. test_differential.py runs every fixture and edge case
+# through all of them, so tests for a single feature don't have to. The
+# closure, vm and python backends have no functions or classes, so they only
+# get the core fixtures.
+modes = {
+    "tree": {},
+    "unoptimized": {"optimize": False},
+    "regex": {"scanner": "regex"},
+    "compact": {"scanner": "compact"},
+    "pratt": {"parser": "pratt"},
+    "explicitStack": {"explicitStack": True},
+    "quicken": {"quicken": True},
+    "profile": {"profile": True},
+    "async": {"stepBudget": 3},
+    "closure": {"backend": "closure"},
+    "vm": {"backend": "vm"},
+    "python": {"backend": "python"},
+}
+
+def fixturesFor(mode: str) -> list[str]:
+    if modes[mode].get("backend", "tree") != "tree":
+        return list(coreFixtures)
+    return fixtureNames()
+
+# short programs with edge cases and errors, for comparing a backend's
+# output and exit status with the tree walker's
+edgeSources = [
+    'print 1 + "a";',
+    'print -"a";',
+    'print "a" < 1;',
+    'print "before"; print missing;',
+    'missing = 1;',
+    'var a = 1; var a = 2; print a;',
+    'print nil == false;',
+    'print 0.1 + 0.2;',
+    'print 7 / 2;',
+    'print "a" + "b" == "ab";',
+    'print true or missing;',
+    'print false and missing;',
+    'var i = 0; while (i < 3) { var j = i; i = i + 1; } print i;',
+    'if (1 > 2) print 1; else if (2 > 1) print 2; else print 3;',
+    '{ var a = 1; { var b = a; a = b + 1; } print a; }',
+    '{ var a = 1; { var a = a; } }',
+    'var a = "x"; { var b = a + "y"; { print a + b; } }',
+    'print 1 / 0;',
+    'print (1;',
+    '"unterminated',
+]
+
+def fixturePath(name: str) -> str:
+    return os.path.join(fixtureDir, name + ".lox")
+
+def fixtureNames() -> list[str]:
+    return sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(fixtureDir, "*.lox")))
+
+def readFixture(name: str) -> str:
+    with open(fixturePath(name), "r") as f:
+        return f.read()
+
+def expected(name: str) -> tuple[str, int]:
+    lines = []
+    status = 0
+    for line in readFixture(name).splitlines():
+        if "// expect: " in line:
+            lines.append(line.split("// expect: ", 1)[1])
+        elif "// exit: " in line:
+            status = int(line.split("// exit: ", 1)[1])
+    return "".join(line + "\n" for line in lines), status
+
+# runs source the way plox.py runs a file, returning everything printed
+# (program output and error reports, in order) and the exit status; with a
+# stepBudget it goes through runAsync() instead
+def runSource(source: str, **options) -> tuple[str, int]:
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        inst = lox(output=BufferedSink(), **options)
+        if "stepBudget" in options:
+            asyncio.run(inst.runAsync(source))
+        else:
+            inst.runStream(source)
+    return out.getvalue(), inst.exitStatus()
+
+def runFixture(name: str, **options) -> tuple[str, int]:
+    return runSource(readFixture(name), **options)
+
+# a tree as nested tuples, lists and plain values, so two parses compare with ==
+def dumpTree(node: object) -> object:
+    if isinstance(node, list):
+        return [dumpTree(child) for child in node]
+    if isinstance(node, Token):
+        return (node.type, node.lexeme, node.line, node.literal)
+    if hasattr(node, "__match_args__"):
+        return (type(node).__name__, [dumpTree(getattr(node, name)) for name in node.__match_args__])
+    return node
+
+# parses source with the given scanner and parser names, returning the dumped
+# tree (None when it doesn't parse) and the errors printed
+def parseSource(source: str, scanner: str = "classic", parser: str = "recursive", explicitStack: bool = False) -> tuple[object, str]:
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        inst = lox(scanner=scanner, parser=parser, explicitStack=explicitStack)
+        try:
+            tree = inst.parserType(inst, inst.scannerType(inst, source).scanTokens()).parse()
+        except ParserError:
+            tree = None
+    return dumpTree(tree) if tree is not None else None, out.getvalue()
+
+def runCli(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, os.path.join(repoDir, "plox.py"), *args],
+                          capture_output=True, text=True, cwd=repoDir, timeout=120)
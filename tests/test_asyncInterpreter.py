@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+from outputSink import BufferedSink, CaptureSink
+from plox import lox
+
+def runAsync(source: str, stepBudget: int = 3) -> tuple[str, int, int]:
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        inst = lox(output=BufferedSink(), stepBudget=stepBudget)
+        asyncio.run(inst.runAsync(source))
+    return out.getvalue(), inst.exitStatus(), inst.interpreter.slices
+
+def test_loopInsideFunctionYields():
+    source = """
+    fun spin(n) {
+        var total = 0;
+        for (var i = 0; i < n; i = i + 1) total = total + i;
+        return total;
+    }
+    print spin(1000);
+    """
+    output, status, slices = runAsync(source, stepBudget=100)
+    assert (output, status) == ("499500.0\n", 0)
+    # one statement per iteration in the loop body alone
+    assert slices >= 1000 // 100
+
+def test_callInsideExpressionYields():
+    source = """
+    fun spin(n) {
+        var i = 0;
+        while (i < n) i = i + 1;
+        return i;
+    }
+    var x = 1 + spin(500) * 2;
+    print x;
+    """
+    output, status, slices = runAsync(source, stepBudget=50)
+    assert (output, status) == ("1001.0\n", 0)
+    assert slices >= 500 // 50
+
+def test_otherTasksRunWhileScriptRuns():
+    source = "fun spin() { for (var i = 0; i < 2000; i = i + 1) {} } spin();"
+
+    async def main():
+        ticks = 0
+        done = False
+
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        with contextlib.redirect_stdout(io.StringIO()):
+            await lox(stepBudget=10).runAsync(source)
+        done = True
+        await task
+        return ticks
+
+    assert asyncio.run(main()) > 10
+
+def test_budgetSetsSliceLength():
+    source = "var i = 0;\nwhile (i < 100) i = i + 1;\nprint i;"
+    output, status, small = runAsync(source, stepBudget=5)
+    assert (output, status) == ("100.0\n", 0)
+    _, _, large = runAsync(source, stepBudget=50)
+    assert small > large >= 2
+
+def test_scriptsKeepTheirOwnOutput():
+    async def main():
+        instances = [lox(stepBudget=7, output=CaptureSink()) for _ in range(5)]
+        await asyncio.gather(*(inst.runAsync(f"for (var i = 0; i < 30; i = i + 1) {{}} print {n};")
+                               for n, inst in enumerate(instances)))
+        return [inst.output.getvalue() for inst in instances]
+
+    assert asyncio.run(main()) == [f"{n}.0\n" for n in range(5)]
+
+def test_needsStepBudget():
+    with pytest.raises(RuntimeError):
+        asyncio.run(lox().runAsync("print 1;"))
+
+def test_usesScriptCache(tmp_path, monkeypatch):
+    source = "print 1 + 2;"
+    runs = []
+    for _ in range(2):
+        inst = lox(stepBudget=10, cacheDir=str(tmp_path), output=CaptureSink())
+        monkeypatch.setattr(inst, "compileStatements", lambda statements, compile=inst.compileStatements: runs.append(1) or compile(statements))
+        asyncio.run(inst.runAsync(source))
+        assert inst.output.getvalue() == "3.0\n"
+    assert len(runs) == 1
+
+def test_cancelled():
+    async def main():
+        inst = lox(stepBudget=10, output=CaptureSink())
+        task = asyncio.create_task(inst.runAsync("print 1; while (true) {}"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return inst.output.getvalue()
+
+    assert asyncio.run(main()) == "1.0\n"
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import batch
+import plox
+from batch import collectScripts, runBatch, runScript
+from harness import expected, fixtureDir, fixtureNames, fixturePath, runCli
+
+def test_collectScripts(tmp_path):
+    nested = tmp_path / "b" / "c"
+    nested.mkdir(parents=True)
+    for path in (tmp_path / "b" / "z.lox", nested / "a.lox", tmp_path / "b" / "notes.txt"):
+        path.write_text("print 1;")
+    single = str(tmp_path / "single.lox")
+
+    assert collectScripts([str(tmp_path / "b"), single]) == [
+        os.path.join(str(tmp_path / "b"), "c", "a.lox"),
+        os.path.join(str(tmp_path / "b"), "z.lox"),
+        single,
+    ]
+
+@pytest.mark.parametrize("name", fixtureNames())
+def test_runScript(name):
+    output, status = expected(name)
+    assert runScript(fixturePath(name), {}) == (fixturePath(name), status, output)
+
+def test_runScriptCrash():
+    path, status, output = runScript(os.path.join(fixtureDir, "missing.lox"), {})
+    assert status == 1
+    assert "FileNotFoundError" in output
+
+def test_runBatchOnPool():
+    results = {path: (output, status) for path, status, output in runBatch([fixtureDir], {"backend": "tree"}, workers=2)}
+    assert results == {fixturePath(name): expected(name) for name in fixtureNames()}
+
+def test_optionsReachWorkers():
+    results = list(runBatch([fixturePath("functions")], {"backend": "vm"}, workers=1))
+    [(path, status, output)] = results
+    assert status == 65
+    assert "aren't supported by the vm backend" in output
+
+def test_commandLine():
+    result = runCli("--batch", fixtureDir, "-j", "2")
+    worst = max(expected(name)[1] for name in fixtureNames())
+    assert result.returncode == worst
+    for name in fixtureNames():
+        output, status = expected(name)
+        assert f"==> {fixturePath(name)} [exit {status}]\n{output}" in result.stdout
+    assert f"{len(fixtureNames())} scripts:" in result.stderr
+
+def test_commandLineForwardsOptions(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(batch, "main", lambda paths, options, workers: seen.update(options, paths=paths, workers=workers) or 0)
+    assert plox.main(["--batch", "a.lox", "-j", "3", "--cache-dir", "cache", "--cache-size", "2", "--whole-file"]) == 0
+    assert seen["paths"] == ["a.lox"]
+    assert seen["workers"] == 3
+    assert seen["cacheDir"] == "cache"
+    assert seen["cacheSize"] == 2 * 1024 * 1024
+    assert seen["wholeFile"] is True
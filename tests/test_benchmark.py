@@ -0,0 +1,80 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import benchmark
+from benchmark import WorkloadError, generateLargeSource, loadWorkloads, nestedSource, runPhases, timeExecute
+from harness import repoDir, runSource
+
+def test_workloadsIncludeGenerated():
+    workloads = loadWorkloads(largeBytes=4096)
+    assert {"calls", "deep_expressions", "nested_blocks", "numeric_loop", "properties", "string_concat"} <= set(workloads)
+    assert len(workloads["large_generated"]) >= 4096
+
+def test_unknownWorkload():
+    with pytest.raises(SystemExit):
+        loadWorkloads(["nope"])
+
+@pytest.mark.parametrize("name", sorted(loadWorkloads(largeBytes=4096)))
+def test_workloadsRunCleanly(name):
+    output, status = runSource(loadWorkloads([name], largeBytes=4096)[name])
+    assert status == 0
+    assert "Error" not in output
+
+def test_generatedSourceParses():
+    output, status = runSource(generateLargeSource(2048))
+    assert status == 0
+
+def test_runPhases():
+    times = runPhases(generateLargeSource(2048), {"backend": "vm"})
+    assert set(times) == {"scan", "parse", "resolve", "execute", "total", "tokens"}
+    assert times["tokens"] > 0
+
+def test_unsupportedWorkloadIsSkipped():
+    with pytest.raises(WorkloadError):
+        runPhases(loadWorkloads(["calls"])["calls"], {"backend": "vm"})
+
+def test_report(capsys):
+    report = benchmark.benchmark({"small": generateLargeSource(1024), "calls": loadWorkloads(["calls"])["calls"]},
+                                 {"backend": "closure"}, repeat=1)
+    assert set(report["results"]) == {"small"}
+    assert "calls: skipped" in capsys.readouterr().err
+    assert report["results"]["small"]["peakMemory"] > 0
+
+def test_timeExecute():
+    seconds, inst = timeExecute("print 1 + 1;", 2, backend="vm")
+    assert seconds >= 0
+    assert inst.output.getvalue() == "2.0\n"
+
+def test_nestedSource():
+    for name, source in nestedSource(10).items():
+        output, status = runSource(source)
+        assert status == 0, name
+
+def test_comparisonNames():
+    assert set(benchmark.comparisons) == {"scopes", "scanners", "tokenStore", "output", "quicken", "ropes",
+                                          "properties", "async", "explicitStack", "loops", "returns", "nodes"}
+
+def run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "benchmark.py", *args], capture_output=True, text=True, cwd=repoDir, timeout=300)
+
+def test_commandLineWritesJson():
+    result = run("large_generated", "--repeat", "1", "--large-size", "0.01", "--backend", "python")
+    assert result.returncode == 0
+    report = json.loads(result.stdout)
+    assert report["meta"]["options"]["backend"] == "python"
+    assert set(report["results"]) == {"large_generated"}
+
+def test_commandLineCompare():
+    result = run("--compare", "scanners", "--repeat", "1", "--large-size", "0.01")
+    assert result.returncode == 0
+    assert "token streams match: True" in result.stdout
+
+def test_compareOutputWritesThroughAPipe(capsys):
+    benchmark.compareOutput(1, 0, lines=50)
+    report = capsys.readouterr().out.splitlines()
+    # one line per backend and sink, and none of the Lox output
+    assert len(report) == 12
+    assert all("lines/s" in line for line in report)
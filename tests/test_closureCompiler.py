@@ -0,0 +1,48 @@
+import pytest
+
+from closureCompiler import ClosureCompiler, producesBool
+from harness import fixturePath, runCli, runFixture
+from outputSink import CaptureSink
+from plox import lox
+
+@pytest.mark.parametrize("name, status", [("syntaxError", 65), ("runtimeError", 70), ("core", 0)])
+def test_exitStatusFromCommandLine(name, status):
+    assert runCli("--backend", "closure", fixturePath(name)).returncode == status
+
+@pytest.mark.parametrize("name, what", [("functions", "functions"), ("classes", "classes")])
+def test_unsupportedIsACompileError(name, what):
+    output, status = runFixture(name, backend="closure")
+    assert status == 65
+    assert output == f"[line 1] Error : {what} aren't supported by the closure backend\n"
+
+@pytest.mark.parametrize("source, isBool", [
+    ("1 < 2", True),
+    ("!x", True),
+    ("(a == b)", True),
+    ("true", True),
+    ("-x", False),
+    ("a and b", False),
+    ("x", False),
+    ("1 + 2", False),
+])
+def test_producesBool(source, isBool):
+    inst = lox(optimize=False)
+    [statement] = inst.compile(f"print {source};")
+    assert producesBool(statement.expression) is isBool
+
+def test_globalsLastBetweenRuns():
+    sink = CaptureSink()
+    inst = lox(backend="closure", output=sink)
+    inst.run("var a = 1;")
+    inst.run("a = a + 1;")
+    inst.run("print a;")
+    assert sink.getvalue() == "2.0\n"
+
+def test_compilesToCallables():
+    inst = lox(backend="closure", output=CaptureSink())
+    assert isinstance(inst.interpreter, ClosureCompiler)
+    program = inst.interpreter.compile(inst.compile("var a = 1; print a + 1;"))
+    assert all(callable(statement) for statement in program)
+    for statement in program:
+        statement(None)
+    assert inst.output.getvalue() == "2.0\n"
@@ -0,0 +1,19 @@
+import pytest
+
+from harness import edgeSources, expected, fixturesFor, modes, runFixture, runSource
+
+@pytest.mark.parametrize("mode, name", [(mode, name) for mode in modes for name in fixturesFor(mode)])
+def test_fixture(mode, name):
+    assert runFixture(name, **modes[mode]) == expected(name)
+
+@pytest.mark.parametrize("mode, name", [(mode, name) for mode in modes for name in fixturesFor(mode)])
+def test_fixtureFromCache(mode, name, tmp_path):
+    # the first run compiles and stores, the second runs the cached tree
+    first = runFixture(name, cacheDir=str(tmp_path), **modes[mode])
+    second = runFixture(name, cacheDir=str(tmp_path), **modes[mode])
+    assert first == second == expected(name)
+
+@pytest.mark.parametrize("mode", [mode for mode in modes if mode != "tree"])
+@pytest.mark.parametrize("source", edgeSources)
+def test_edgeCase(source, mode):
+    assert runSource(source, **modes[mode]) == runSource(source)
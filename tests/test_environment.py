@@ -0,0 +1,68 @@
+import pytest
+
+from environment import ArrayEnvironment, Environment
+from harness import expected, fixtureNames, runFixture
+from plox import Interpreter, lox
+from ploxRuntime import LoxRuntimeError
+from ploxTokens import Token, tokenType
+
+scopeTypes = [Environment, ArrayEnvironment]
+
+def name(lexeme: str) -> Token:
+    return Token(tokenType.identifier, lexeme, 1)
+
+@pytest.mark.parametrize("scopeType", scopeTypes)
+@pytest.mark.parametrize("fixture", [name for name in fixtureNames() if name != "syntaxError"])
+def test_fixturesWithEitherScope(fixture, scopeType, monkeypatch):
+    monkeypatch.setitem(lox.backends, "tree", lambda inst: Interpreter(inst, scopeType))
+    assert runFixture(fixture) == expected(fixture)
+
+@pytest.mark.parametrize("scopeType", scopeTypes)
+def test_slotAccessThroughScopes(scopeType):
+    names = ("a", "b")
+    outer = scopeType(None, names)
+    outer.defineAt(0, "a", 1.0)
+    outer.defineAt(1, "b", 2.0)
+    inner = scopeType(outer, ("c",))
+    inner.defineAt(0, "c", 3.0)
+
+    assert inner.getAt(1, 1, "b") == 2.0
+    inner.assignAt(1, 0, "a", 10.0)
+    assert outer.getAt(0, 0, "a") == 10.0
+    assert inner.getAt(0, 0, "c") == 3.0
+
+@pytest.mark.parametrize("scopeType", scopeTypes)
+def test_bindFillsParametersFirst(scopeType):
+    frame = scopeType(None, ("x", "y", "local"))
+    frame.bind([1.0, 2.0])
+    assert frame.getAt(0, 0, "x") == 1.0
+    assert frame.getAt(0, 1, "y") == 2.0
+
+@pytest.mark.parametrize("scopeType", scopeTypes)
+def test_byNameLookups(scopeType):
+    outer = scopeType(None, ("a",))
+    outer.define("a", 1.0)
+    inner = scopeType(outer, ("b",))
+    inner.define("b", 2.0)
+    assert inner.get(name("a")) == 1.0
+    inner.assign(name("a"), 5.0)
+    assert outer.get(name("a")) == 5.0
+
+    with pytest.raises(LoxRuntimeError):
+        inner.get(name("missing"))
+    with pytest.raises(LoxRuntimeError):
+        inner.assign(name("missing"), 1.0)
+
+def test_arrayScopeHasNoDict():
+    scope = ArrayEnvironment(None, ("a",))
+    assert not hasattr(scope, "__dict__")
+    # the resolver's names tuple is shared, not copied
+    names = ("a", "b")
+    assert ArrayEnvironment(None, names).names is names
+
+def test_arrayScopeRefusesUnresolvedNames():
+    with pytest.raises(RuntimeError):
+        ArrayEnvironment(None, ("a",)).define("b", 1.0)
+
+def test_interpreterUsesArrayScopes():
+    assert lox().interpreter.scopeType is ArrayEnvironment
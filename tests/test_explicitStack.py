@@ -0,0 +1,21 @@
+import pytest
+
+from benchmark import nestedSource
+from harness import fixturePath, runCli, runSource
+
+@pytest.mark.parametrize("name", ["grouping", "binary", "right", "unary", "blocks", "ifs"])
+def test_nestingPastRecursionLimit(name):
+    output, status = runSource(nestedSource(5000)[name], explicitStack=True)
+    assert status == 0
+    assert output in ("1.0\n", "5001.0\n", "-1.0\n")
+
+def test_syntaxErrorFromCommandLine():
+    result = runCli("--explicit-stack", fixturePath("syntaxError"))
+    assert result.returncode == 65
+    assert "Error at ';': expected expression" in result.stdout
+    assert "Traceback" not in result.stderr
+
+def test_runtimeErrorFromCommandLine():
+    result = runCli("--explicit-stack", fixturePath("runtimeError"))
+    assert result.returncode == 70
+    assert "operand must be a number" in result.stdout
@@ -0,0 +1,79 @@
+import pytest
+
+from harness import runSource
+from natives import natives, native
+from plox import lox
+
+treeModes = [{}, {"optimize": False}, {"quicken": True}, {"explicitStack": True}, {"parser": "pratt"}, {"scanner": "compact"}]
+
+@pytest.mark.parametrize("options", treeModes)
+@pytest.mark.parametrize("source, error", [
+    ("fun f(a, b) {} f(1);", "expected 2 arguments but got 1\n[line 1]\n"),
+    ('"text"();', "can only call functions and classes\n[line 1]\n"),
+    ("var x = nil; x();", "can only call functions and classes\n[line 1]\n"),
+    ("clock(1);", "expected 0 arguments but got 1\n[line 1]\n"),
+])
+def test_callErrors(source, error, options):
+    assert runSource(source, **options) == (error, 70)
+
+def test_tooManyParameters():
+    params = ", ".join(f"p{i}" for i in range(256))
+    output, status = runSource(f"fun f({params}) {{}}")
+    assert status == 65
+    assert "can't have more than 255 parameters" in output
+
+def test_argumentsEvaluatedLeftToRight():
+    source = """
+    var log = "";
+    fun note(s) { log = log + s; return s; }
+    fun three(a, b, c) { return a + b + c; }
+    print three(note("a"), note("b"), note("c"));
+    print log;
+    """
+    assert runSource(source) == ("abc\nabc\n", 0)
+
+def test_framesAreFreshPerCall():
+    # each call gets its own frame, even while an earlier one is still live
+    source = """
+    fun make(n) {
+        var own = n;
+        fun get() { return own; }
+        return get;
+    }
+    var first = make(1);
+    var second = make(2);
+    print first() + second();
+    fun depth(n) { var local = n; if (n > 0) depth(n - 1); return local; }
+    print depth(50);
+    """
+    assert runSource(source) == ("3.0\n50.0\n", 0)
+
+@pytest.mark.parametrize("options", treeModes)
+def test_recursion(options):
+    # each Lox call is still a Python call in every mode, so keep it shallow
+    source = "fun down(n) { if (n == 0) return 0; return down(n - 1) + 1; } print down(100);"
+    assert runSource(source, **options) == ("100.0\n", 0)
+
+def test_nativeDecorator():
+    try:
+        @native("shout")
+        def loud(text):
+            return text.upper() + "!"
+
+        assert natives["shout"].arity == 1
+        assert str(natives["shout"]) == "<native fn>"
+        assert runSource('print shout("hi");') == ("HI!\n", 0)
+    finally:
+        del natives["shout"]
+
+def test_nativeSeenOnlyByLaterInstances():
+    before = lox()
+    try:
+        @native()
+        def later():
+            return 1
+
+        assert "later" not in dict(before.interpreter.globals.items())
+        assert runSource("print later();") == ("1.0\n", 0)
+    finally:
+        del natives["later"]
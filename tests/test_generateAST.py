@@ -0,0 +1,64 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import AST
+import STMT
+from AST import Binary, Expr, Literal, Variable
+from STMT import Stmt
+from generateAST import parseType
+from harness import repoDir
+from plox import Interpreter, lox
+from ploxTokens import Token, tokenType
+
+nodeTypes = {base: [cls for cls in vars(module).values() if isinstance(cls, type) and issubclass(cls, base) and cls is not base]
+             for module, base in ((AST, Expr), (STMT, Stmt))}
+
+def test_generatedFilesAreCheckedIn(tmp_path):
+    shutil.copy(os.path.join(repoDir, "generateAST.py"), tmp_path)
+    subprocess.run([sys.executable, "generateAST.py"], cwd=tmp_path, check=True, timeout=60)
+    for name in ("AST.py", "STMT.py"):
+        with open(os.path.join(tmp_path, name)) as generated, open(os.path.join(repoDir, name)) as checkedIn:
+            assert generated.read() == checkedIn.read(), f"{name} is out of date, rerun generateAST.py"
+
+def test_parseType():
+    assert parseType("Get      : object: Expr, name: Token ; cache") == ("Get", ["object: Expr", "name: Token"], ["cache"])
+    assert parseType("Literal  : value: object") == ("Literal", ["value: object"], [])
+    assert parseType("Assign   : name: Token, value: Expr ; depth, slot")[2] == ["depth", "slot"]
+
+@pytest.mark.parametrize("base", [Expr, Stmt])
+def test_kindsIndexTheDispatchTable(base):
+    module = AST if base is Expr else STMT
+    visits = getattr(module, f"{base.__name__.lower()}Visits")
+    kinds = sorted(cls.kind for cls in nodeTypes[base])
+    assert kinds == list(range(len(visits)))
+    for cls in nodeTypes[base]:
+        assert visits[cls.kind] == f"visit{cls.__name__}{base.__name__}"
+
+@pytest.mark.parametrize("cls", nodeTypes[Expr] + nodeTypes[Stmt], ids=lambda cls: cls.__name__)
+def test_slotsAndMatchArgs(cls):
+    assert set(cls.__match_args__) <= set(cls.__slots__)
+    fields = [None] * len(cls.__match_args__)
+    node = cls(*fields)
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.notAField = 1
+
+def test_patternMatching():
+    plus = Token(tokenType.plus, "+", 1)
+    match Binary(Literal(1.0), plus, Variable(Token(tokenType.identifier, "x", 1))):
+        case Binary(Literal(value), operator, Variable(name)):
+            assert (value, operator.lexeme, name.lexeme) == (1.0, "+", "x")
+        case _:
+            pytest.fail("didn't match")
+
+def test_interpreterTablesMatchVisitors():
+    interpreter = lox().interpreter
+    assert isinstance(interpreter, Interpreter)
+    for cls in nodeTypes[Expr]:
+        assert interpreter.exprTable[cls.kind].__name__ == f"visit{cls.__name__}Expr"
+    for cls in nodeTypes[Stmt]:
+        assert interpreter.stmtTable[cls.kind].__name__ == f"visit{cls.__name__}Stmt"
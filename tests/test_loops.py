@@ -0,0 +1,70 @@
+import pytest
+
+from AST import Assign
+from STMT import Block, Var, While
+from benchmark import CountingEnvironment, DesugaringOptimizer, ScopedResolver, loopWorkloads
+from harness import runSource
+from optimizer import Optimizer
+from outputSink import CaptureSink
+from plox import Interpreter, Parser, lox
+from resolver import Resolver
+
+modes = [{}, {"optimize": False}, {"quicken": True}, {"explicitStack": True},
+         {"backend": "closure"}, {"backend": "vm"}, {"backend": "python"}]
+
+def run(source: str, optimizerType: type = Optimizer, resolverType: type = Resolver) -> tuple[str, int]:
+    # the output and how many scopes the run made
+    inst = lox(output=CaptureSink())
+    inst.interpreter = Interpreter(inst, CountingEnvironment)
+    statements = optimizerType().optimize(Parser(inst, inst.scannerType(inst, source).scanTokens()).parse())
+    resolverType(inst).resolve(statements)
+    CountingEnvironment.created = 0
+    inst.interpreter.interperate(statements)
+    return inst.output.getvalue(), CountingEnvironment.created
+
+def test_forKeepsIncrementOnWhile():
+    [loop] = lox().compile("for (var i = 0; i < 3; i = i + 1) print i;")
+    assert isinstance(loop, Block)
+    declaration, body = loop.statements
+    assert isinstance(declaration, Var)
+    assert isinstance(body, While)
+    assert isinstance(body.increment, Assign)
+
+@pytest.mark.parametrize("name", sorted(loopWorkloads))
+def test_scopesPerIteration(name):
+    source, iterations = loopWorkloads[name]
+    output, scopes = run(source)
+    desugaredOutput, desugaredScopes = run(source, DesugaringOptimizer, ScopedResolver)
+    assert output == desugaredOutput
+    # a scope per loop variable declared, and per iteration only if the body
+    # declares something
+    assert scopes == {"simple": 1, "nested": 1 + 300, "locals": 1 + iterations}[name]
+    assert desugaredScopes >= 2 * iterations
+
+@pytest.mark.parametrize("options", modes)
+@pytest.mark.parametrize("source, output", [
+    ("for (var i = 0; i < 3; i = i + 1) print i;", "0.0\n1.0\n2.0\n"),
+    ("var i = 10; for (; i > 7;) i = i - 1; print i;", "7.0\n"),
+    ("for (var i = 0; i < 2; i = i + 1) { var i = 5; print i; }", "5.0\n5.0\n"),
+    ("var total = 0; for (var i = 0; i < 3; i = i + 1) for (var j = 0; j < i; j = j + 1) total = total + 1; print total;", "3.0\n"),
+    ("var i = 0; while (i < 3) { { i = i + 1; } } print i;", "3.0\n"),
+    ('var s = ""; for (var i = 0; i < 3; i = i + 1) { var c = "x"; { var d = c + c; s = s + d; } } print s;', "xxxxxx\n"),
+])
+def test_loopSemantics(source, output, options):
+    assert runSource(source, **options) == (output, 0)
+
+@pytest.mark.parametrize("options", [{}, {"quicken": True}, {"explicitStack": True}])
+def test_closuresSeeTheirIteration(options):
+    # the body declares j, so every iteration gets a scope of its own and
+    # each closure keeps its own j; i is the one loop variable
+    source = """
+    var first; var second;
+    for (var i = 0; i < 2; i = i + 1) {
+        var j = i;
+        fun get() { return j * 10 + i; }
+        if (i == 0) first = get; else second = get;
+    }
+    print first();
+    print second();
+    """
+    assert runSource(source, **options) == ("2.0\n12.0\n", 0)
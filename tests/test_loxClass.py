@@ -0,0 +1,175 @@
+import gc
+
+from harness import runSource
+from loxClass import LoxClass, Shape
+from outputSink import CaptureSink
+from plox import LoxFunction, lox
+
+def test_instancesFromOneInitShareAShape():
+    inst = lox(output=CaptureSink())
+    inst.run("class P { init(x, y) { this.x = x; this.y = y; } } var a = P(1, 2); var b = P(3, 4); var c = P(5, 6); c.z = 1;")
+    globals = dict(inst.interpreter.globals.items())
+    a, b, c = globals["a"], globals["b"], globals["c"]
+    assert a.shape is b.shape
+    assert a.shape.fields == {"x": 0, "y": 1}
+    assert c.shape is not a.shape
+    assert c.shape.fields == {"x": 0, "y": 1, "z": 2}
+    assert not hasattr(a, "__dict__")
+
+def test_shapeTransitionsAreShared():
+    root = Shape({})
+    assert root.withField("q") is root.withField("q")
+    assert root.withField("q").withField("r").fields == {"q": 0, "r": 1}
+
+def test_shapesBelongToTheInterpreter():
+    source = "class P { init() { this.x = 1; } } var p = P();"
+    first = lox(output=CaptureSink())
+    first.run(source)
+    second = lox(output=CaptureSink())
+    second.run(source)
+    p1 = dict(first.interpreter.globals.items())["p"]
+    p2 = dict(second.interpreter.globals.items())["p"]
+    assert p1.shape.fields == p2.shape.fields
+    assert p1.shape is not p2.shape
+    # nothing about the first run's shapes is left in the second's
+    assert p2.shape is second.interpreter.rootShape.withField("x")
+    assert first.interpreter.rootShape.transitions.keys() == {"x"}
+
+def countShapes() -> int:
+    gc.collect()
+    return sum(1 for obj in gc.get_objects() if type(obj) is Shape)
+
+def test_shapesAreFreedWithTheirInterpreter():
+    before = countShapes()
+    for i in range(20):
+        inst = lox(output=CaptureSink())
+        inst.run(f"class P {{ init() {{ this.x{i} = 1; }} }} var p = P();")
+    del inst
+    assert countShapes() <= before
+
+def test_programRunsGetFreshShapes():
+    program = lox(output=CaptureSink()).prepare("class P { init(n) { this.n = n; } } var p = P(1);")
+    first = program.execute()["p"]
+    second = program.execute()["p"]
+    assert first.shape is not second.shape
+
+def test_methodCacheFillsOnLookup():
+    inst = lox(output=CaptureSink())
+    inst.run("class A { a() {} shared() {} } class B < A { b() {} shared() {} }")
+    globals = dict(inst.interpreter.globals.items())
+    a, b = globals["A"], globals["B"]
+    assert isinstance(b, LoxClass)
+    assert b.findMethod("a") is a.methods["a"]
+    assert b.findMethod("shared") is b.methods["shared"]
+    assert b.findMethod("missing") is None
+    # misses are cached too, init's included
+    assert b.methodCache == {"init": None, "a": a.methods["a"], "shared": b.methods["shared"], "missing": None}
+
+def test_methodCacheSeesClassNotJustShape():
+    # both instances get field x first, so they share a shape, and the one
+    # p.name Get site sees both
+    source = """
+    class A { init() { this.x = 1; } name() { return "A"; } }
+    class B { init() { this.x = 2; } name() { return "B"; } }
+    fun name(p) { return p.name(); }
+    print name(A());
+    print name(B());
+    print name(A());
+    """
+    assert runSource(source) == ("A\nB\nA\n", 0)
+
+def test_fieldShadowsMethodAfterCaching():
+    source = """
+    class A { m() { return "method"; } }
+    fun get(p) { return p.m; }
+    var a = A();
+    print get(a)();
+    a.m = "field";
+    print get(a);
+    """
+    assert runSource(source) == ("method\nfield\n", 0)
+
+def test_fieldsAddedInDifferentOrders():
+    source = """
+    class P {}
+    fun make(first) {
+        var p = P();
+        if (first) { p.x = 1; p.y = 2; } else { p.y = 20; p.x = 10; }
+        return p;
+    }
+    fun sum(p) { return p.x + p.y; }
+    print sum(make(true));
+    print sum(make(false));
+    print sum(make(true));
+    """
+    assert runSource(source) == ("3.0\n30.0\n3.0\n", 0)
+
+def test_inheritedMethodsAndSuper():
+    source = """
+    class A { hi() { return "A"; } both() { return this.hi(); } }
+    class B < A { hi() { return "B" + super.hi(); } }
+    print B().both();
+    print A().both();
+    """
+    assert runSource(source) == ("BA\nA\n", 0)
+
+def test_initializerReturnsInstance():
+    source = """
+    class A { init(n) { this.n = n; return; } }
+    var a = A(3);
+    print a.init(4) == a;
+    print a.n;
+    """
+    assert runSource(source) == ("True\n4.0\n", 0)
+
+def test_undefinedProperty():
+    output, status = runSource("class A {} print A().missing;")
+    assert status == 70
+    assert "undefined property missing" in output
+
+def test_propertyOnNonInstance():
+    output, status = runSource('print "text".length;')
+    assert status == 70
+    assert "only instances have properties" in output
+
+def test_superclassMustBeAClass():
+    output, status = runSource("var NotAClass = 1; class A < NotAClass {}")
+    assert status == 70
+    assert "superclass must be a class" in output
+
+def test_constructorArity():
+    output, status = runSource("class A { init(a, b) {} } A(1);")
+    assert status == 70
+    assert "expected 2 arguments but got 1" in output
+
+def test_cachedMethodCallsDontBind(monkeypatch):
+    binds = []
+    bind = LoxFunction.bind
+    monkeypatch.setattr(LoxFunction, "bind", lambda self, instance: binds.append(1) or bind(self, instance))
+    source = """
+    class A { m(n) { return n + 1; } }
+    var a = A();
+    var total = 0;
+    for (var i = 0; i < 10; i = i + 1) { total = a.m(total); }
+    print total;
+    """
+    assert runSource(source) == ("10.0\n", 0)
+    # only the first call, which fills the Get's cache, binds
+    assert len(binds) == 1
+
+def test_cachedMethodCallArity():
+    source = "class A { m(n) { return n; } } var a = A(); for (var i = 0; i < 3; i = i + 1) { print a.m(i); } a.m();"
+    output, status = runSource(source)
+    assert status == 70
+    assert output.startswith("0.0\n1.0\n2.0\nexpected 1 arguments but got 0")
+
+def test_cachedMethodCallTakesMethodBeforeArguments():
+    source = """
+    class A { m(x) { return "method"; } }
+    fun call(a, v) { return a.m(a.m = v); }
+    var a = A();
+    print call(A(), 1);
+    print call(a, 1);
+    print a.m;
+    """
+    assert runSource(source) == ("method\nmethod\n1.0\n", 0)
@@ -0,0 +1,45 @@
+import pytest
+
+from harness import runSource
+from natives import natives, registerNative
+from rope import Rope, ropeThreshold
+
+@pytest.fixture
+def registered():
+    added = []
+
+    def register(name, function, arity=None):
+        added.append(name)
+        return registerNative(name, function, arity)
+
+    yield register
+    for name in added:
+        del natives[name]
+
+# a string long enough for + to build it as a Rope
+longString = f'var s = "{"x" * ropeThreshold}"; s = s + "y";'
+
+def test_ropeArgumentIsFlattened(registered):
+    seen = []
+    registered("measure", lambda text: seen.append(type(text)) or len(text))
+    output, status = runSource(longString + " print measure(s);")
+    assert (output, status) == (f"{ropeThreshold + 1.0}\n", 0)
+    assert seen == [str]
+
+def test_ropeResultIsFlattened(registered):
+    registered("twice", lambda text: Rope([text, text], 2 * len(text)))
+    output, status = runSource('print twice("ab") == "abab";')
+    assert (output, status) == ("True\n", 0)
+
+def test_intResultBecomesNumber(registered):
+    registered("answer", lambda: 42)
+    assert runSource("print answer() + 0.5;") == ("42.5\n", 0)
+
+def test_arityIsChecked(registered):
+    registered("pair", lambda a, b: a)
+    output, status = runSource("pair(1);")
+    assert status == 70
+    assert "expected 2 arguments but got 1" in output
+
+def test_clockIsRegistered():
+    assert runSource("print clock() >= 0;") == ("True\n", 0)
@@ -0,0 +1,71 @@
+import pytest
+
+from AST import Binary, Literal
+from STMT import Block, If, Print, While
+from harness import runSource
+from optimizer import Optimizer
+from plox import lox
+
+modes = [
+    {},
+    {"optimize": False},
+    {"backend": "closure"},
+    {"backend": "vm"},
+    {"backend": "python"},
+    {"quicken": True},
+    {"explicitStack": True},
+]
+
+def optimized(source: str) -> list:
+    inst = lox()
+    return Optimizer().optimize(inst.parserType(inst, inst.scannerType(inst, source).scanTokens()).parse())
+
+def test_foldsConstants():
+    [statement] = optimized('print (1 + 2) * 3 < 10 and "a" + "b";')
+    assert isinstance(statement, Print)
+    assert isinstance(statement.expression, Literal)
+    assert statement.expression.value == "ab"
+
+@pytest.mark.parametrize("source", ["print 1 / 0;", 'print 1 + "a";', "print 1 / -0;"])
+def test_leavesRuntimeErrorsAlone(source):
+    [statement] = optimized(source)
+    assert isinstance(statement.expression, Binary)
+
+@pytest.mark.parametrize("options", modes)
+def test_divideByZeroAfterWarmup(options):
+    source = "var i = 20;\nwhile (i > -1) {\n  print 1 / i;\n  i = i - 1;\n}\n"
+    output, status = runSource(source, **options)
+    assert status == 70
+    assert output.endswith("1.0\ndivision by zero\n[line 3]\n")
+
+@pytest.mark.parametrize("source, kept", [
+    ("if (true) print 1; else print 2;", [1.0]),
+    ("if (1 > 2) print 1; else print 2;", [2.0]),
+    ("if (nil) print 1;", []),
+    ("while (false) print 1;", []),
+    ("while (1 < 0) { print 1; }", []),
+])
+def test_prunesConstantBranches(source, kept):
+    statements = optimized(source)
+    assert [statement.expression.value for statement in statements] == kept
+
+def test_emptiedBodiesStayStatements():
+    [loop] = optimized("var x; while (x) { 1 + 2; }")[1:]
+    assert isinstance(loop, While)
+    assert isinstance(loop.body, Block) and loop.body.statements == []
+
+    [branch] = optimized("var x; if (x) 1; else print 2;")[1:]
+    assert isinstance(branch, If)
+    assert isinstance(branch.thenBranch, Block)
+
+@pytest.mark.parametrize("source, value", [
+    ('nil or "default";', "default"),
+    ("false and x;", False),
+    ('1 and "right";', "right"),
+    ("!nil;", True),
+    ("-(2 * 3);", -6.0),
+])
+def test_foldsLogicAndUnary(source, value):
+    [statement] = optimized("print " + source)
+    assert isinstance(statement.expression, Literal)
+    assert statement.expression.value == value
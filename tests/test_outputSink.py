@@ -0,0 +1,91 @@
+import io
+
+import pytest
+
+from harness import coreFixtures, expected, fixturePath, runCli, runFixture
+from outputSink import BufferedSink, CaptureSink
+from plox import lox
+from ploxRuntime import stringify
+from rope import Rope
+
+class CountingStream(io.StringIO):
+
+    def __init__(self, tty: bool = False):
+        super().__init__()
+        self.writes = 0
+        self.tty = tty
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+    def isatty(self):
+        return self.tty
+
+@pytest.mark.parametrize("value, text", [
+    ("plain", "plain"),
+    (3.0, "3.0"),
+    (2.5, "2.5"),
+    (1 / 3, "0.33"),
+    (-0.125, "-0.12"),
+    (None, "nil"),
+    (True, "True"),
+    (Rope(["ab", "cd"], 4), "abcd"),
+])
+def test_stringify(value, text):
+    assert stringify(value) == text
+
+def test_bufferPolicyWritesOnce():
+    stream = CountingStream()
+    sink = BufferedSink(stream, flush="buffer")
+    for i in range(100):
+        sink.writeLine(str(i))
+    assert stream.writes == 0
+    sink.flush()
+    assert stream.writes == 1
+    assert stream.getvalue() == "".join(f"{i}\n" for i in range(100))
+
+def test_bufferPolicyWritesWhenFull():
+    stream = CountingStream()
+    sink = BufferedSink(stream, flush="buffer", bufferSize=10)
+    for _ in range(6):
+        sink.writeLine("abcd")
+    # every second line fills the buffer
+    assert stream.writes == 3
+    sink.flush()
+    assert stream.getvalue() == "abcd\n" * 6
+
+def test_linePolicyWritesEveryLine():
+    stream = CountingStream()
+    sink = BufferedSink(stream, flush="line")
+    sink.writeLine("a")
+    sink.writeLine("b")
+    assert stream.writes == 2
+    assert stream.getvalue() == "a\nb\n"
+
+@pytest.mark.parametrize("tty, writes", [(True, 3), (False, 0)])
+def test_autoPolicyFollowsTerminal(tty, writes):
+    stream = CountingStream(tty)
+    sink = BufferedSink(stream)
+    for line in "abc":
+        sink.writeLine(line)
+    assert stream.writes == writes
+
+def test_unknownPolicy():
+    with pytest.raises(ValueError):
+        BufferedSink(flush="sometimes")
+
+@pytest.mark.parametrize("backend", ["tree", "closure", "vm", "python"])
+def test_captureSink(backend):
+    sink = CaptureSink()
+    inst = lox(backend=backend, output=sink)
+    inst.run('print 1; print "two"; print nil;')
+    assert sink.getvalue() == "1.0\ntwo\nnil\n"
+
+@pytest.mark.parametrize("flush", ["line", "buffer"])
+@pytest.mark.parametrize("name", coreFixtures)
+def test_outputAndErrorsInOrder(name, flush):
+    result = runCli("--flush", flush, fixturePath(name))
+    output, status = expected(name)
+    assert (result.stdout, result.returncode) == (output, status)
+    assert runFixture(name) == (output, status)
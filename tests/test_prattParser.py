@@ -0,0 +1,37 @@
+import pytest
+
+from harness import fixtureNames, fixturePath, parseSource, readFixture, runCli
+
+expressions = [
+    "print 1 + 2 * 3 - 4 / 5;",
+    "print -1 - -2;",
+    "print !!true == !false;",
+    "print 1 < 2 == 3 >= 4 != 5 <= 6;",
+    "print a or b and c or d;",
+    "print (1 + 2) * (3 - (4 / 5));",
+    "a = b = c = 1;",
+    "a.b.c = d.e(f)(g).h;",
+    "print f()()(1, 2)(3);",
+    "print super.method(this.x);",
+    'print "a" + "b" + "c";',
+]
+
+malformed = [
+    "print 1 +;",
+    "a + b = c;",
+    "print (1;",
+    "print );",
+    "f(1,);",
+    "a.;",
+    "print 1 2;",
+    "var 1 = 2;",
+    "print ! ;",
+]
+
+@pytest.mark.parametrize("source", [readFixture(name) for name in fixtureNames()] + expressions + malformed)
+def test_sameTreeAsRecursiveParser(source):
+    assert parseSource(source, parser="pratt") == parseSource(source)
+
+@pytest.mark.parametrize("name, status", [("syntaxError", 65), ("runtimeError", 70), ("classes", 0)])
+def test_exitStatusFromCommandLine(name, status):
+    assert runCli("--parser", "pratt", fixturePath(name)).returncode == status
@@ -0,0 +1,57 @@
+import os
+
+from harness import expected, fixturePath, runCli
+from outputSink import CaptureSink
+from plox import lox
+from profiler import ProfilingInterpreter
+
+source = """var t = 0;
+for (var i = 0; i < 10; i = i + 1) {
+  t = t + i;
+}
+print t;
+"""
+
+def profiled(source: str) -> ProfilingInterpreter:
+    inst = lox(profile=True, output=CaptureSink())
+    inst.run(source)
+    return inst.interpreter
+
+def test_hitsPerLineAndNode():
+    stats = profiled(source).stats
+    assert stats[(2, "Binary(<)")][0] == 11
+    assert stats[(3, "Assign(t)")][0] == 10
+    assert stats[(5, "Print")][0] == 1
+    for hits, cumulative, selfTime in stats.values():
+        assert cumulative >= selfTime >= 0
+
+def test_report():
+    lines = profiled(source).report(source).splitlines()
+    assert lines[0].split() == ["line", "node", "hits", "cum", "ms", "self", "ms", "source"]
+    printed = [line for line in lines if "Print" in line]
+    assert printed[0].split()[0] == "5"
+    assert printed[0].endswith("print t;")
+
+def test_collapsedStacks():
+    lines = profiled(source).collapsed().splitlines()
+    assert lines
+    for line in lines:
+        path, micros = line.rsplit(" ", 1)
+        assert int(micros) > 0
+        assert all("@" in frame for frame in path.split(";"))
+    assert any(line.startswith("Block@2;While@2;") for line in lines)
+
+def test_commandLine(tmp_path):
+    collapsed = os.path.join(tmp_path, "profile.txt")
+    result = runCli("--profile", "--profile-collapsed", collapsed, fixturePath("core"))
+    assert result.returncode == 0
+    assert result.stdout == expected("core")[0]
+    assert "hits" in result.stderr
+    with open(collapsed) as f:
+        assert f.read().strip()
+
+def test_commandLineRuntimeError():
+    result = runCli("--profile", fixturePath("runtimeError"))
+    assert result.returncode == 70
+    assert result.stdout == expected("runtimeError")[0]
+    assert "Unary(-)" in result.stderr
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from harness import readFixture
+from outputSink import CaptureSink
+from plox import lox
+from ploxRuntime import LoxRuntimeError
+
+backends = ["tree", "closure", "vm", "python"]
+
+source = """
+var total = 0;
+var i = 0;
+while (i < n) {
+  total = total + i;
+  i = i + 1;
+}
+var label = "sum " + name;
+print label;
+"""
+
+def prepare(source: str, **options):
+    return lox(**options).prepare(source)
+
+@pytest.mark.parametrize("backend", backends)
+def test_sameGlobalsOnEveryBackend(backend):
+    output = CaptureSink()
+    result = prepare(source, backend=backend).execute({"n": 5, "name": "five"}, output=output)
+    assert result == {"n": 5.0, "name": "five", "total": 10.0, "i": 5.0, "label": "sum five"}
+    assert output.getvalue() == "sum five\n"
+
+@pytest.mark.parametrize("backend", backends)
+def test_coreFixtureGlobalsMatchTreeWalker(backend):
+    program = prepare(readFixture("core"), backend=backend)
+    expected = prepare(readFixture("core")).execute(output=CaptureSink())
+    assert program.execute(output=CaptureSink()) == expected
+
+def test_reassignedNativeIsKept():
+    result = prepare("clock = 1;").execute(output=CaptureSink())
+    assert result == {"clock": 1.0}
+
+@pytest.mark.parametrize("backend", backends)
+def test_runsDontShareGlobals(backend):
+    program = prepare("var seen = n;", backend=backend)
+    assert program.execute({"n": 1}, output=CaptureSink())["seen"] == 1.0
+    assert program.execute({"n": 2}, output=CaptureSink())["seen"] == 2.0
+
+def test_concurrentRuns():
+    program = prepare(source)
+    results = {}
+
+    def run(n):
+        results[n] = program.execute({"n": n, "name": str(n)}, output=CaptureSink())["total"]
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {n: float(n * (n - 1) // 2) for n in range(8)}
+
+@pytest.mark.parametrize("backend", backends)
+def test_runtimeErrorRaises(backend):
+    program = prepare('print "a"; print -"b";', backend=backend)
+    output = CaptureSink()
+    with pytest.raises(LoxRuntimeError):
+        program.execute(output=output)
+    assert output.getvalue() == "a\n"
+
+def test_syntaxErrorPreparesNothing(capsys):
+    assert prepare("print ;") is None
@@ -0,0 +1,57 @@
+from harness import runSource
+from outputSink import CaptureSink
+from plox import lox
+
+def quickened(source: str, **options):
+    inst = lox(quicken=True, output=CaptureSink())
+    for name, value in options.items():
+        setattr(inst.interpreter, name, value)
+    inst.run(source)
+    return inst.output.getvalue(), inst.interpreter.stats()
+
+def test_stableTypesSpecialise():
+    output, stats = quickened('var t = 0; var s = ""; for (var i = 0; i < 50; i = i + 1) { t = t + i * 2; s = s + "x"; } print t; print s == "";')
+    assert output == "2450.0\nFalse\n"
+    # <, +, * and the two string ops
+    assert stats["specialised"] >= 4
+    assert stats["deopts"] == 0
+
+def test_nothingSpecialisesBeforeWarmup():
+    _, stats = quickened("for (var i = 0; i < 3; i = i + 1) {}")
+    assert stats["specialisations"] == 0
+
+def test_typeChangeDeoptimises():
+    # the same + sees numbers long enough to specialise, then strings
+    source = """
+    var a = 1; var b = 2; var out = nil;
+    for (var i = 0; i < 40; i = i + 1) {
+        if (i == 20) { a = "x"; b = "y"; }
+        out = a + b;
+    }
+    print out;
+    """
+    output, stats = quickened(source)
+    assert output == "xy\n"
+    assert stats["deopts"] >= 1
+    assert stats["deoptsByNode"][0][1] == "+"
+
+def test_staysGenericAfterMaxDeopts():
+    source = """
+    var v = 0; var out = nil;
+    for (var i = 0; i < 200; i = i + 1) {
+        if (i == 20 or i == 60 or i == 100 or i == 140 or i == 180) v = "s";
+        if (i == 40 or i == 80 or i == 120 or i == 160) v = 0;
+        out = v + v;
+    }
+    print out;
+    """
+    output, stats = quickened(source, maxDeopts=2)
+    assert output == "ss\n"
+    assert stats["generic"] >= 1
+    assert max(count for _, _, count in stats["deoptsByNode"]) == 2
+
+def test_errorsAfterSpecialising():
+    source = 'var x = 1; for (var i = 0; i < 20; i = i + 1) { if (i == 15) x = "s"; print -x; }'
+    output, status = runSource(source, quicken=True)
+    assert (output, status) == runSource(source)
+    assert status == 70
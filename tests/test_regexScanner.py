@@ -0,0 +1,47 @@
+import pytest
+
+from harness import fixtureNames, readFixture
+from plox import lox
+from ploxTokens import tokenType
+
+tricky = [
+    "1. .5 1.2.3 a.b",
+    "!== <== >=> === !!",
+    "or orchid and andy nil nile _x x_1 __",
+    '"multi\nline\nstring" after',
+    '"unterminated\nstring',
+    "// comment at the end",
+    "a // comment\nb",
+    "\t\r  x\r\n  y",
+    "@ # $ x ~",
+    "print 007.50;",
+    "",
+]
+
+def scanned(source: str, scanner: str) -> tuple[list, str]:
+    inst = lox(scanner=scanner)
+    out = []
+    inst.report = lambda line, where, msg: out.append((line, where, msg))
+    tokens = inst.scannerType(inst, source).scanTokens()
+    return [(t.type, t.lexeme, t.literal, t.line) for t in tokens], out
+
+@pytest.mark.parametrize("scanner", ["regex", "compact"])
+@pytest.mark.parametrize("source", [readFixture(name) for name in fixtureNames()] + tricky)
+def test_sameTokensAsScanner(source, scanner):
+    assert scanned(source, scanner) == scanned(source, "classic")
+
+@pytest.mark.parametrize("scanner", ["regex", "compact"])
+def test_streamingSameAsList(scanner):
+    source = readFixture("classes")
+    inst = lox(scanner=scanner)
+    streamed = [(t.type, t.lexeme, t.literal, t.line) for t in inst.scannerType(inst, source).iterTokens()]
+    assert streamed == scanned(source, scanner)[0]
+
+def test_keywordsAndLines():
+    tokens, errors = scanned('var x = "a\nb";\nx', "regex")
+    assert errors == []
+    assert [token[0] for token in tokens] == [tokenType.VAR, tokenType.identifier, tokenType.equal, tokenType.string,
+                                              tokenType.semicolon, tokenType.identifier, tokenType.EOF]
+    assert tokens[3][2] == "a\nb"
+    assert [token[3] for token in tokens] == [1, 1, 1, 2, 2, 3, 3]
+
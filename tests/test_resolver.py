@@ -0,0 +1,61 @@
+import pytest
+
+from AST import Assign, Variable
+from STMT import Block, Function
+from harness import runSource
+from plox import lox
+
+treeModes = [{}, {"optimize": False}, {"quicken": True}, {"explicitStack": True}, {"parser": "pratt"}]
+
+def resolved(source: str) -> list:
+    return lox().compile(source)
+
+def test_globalsHaveNoSlot():
+    [declaration, statement] = resolved("var a = 1; print a;")
+    assert declaration.slot is None
+    assert (statement.expression.depth, statement.expression.slot) == (None, None)
+
+def test_localSlotsInDeclarationOrder():
+    [block] = resolved("{ var a = 1; var b = 2; { print a; b = 3; } }")
+    assert isinstance(block, Block)
+    assert block.slotNames == ("a", "b")
+    [first, second, inner] = block.statements
+    assert (first.slot, second.slot) == (0, 1)
+    # the inner block declares nothing, so it gets no scope of its own
+    assert inner.slotNames is None
+    [printA, assignB] = inner.statements
+    assert (printA.expression.depth, printA.expression.slot) == (0, 0)
+    assert isinstance(assignB.expression, Assign)
+    assert (assignB.expression.depth, assignB.expression.slot) == (0, 1)
+
+def test_functionFrameHoldsParametersThenLocals():
+    [function] = resolved("fun f(a, b) { var c = a; { var d = b; print c + d; } }")
+    assert isinstance(function, Function)
+    assert function.slotNames == ("a", "b", "c")
+    inner = function.body[1]
+    assert inner.slotNames == ("d",)
+    add = inner.statements[1].expression
+    assert (add.left.depth, add.left.slot) == (1, 2)
+    assert (add.right.depth, add.right.slot) == (0, 0)
+
+def test_closureDepthCountsFunctionScopes():
+    [outer] = resolved("fun outer() { var n = 0; fun inner() { return n; } }")
+    inner = outer.body[1]
+    returned = inner.body[0].value
+    assert isinstance(returned, Variable)
+    assert (returned.depth, returned.slot) == (1, 0)
+
+@pytest.mark.parametrize("source, error", [
+    ("{ var a = 1; var a = 2; }", "[line 1] Error at 'a': there's already a variable with this name in this scope"),
+    ("{ var a = a; }", "[line 1] Error at 'a': can't read a local variable in its own initializer"),
+    ("return 1;", "[line 1] Error at 'return': can't return from top-level code"),
+    ("print this;", "[line 1] Error at 'this': can't use 'this' outside of a class"),
+    ("print super.x;", "[line 1] Error at 'super': can't use 'super' outside of a class"),
+    ("class A { m() { return super.m(); } }", "[line 1] Error at 'super': can't use 'super' in a class with no superclass"),
+    ("class A < A {}", "[line 1] Error at 'A': a class can't inherit from itself"),
+    ("class A { init() { return 1; } }", "[line 1] Error at 'return': can't return a value from an initializer"),
+])
+def test_resolveErrors(source, error):
+    # with wholeFile nothing runs, not even the statements before the error
+    output, status = runSource('print "never"; ' + source, wholeFile=True)
+    assert (output, status) == (error + "\n", 65)
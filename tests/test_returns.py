@@ -0,0 +1,50 @@
+import pytest
+
+from benchmark import ExceptionReturnInterpreter, returnWorkloads
+from harness import runSource
+from outputSink import CaptureSink
+from plox import ReturnValue, lox
+
+treeModes = [{}, {"optimize": False}, {"quicken": True}, {"explicitStack": True}]
+
+@pytest.mark.parametrize("options", treeModes)
+@pytest.mark.parametrize("source, output", [
+    # out of a loop inside nested blocks, with scopes of their own
+    ("""fun f() { var a = "outer"; { var b = 1; while (true) { var c = 2; { if (b > 0) return a; } } } }
+        print f();""", "outer\n"),
+    # the caller's scope is back in place afterwards
+    ("""var x = "global"; { var x = "caller"; fun f() { { var x = "callee"; return x; } }
+        print f(); print x; }""", "callee\ncaller\n"),
+    # a bare return, and falling off the end
+    ("fun f() { return; } fun g() {} print f(); print g();", "nil\nnil\n"),
+    # a return stops the for loop, increment included
+    ("""var n = 0; fun f() { for (var i = 0; i < 10; i = i + 1) { n = i; if (i == 3) return i; } }
+        print f(); print n;""", "3.0\n3.0\n"),
+    # from inside an if's else branch
+    ('fun sign(n) { if (n < 0) return "-"; else if (n == 0) return "0"; else return "+"; } print sign(-1) + sign(0) + sign(5);', "-0+\n"),
+    # a return in init() still hands back the instance
+    ("class A { init(x) { this.x = x; if (x) return; this.x = 0; } } print A(5).x; print A(false).x;", "5.0\n0.0\n"),
+    # statements after a return in a nested call don't run
+    ('fun inner() { return 1; print "never"; } fun outer() { var v = inner(); return v + 1; } print outer();', "2.0\n"),
+])
+def test_returns(source, output, options):
+    assert runSource(source, **options) == (output, 0)
+
+def test_completionOnlyFromReturn():
+    inst = lox(output=CaptureSink())
+    [function] = inst.compile("fun f() { return 7; }")
+    interpreter = inst.interpreter
+    interpreter.interperate([function])
+    [returnStmt] = function.body
+    completion = interpreter.execute(returnStmt)
+    assert type(completion) is ReturnValue
+    assert completion.value == 7.0
+    [printStmt] = inst.compile("print 1;")
+    assert interpreter.execute(printStmt) is None
+
+@pytest.mark.parametrize("name", sorted(returnWorkloads))
+def test_sameAsExceptionReturns(name):
+    expected = lox(output=CaptureSink())
+    expected.interpreter = ExceptionReturnInterpreter(expected)
+    expected.run(returnWorkloads[name])
+    assert runSource(returnWorkloads[name]) == (expected.output.getvalue(), 0)
@@ -0,0 +1,72 @@
+import pytest
+
+import rope
+from benchmark import loadWorkloads
+from harness import runSource
+from rope import Rope, concat
+
+big = "x" * rope.ropeThreshold
+
+def test_shortStringsStayPlain():
+    assert type(concat("ab", "cd")) is str
+    assert type(concat("a" * 100, "b" * 100)) is str
+
+def test_longResultIsRope():
+    result = concat(big, "y")
+    assert type(result) is Rope
+    assert len(result) == len(big) + 1
+    assert result == big + "y"
+    assert str(result) == big + "y"
+
+def test_appendingSharesParts():
+    first = concat(big, "a")
+    second = concat(first, "b")
+    assert second.parts is first.parts
+    assert (first.flatten(), second.flatten()) == (big + "a", big + "ab")
+
+def test_branchesDontSeeEachOther():
+    base = concat(big, "-")
+    left = concat(base, "left")
+    right = concat(base, "right")
+    assert left.parts is not right.parts
+    assert (str(base), str(left), str(right)) == (big + "-", big + "-left", big + "-right")
+
+def test_appendAfterFlatten():
+    base = concat(big, "a")
+    assert base.flatten() == big + "a"
+    longer = concat(base, "b")
+    assert longer == big + "ab"
+    assert base == big + "a"
+
+def test_ropeOnTheRight():
+    right = concat(big, "r")
+    assert concat("l", right) == "l" + big + "r"
+    assert concat(concat(big, "l"), right) == big + "l" + big + "r"
+
+def test_equalityAndHash():
+    a = concat(big, "z")
+    b = concat(concat(big, ""), "z")
+    assert a == b
+    assert hash(a) == hash(big + "z") == hash(b)
+    assert a != big
+
+def test_loxStringBuilding():
+    source = """
+    var s = "";
+    for (var i = 0; i < 100; i = i + 1) s = s + "0123456789";
+    var t = s + "!";
+    var u = s + "?";
+    print s == t;
+    print t == u;
+    print s + "!" == t;
+    print s;
+    """
+    output, status = runSource(source)
+    assert status == 0
+    assert output.splitlines() == ["False", "False", "True", "0123456789" * 100]
+
+def test_sameOutputWithoutRopes(monkeypatch):
+    source = loadWorkloads(["string_concat"])["string_concat"]
+    withRopes = runSource(source)
+    monkeypatch.setattr(rope, "ropeThreshold", float("inf"))
+    assert runSource(source) == withRopes
@@ -0,0 +1,72 @@
+import tracemalloc
+
+import pytest
+
+from harness import expected, fixtureNames, fixturePath, runCli, runSource
+from outputSink import CaptureSink
+from plox import lox
+
+@pytest.mark.parametrize("name", fixtureNames())
+def test_commandLineMatchesInProcess(name):
+    result = runCli(fixturePath(name))
+    assert (result.stdout, result.returncode) == expected(name)
+
+def test_syntaxErrorAtEndStopsThere():
+    source = "print 1;\n" * 3 + "print 2 +;\nprint 3;\n"
+    output, status = runSource(source)
+    assert status == 65
+    assert output == "1.0\n1.0\n1.0\n[line 4] Error at ';': expected expression\n"
+
+def test_resolveErrorStopsThere():
+    output, status = runSource('print "before";\nreturn 1;\nprint "after";\n')
+    assert (output, status) == ("before\n[line 2] Error at 'return': can't return from top-level code\n", 65)
+
+def test_wholeFileSyntaxErrorAtEndRunsNothing():
+    source = "print 1;\n" * 50 + "print 2 +;\n"
+    output, status = runSource(source, wholeFile=True)
+    assert status == 65
+    assert output == "[line 51] Error at ';': expected expression\n"
+
+def test_wholeFileInvalidCharacterRunsNothing():
+    output, status = runSource('print "before";\nprint 1 # 2;\n', wholeFile=True)
+    assert status == 65
+    assert "before" not in output
+
+def test_wholeFileFromCommandLine():
+    result = runCli("--whole-file", fixturePath("syntaxError"))
+    assert (result.stdout, result.returncode) == ("[line 3] Error at ';': expected expression\n", 65)
+
+def test_statementsSpanningLines():
+    output, status = runSource("var a =\n  1 +\n  2;\n{\n  print a;\n}\n")
+    assert (output, status) == ("3.0\n", 0)
+
+def test_definitionsCarryAcrossStatements():
+    source = "fun f(n) { return n + 1; }\nclass A { m() { return f(1); } }\nvar a = A();\nprint a.m();\n"
+    assert runSource(source) == ("2.0\n", 0)
+
+def peakMemory(statements: int, **options) -> int:
+    source = "var a = 0;\n" + "a = a + 1;\n" * statements + "print a;\n"
+    tracemalloc.start()
+    try:
+        inst = lox(output=CaptureSink(), **options)
+        inst.runStream(source)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert inst.output.getvalue() == f"{statements}.0\n"
+    return peak
+
+@pytest.mark.parametrize("options", [{}, {"scanner": "compact"}, {"parser": "pratt"}, {"backend": "vm"}, {"explicitStack": True}])
+def test_peakMemoryFlatInStatementCount(options):
+    # memory is taken by the largest statement, not the file: ten times the
+    # statements shouldn't come near ten times the peak
+    peakMemory(10, **options)
+    small = peakMemory(300, **options)
+    large = peakMemory(3000, **options)
+    assert large < small * 1.5 + 64 * 1024
+
+def test_wholeFilePeakMemoryGrows():
+    peakMemory(10, wholeFile=True)
+    small = peakMemory(300, wholeFile=True)
+    large = peakMemory(3000, wholeFile=True)
+    assert large > small * 5
@@ -0,0 +1,103 @@
+import os
+import time
+
+import pytest
+
+from harness import expected, readFixture, runFixture, runSource
+from plox import lox
+from scriptCache import ScriptCache
+
+def entries(directory) -> list[str]:
+    return [name for name in os.listdir(directory) if name.endswith(ScriptCache.suffix)]
+
+def test_secondRunSkipsCompiling(tmp_path, monkeypatch):
+    runFixture("core", cacheDir=str(tmp_path))
+    assert len(entries(tmp_path)) == 1
+
+    def compileStatements(self, statements):
+        raise AssertionError("compiled a cached script")
+    monkeypatch.setattr(lox, "compileStatements", compileStatements)
+    assert runFixture("core", cacheDir=str(tmp_path)) == expected("core")
+
+def test_syntaxErrorIsNotCached(tmp_path):
+    output, status = runFixture("syntaxError", cacheDir=str(tmp_path))
+    assert (output, status) == expected("syntaxError")
+    assert "Parsing error" not in output
+    assert entries(tmp_path) == []
+
+@pytest.mark.parametrize("options", [
+    {"optimize": False},
+    {"scanner": "regex"},
+    {"parser": "pratt"},
+    {"explicitStack": True},
+])
+def test_optionsGetTheirOwnEntries(options, tmp_path):
+    runFixture("core", cacheDir=str(tmp_path))
+    runFixture("core", cacheDir=str(tmp_path), **options)
+    assert len(entries(tmp_path)) == 2
+
+def test_damagedEntryIsRebuilt(tmp_path):
+    runFixture("core", cacheDir=str(tmp_path))
+    path = os.path.join(tmp_path, entries(tmp_path)[0])
+    with open(path, "wb") as f:
+        f.write(b"PLXCnot zlib")
+
+    assert runFixture("core", cacheDir=str(tmp_path)) == expected("core")
+    with open(path, "rb") as f:
+        assert f.read() != b"PLXCnot zlib"
+
+def test_evictsOldestPastSizeLimit(tmp_path):
+    cache = ScriptCache(str(tmp_path), maxBytes=1)
+    statements = []
+    for n in range(3):
+        assert cache.store(f"print {n};", statements)
+    assert len(entries(tmp_path)) <= 1
+
+def test_changedSourceMisses(tmp_path):
+    runSource("print 1;", cacheDir=str(tmp_path))
+    assert runSource("print 2;", cacheDir=str(tmp_path)) == ("2.0\n", 0)
+    assert len(entries(tmp_path)) == 2
+
+def loadFixture(cache: ScriptCache, name: str):
+    return cache.load(readFixture(name), lox().cacheOptions())
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="no mode bits to check")
+@pytest.mark.parametrize("mode", [0o770, 0o707])
+def test_writableByOthersIsIgnored(mode, tmp_path):
+    runFixture("core", cacheDir=str(tmp_path))
+    cache = ScriptCache(str(tmp_path))
+    assert loadFixture(cache, "core") is not None
+
+    os.chmod(tmp_path, mode)
+    try:
+        assert loadFixture(cache, "core") is None
+        assert not cache.store("print 1;", [])
+        assert runFixture("core", cacheDir=str(tmp_path)) == expected("core")
+        assert len(entries(tmp_path)) == 1
+    finally:
+        os.chmod(tmp_path, 0o700)
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="no mode bits to check")
+def test_entryWritableByOthersIsIgnored(tmp_path):
+    runFixture("core", cacheDir=str(tmp_path))
+    cache = ScriptCache(str(tmp_path))
+    os.chmod(os.path.join(tmp_path, entries(tmp_path)[0]), 0o666)
+    assert loadFixture(cache, "core") is None
+
+def test_newDirectoryIsPrivate(tmp_path):
+    ScriptCache(str(tmp_path / "cache"))
+    assert os.stat(tmp_path / "cache").st_mode & 0o777 == 0o700 or not hasattr(os, "getuid")
+
+def test_staleTempFilesAreRemoved(tmp_path):
+    cache = ScriptCache(str(tmp_path))
+    stale = os.path.join(tmp_path, "dead" + ScriptCache.tempSuffix)
+    fresh = os.path.join(tmp_path, "writing" + ScriptCache.tempSuffix)
+    for path in (stale, fresh):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+    old = time.time() - ScriptCache.staleAfter - 1
+    os.utime(stale, (old, old))
+
+    assert cache.store("print 1;", [])
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
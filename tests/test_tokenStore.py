@@ -0,0 +1,72 @@
+import pytest
+
+from harness import expected, fixtureNames, parseSource, readFixture, runFixture
+from plox import lox
+from ploxTokens import tokenType
+from tokenStore import CompactScanner, TokenStore, typesByCode
+
+malformed = [
+    "print 1 +;",
+    "var = 3;",
+    "1 = 2;",
+    "print (1;",
+    "x.;",
+    "f(1, 2,;",
+    "class { }",
+    "fun f(a, {}",
+    "print a + b = c;",
+    '"unterminated',
+]
+
+parsers = [("recursive", False), ("pratt", False), ("recursive", True)]
+
+@pytest.mark.parametrize("parser, explicitStack", parsers)
+@pytest.mark.parametrize("source", [readFixture(name) for name in fixtureNames()] + malformed)
+def test_storeParsesLikeTokenList(source, parser, explicitStack):
+    expected = parseSource(source, "classic", parser, explicitStack)
+    assert parseSource(source, "compact", parser, explicitStack) == expected
+
+def test_storeRoundTripsTokens():
+    source = readFixture("classes")
+    inst = lox()
+    store = CompactScanner(inst, source).scanTokens()
+    tokens = inst.scanners["classic"](inst, source).scanTokens()
+    assert [(t.type, t.lexeme, t.line, t.literal) for t in store] == \
+           [(t.type, t.lexeme, t.line, t.literal) for t in tokens]
+
+@pytest.mark.parametrize("parser", ["recursive", "pratt"])
+def test_parserOnlyMakesTokensItKeeps(parser, monkeypatch):
+    made = []
+    getitem = TokenStore.__getitem__
+
+    def counting(self, index):
+        made.append(index)
+        return getitem(self, index)
+
+    monkeypatch.setattr(TokenStore, "__getitem__", counting)
+    monkeypatch.setattr(TokenStore, "__iter__", None)
+
+    inst = lox(parser=parser)
+    store = CompactScanner(inst, readFixture("core")).scanTokens()
+    inst.parserType(inst, store).parse()
+
+    assert len(set(made)) == len(made)
+    assert len(made) < len(store)
+    # names, operators and literals, but no punctuation or statement keywords
+    built = {typesByCode[store.types[index]] for index in made}
+    skipped = {tokenType.semicolon, tokenType.brace_l, tokenType.brace_r, tokenType.paren_l, tokenType.paren_r, tokenType.PRINT, tokenType.VAR, tokenType.WHILE, tokenType.EOF}
+    assert not built & skipped
+
+def test_streamingNeverBuildsAStore(monkeypatch):
+    def noStore(self, source):
+        raise AssertionError("built a TokenStore")
+    monkeypatch.setattr(TokenStore, "__init__", noStore)
+    assert runFixture("core", scanner="compact") == expected("core")
+    assert runFixture("core", scanner="compact", wholeFile=True) == expected("core")
+
+def test_compileUsesTheStore(monkeypatch):
+    stores = []
+    init = TokenStore.__init__
+    monkeypatch.setattr(TokenStore, "__init__", lambda self, source: stores.append(1) or init(self, source))
+    assert lox(scanner="compact").compile("print 1;") is not None
+    assert len(stores) == 1
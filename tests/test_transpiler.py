@@ -0,0 +1,52 @@
+import pytest
+
+from harness import fixturePath, runCli, runFixture, runSource
+from outputSink import CaptureSink
+from plox import lox
+
+def translated(source: str) -> str:
+    inst = lox(backend="python", optimize=False)
+    return inst.interpreter.translate(inst.compile(source))
+
+def test_runtimeErrorLineInsideLoop():
+    source = 'var i = 0;\nwhile (i < 3) {\n  i = i + 1;\n  if (i == 2)\n    print -"x";\n}\n'
+    assert runSource(source, backend="python") == runSource(source) == ("operand must be a number\n[line 5]\n", 70)
+
+@pytest.mark.parametrize("name, status", [("syntaxError", 65), ("runtimeError", 70), ("core", 0)])
+def test_exitStatusFromCommandLine(name, status):
+    assert runCli("--backend", "python", fixturePath(name)).returncode == status
+
+@pytest.mark.parametrize("name, what", [("functions", "functions"), ("classes", "classes")])
+def test_unsupportedIsACompileError(name, what):
+    output, status = runFixture(name, backend="python")
+    assert status == 65
+    assert output == f"[line 1] Error : {what} aren't supported by the python backend\n"
+
+def test_shadowedLocalsGetTheirOwnNames():
+    lines = translated("{ var b = 1; { var b = 2; print b; } print b; }").splitlines()
+    assert lines[1:] == [
+        "    v1_b = 1.0",
+        "    v2_b = 2.0",
+        "    _print(_stringify(v2_b))",
+        "    _print(_stringify(v1_b))",
+        "    pass",
+    ]
+
+def test_globalsLiveInG():
+    source = translated("var a = 1; print a;")
+    assert source.splitlines()[:2] == ["def loxMain(G):", "    G['a'] = 1.0"]
+
+def test_globalsLastBetweenRuns():
+    sink = CaptureSink()
+    inst = lox(backend="python", output=sink)
+    inst.run("var a = 1;")
+    inst.run("a = a + 1;")
+    inst.run("print a;")
+    assert sink.getvalue() == "2.0\n"
+
+def test_tooDeeplyNestedForPython():
+    # CPython allows 20 nested blocks in one function
+    source = "var t = 0; " + "while (t < 1) { t = t + 1; " * 30 + "print t;" + "}" * 30
+    output, status = runSource(source, backend="python")
+    assert status == 65
+    assert "program too deeply nested for the python backend" in output
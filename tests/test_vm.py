@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+import pytest
+
+from bytecode import Chunk, Compiler, disassemble
+from harness import fixturePath, repoDir, runCli, runFixture, runSource
+from outputSink import CaptureSink
+from plox import lox
+
+def compiled(source: str) -> Chunk:
+    inst = lox(optimize=False)
+    return Compiler(inst).compile(inst.compile(source))
+
+def test_runtimeErrorLineInsideLoop():
+    source = 'var i = 0;\nwhile (i < 3) {\n  i = i + 1;\n  if (i == 2)\n    print i + "x";\n}\n'
+    assert runSource(source, backend="vm") == runSource(source) == ("operands must be two numbers or strings\n[line 5]\n", 70)
+
+@pytest.mark.parametrize("name, status", [("syntaxError", 65), ("runtimeError", 70), ("core", 0)])
+def test_exitStatusFromCommandLine(name, status):
+    assert runCli("--backend", "vm", fixturePath(name)).returncode == status
+
+@pytest.mark.parametrize("name, what", [("functions", "functions"), ("classes", "classes")])
+def test_unsupportedIsACompileError(name, what):
+    output, status = runFixture(name, backend="vm")
+    assert status == 65
+    assert output == f"[line 1] Error : {what} aren't supported by the vm backend\n"
+
+def test_disassemble():
+    chunk = compiled("{ var a = 1; print a + 2; }\nif (true) print 1; else print nil;")
+    assert disassemble(chunk, "test") == """== test ==
+0000    1 CONSTANT           0 '1.0'
+0002    | GET_LOCAL          0
+0004    | CONSTANT           1 '2.0'
+0006    | ADD
+0007    | PRINT
+0008    | POP
+0009    | TRUE
+0010    | JUMP_IF_FALSE      6 -> 0018
+0012    | POP
+0013    | CONSTANT           0 '1.0'
+0015    | PRINT
+0016    | JUMP               3 -> 0021
+0018    | POP
+0019    | NIL
+0020    | PRINT
+0021    | RETURN"""
+
+def test_constantsKeyedOnType():
+    chunk = compiled("print 1; print 1; print 0; print false == 0;")
+    assert chunk.constants == [1.0, 0.0]
+    chunk = Chunk()
+    assert [chunk.addConstant(value) for value in (1.0, True, 1.0, True, "1")] == [0, 1, 0, 1, 2]
+
+def test_blockPopsItsLocals():
+    chunk = compiled("{ var a = 1; var b = 2; { var c = 3; } }")
+    # one local is a plain POP, more are a POPN
+    assert disassemble(chunk).splitlines()[4:6] == ["0006    | POP", "0007    | POPN               2"]
+
+def test_globalsLastBetweenRuns():
+    sink = CaptureSink()
+    inst = lox(backend="vm", output=sink)
+    inst.run("var a = 1;")
+    inst.run("a = a + 1;")
+    inst.run("print a;")
+    assert sink.getvalue() == "2.0\n"
+
+def test_disassemblerFromCommandLine():
+    result = subprocess.run([sys.executable, "bytecode.py", fixturePath("runtimeError")],
+                            capture_output=True, text=True, cwd=repoDir, timeout=120)
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[1:3] == ["0000    1 CONSTANT           0 'before'", "0002    | PRINT"]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from array import array
+
+from ploxTokens import *
+from regexScanner import RegexScanner, masterPattern, operators, WHITESPACE, NEWLINE, COMMENT, NUMBER, IDENTIFIER, STRING, OPERATOR
+
+# tokenType value -> member, so a type code turns back into a tokenType with
+# one list index
+typesByCode: list[tokenType|None] = [None] * (max(t.value for t in tokenType) + 1)
+for t in tokenType:
+    typesByCode[t.value] = t
+
+class TokenStore:
+
+    # Compact token list: one byte of type code plus start/end offsets into
+    # the source and a line number per token, all in parallel arrays. Lexemes
+    # and literals are cut back out of the source only when someone asks for
+    # them, and identifier names are interned so a name that shows up
+    # thousands of times is stored once.
+    #
+    # Parser reads the type arrays in place and indexes the store only for
+    # the tokens it puts in the tree or an error message. Indexing (and
+    # iterating, for anything else that wants a token stream) hands out
+    # ordinary Token objects built on the spot, so error reporting and the
+    # AST still see the same Tokens as before.
+
+    def __init__(self, source: str):
+        self.source: str = source
+        self.types: array = array('B')
+        self.starts: array = array('I')
+        self.ends: array = array('I')
+        self.lines: array = array('I')
+        self.names: dict[str, str] = {}
+
+    def add(self, type: tokenType, start: int, end: int, line: int) -> None:
+        self.types.append(type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def type(self, index: int) -> tokenType:
+        return typesByCode[self.types[index]]
+
+    def line(self, index: int) -> int:
+        return self.lines[index]
+
+    def lexeme(self, index: int) -> str:
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def literal(self, index: int) -> object:
+        match typesByCode[self.types[index]]:
+            case tokenType.number:
+                return float(self.lexeme(index))
+            case tokenType.identifier:
+                return self.intern(self.lexeme(index))
+            case tokenType.string:
+                text = self.lexeme(index)
+                return text[1:-1] if len(text) > 1 and text[-1] == '"' else text[1:]
+        return None
+
+    def intern(self, name: str) -> str:
+        return self.names.setdefault(name, name)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        type = typesByCode[self.types[index]]
+        lexeme = self.lexeme(index)
+        if type == tokenType.identifier:
+            lexeme = self.intern(lexeme)
+        return Token(type, lexeme, self.lines[index], self.literal(index))
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
+
+class CompactScanner:
+
+    # Same interface as Scanner/RegexScanner, but scanTokens() fills a
+    # TokenStore instead of building a list of Tokens.
+    #
+    # This only saves memory. A store holds a whole file's tokens in about a
+    # tenth of what a list of Tokens takes, but scanning into it and parsing
+    # from it are slower than with Tokens. So it only pays where a whole
+    # token list would otherwise be held, which is compile() (the REPL,
+    # lox.prepare() and the benchmarks). runStream() never holds a token
+    # list at all, so the store is kept out of the streaming path.
+
+    def __init__(self, lox_inst, source: str = ""):
+        self.lox_inst = lox_inst
+        self.source: str = source
+        self.line: int = 1
+
+    def scanTokens(self) -> TokenStore:
+        store = TokenStore(self.source)
+        types = store.types
+        starts = store.starts
+        ends = store.ends
+        lines = store.lines
+        line = self.line
+
+        identifierCode = tokenType.identifier.value
+        numberCode = tokenType.number.value
+        stringCode = tokenType.string.value
+        keywordCodes = {name: type.value for name, type in keywords.items()}
+        operatorCodes = {text: type.value for text, type in operators.items()}
+
+        for match in masterPattern.finditer(self.source):
+            kind = match.lastindex
+
+            if kind == WHITESPACE or kind == COMMENT:
+                continue
+
+            if kind == NEWLINE:
+                line += 1
+                continue
+
+            if kind == IDENTIFIER:
+                code = keywordCodes.get(match.group(), identifierCode)
+            elif kind == OPERATOR:
+                code = operatorCodes[match.group()]
+            elif kind == NUMBER:
+                code = numberCode
+            elif kind == STRING:
+                code = stringCode
+                line += match.group().count("\n")
+            else:
+                self.lox_inst.report(line, "", "invalid character")
+                continue
+
+            start, end = match.span()
+            types.append(code)
+            starts.append(start)
+            ends.append(end)
+            lines.append(line)
+
+        self.line = line
+        store.add(tokenType.EOF, len(self.source), len(self.source), line)
+        return store
+
+    # the streaming path: Tokens from the regex scanner, handed out as
+    # they're made, with no store behind them
+    def iterTokens(self):
+        scanner = RegexScanner(self.lox_inst, self.source)
+        yield from scanner.iterTokens()
+        self.line = scanner.line
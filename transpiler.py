@@ -0,0 +1,300 @@
+from __future__ import annotations
+import math
+
+from AST import *
+from STMT import *
+from ploxTokens import *
+from ploxRuntime import LoxRuntimeError, stringify
+from closureCompiler import producesBool
+from bytecode import CompileError
+
+# Runtime support the generated code calls into. Everything that can fail
+# gets the Lox line baked in as a constant, so errors still point at the
+# right line even though they're raised from Python code.
+
+def _error(line: int, msg: str, lexeme: str = ""):
+    raise LoxRuntimeError(Token(tokenType.notok, lexeme, line), msg)
+
+def _numberError(line: int):
+    _error(line, "operand must be a number")
+
+def _divisionError(line: int):
+    _error(line, "division by zero")
+
+def _addError(line: int):
+    _error(line, "operands must be two numbers or strings")
+
+def _undefined(name: str, line: int):
+    _error(line, f"Undefined variable {name}. Lock tf in bruh", name)
+
+def _assignGlobal(G: dict, name: str, value: object, line: int):
+    if name not in G:
+        _error(line, f"ts undefined: {name}.", name)
+    G[name] = value
+    return value
+
+runtimeNamespace = {
+    "_numberError": _numberError,
+    "_divisionError": _divisionError,
+    "_addError": _addError,
+    "_undefined": _undefined,
+    "_assignGlobal": _assignGlobal,
+    "_stringify": stringify,
+    # _print is bound to the backend's output sink for every run
+    "_inf": math.inf,
+}
+
+class Transpiler(Expr.Visitor, Stmt.Visitor):
+
+    # Turns a parsed program into the source of one Python function,
+    # compile()s it and runs the code object. Lox locals become Python locals
+    # (renamed so shadowing works), globals live in the dict G that is kept
+    # between runs. Lox semantics that differ from Python's (truthiness,
+    # number-only arithmetic, no bool/number mixing) are spelled out inline
+    # with walrus temporaries so the common path never makes a call.
+
+    def __init__(self, lox_inst):
+        self.lox_inst = lox_inst
+        self.output = lox_inst.output
+        self.globals: dict[str, object] = {}
+
+    def translate(self, statements: list[Stmt]) -> str:
+        self.lines: list[str] = ["def loxMain(G):"]
+        self.indent: int = 1
+        self.scopes: list[dict[str, str]] = []
+        self.localCount: int = 0
+        self.tempCount: int = 0
+
+        for statement in statements:
+            self.emitStmt(statement)
+        self.emit("pass")
+
+        return "\n".join(self.lines) + "\n"
+
+    def interperate(self, statements: list[Stmt]):
+        code = self.prepare(statements)
+        if code is None:
+            return
+
+        try:
+            self.runPrepared(code)
+        except LoxRuntimeError as e:
+            self.lox_inst.runTimeError(e)
+
+    # for lox.prepare(): the code object only defines loxMain, so running it
+    # again in a fresh namespace costs next to nothing next to compile()
+    def prepare(self, statements: list[Stmt]):
+        try:
+            source = self.translate(statements)
+        except CompileError:
+            return None
+
+        try:
+            return compile(source, "<lox>", "exec")
+        except (SyntaxError, RecursionError) as e:
+            # CPython caps how deep blocks and brackets can nest
+            self.lox_inst.report(0, "", f"program too deeply nested for the python backend ({e})")
+            return None
+
+    def runPrepared(self, code) -> None:
+        namespace = dict(runtimeNamespace)
+        namespace["_print"] = self.output.writeLine
+        exec(code, namespace)
+        namespace["loxMain"](self.globals)
+
+    def emit(self, line: str) -> None:
+        self.lines.append("    " * self.indent + line)
+
+    def emitStmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def expr(self, expr: Expr) -> str:
+        return expr.accept(self)
+
+    def temp(self) -> str:
+        self.tempCount += 1
+        return f"_t{self.tempCount}"
+
+    def lookup(self, name: Token) -> str|None:
+        for scope in reversed(self.scopes):
+            if name.lexeme in scope:
+                return scope[name.lexeme]
+        return None
+
+    def condition(self, expr: Expr) -> str:
+        if producesBool(expr):
+            return self.expr(expr)
+        t = self.temp()
+        return f"not ((({t} := {self.expr(expr)}) is None) or {t} is False)"
+
+    def emitBody(self, stmt: Stmt) -> None:
+        self.indent += 1
+        start = len(self.lines)
+        self.emitStmt(stmt)
+        if len(self.lines) == start:
+            self.emit("pass")
+        self.indent -= 1
+
+    def unsupported(self, token: Token, msg: str):
+        self.lox_inst.report(token.line, "", msg)
+        raise CompileError(msg)
+
+    # functions and classes only run on the tree walker so far
+    def visitFunctionStmt(self, stmt: Function):
+        self.unsupported(stmt.name, "functions aren't supported by the python backend")
+
+    def visitReturnStmt(self, stmt: Return):
+        self.unsupported(stmt.keyword, "functions aren't supported by the python backend")
+
+    def visitCallExpr(self, expr: Call):
+        self.unsupported(expr.paren, "calls aren't supported by the python backend")
+
+    def visitClassStmt(self, stmt: Class):
+        self.unsupported(stmt.name, "classes aren't supported by the python backend")
+
+    def visitGetExpr(self, expr: Get):
+        self.unsupported(expr.name, "classes aren't supported by the python backend")
+
+    def visitSetExpr(self, expr: Set):
+        self.unsupported(expr.name, "classes aren't supported by the python backend")
+
+    def visitThisExpr(self, expr: This):
+        self.unsupported(expr.keyword, "classes aren't supported by the python backend")
+
+    def visitSuperExpr(self, expr: Super):
+        self.unsupported(expr.keyword, "classes aren't supported by the python backend")
+
+    def visitBlockStmt(self, stmt: Block):
+        self.scopes.append({})
+        for statement in stmt.statements:
+            self.emitStmt(statement)
+        self.scopes.pop()
+
+    def visitExpressionStmt(self, stmt: Expression):
+        expr = stmt.expression
+        # plain assignments are by far the most common expression statement,
+        # give them a real assignment instead of an expression form
+        if isinstance(expr, Assign):
+            local = self.lookup(expr.name)
+            if local is not None:
+                self.emit(f"{local} = {self.expr(expr.value)}")
+                return
+            name = repr(expr.name.lexeme)
+            self.emit(f"_v = {self.expr(expr.value)}")
+            self.emit(f"if {name} not in G: _assignGlobal(G, {name}, _v, {expr.name.line})")
+            self.emit(f"G[{name}] = _v")
+            return
+
+        self.emit(self.expr(expr))
+
+    def visitPrintStmt(self, stmt: Print):
+        self.emit(f"_print(_stringify({self.expr(stmt.expression)}))")
+
+    def visitVarStmt(self, stmt: Var):
+        value = "None" if stmt.initializer is None else self.expr(stmt.initializer)
+
+        if not self.scopes:
+            self.emit(f"G[{stmt.name.lexeme!r}] = {value}")
+            return
+
+        self.localCount += 1
+        local = f"v{self.localCount}_{stmt.name.lexeme}"
+        self.emit(f"{local} = {value}")
+        self.scopes[-1][stmt.name.lexeme] = local
+
+    def visitIfStmt(self, stmt: If):
+        self.emit(f"if {self.condition(stmt.condition)}:")
+        self.emitBody(stmt.thenBranch)
+        if stmt.elseBranch is not None:
+            self.emit("else:")
+            self.emitBody(stmt.elseBranch)
+
+    def visitWhileStmt(self, stmt: While):
+        self.emit(f"while {self.condition(stmt.condition)}:")
+        if stmt.increment is None:
+            self.emitBody(stmt.body)
+        else:
+            self.emitBody(Block([stmt.body, Expression(stmt.increment)]))
+
+    def visitLiteralExpr(self, expr: Literal):
+        value = expr.value
+        if isinstance(value, float) and not math.isfinite(value):
+            return "_inf" if value > 0 else "(-_inf)"
+        return repr(value)
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.expr(expr.expression)
+
+    def visitVariableExpr(self, expr: Variable):
+        local = self.lookup(expr.name)
+        if local is not None:
+            return local
+        name = repr(expr.name.lexeme)
+        return f"(G[{name}] if {name} in G else _undefined({name}, {expr.name.line}))"
+
+    def visitAssignExpr(self, expr: Assign):
+        value = self.expr(expr.value)
+        local = self.lookup(expr.name)
+        if local is not None:
+            return f"({local} := {value})"
+        return f"_assignGlobal(G, {expr.name.lexeme!r}, {value}, {expr.name.line})"
+
+    def visitLogicalExpr(self, expr: Logical):
+        t = self.temp()
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        falsy = f"(({t} := {left}) is None or {t} is False)"
+
+        if expr.operator.type == tokenType.OR:
+            return f"({right} if {falsy} else {t})"
+        return f"({t} if {falsy} else {right})"
+
+    def visitUnaryExpr(self, expr: Unary):
+        t = self.temp()
+        right = self.expr(expr.right)
+
+        match expr.operator.type:
+            case tokenType.minus:
+                return f"(-{t} if type({t} := {right}) is float else _numberError({expr.operator.line}))"
+            case tokenType.bang:
+                return f"((({t} := {right}) is None) or {t} is False)"
+
+        return "None"
+
+    numberOps = {
+        tokenType.minus: "-",
+        tokenType.star: "*",
+        tokenType.greater: ">",
+        tokenType.greater_equal: ">=",
+        tokenType.lesser: "<",
+        tokenType.lesser_equal: "<=",
+    }
+
+    def visitBinaryExpr(self, expr: Binary):
+        a = self.temp()
+        b = self.temp()
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        line = expr.operator.line
+        type_ = expr.operator.type
+
+        # & instead of 'and' so the right operand is always evaluated, just
+        # like the tree walker does before it checks anything
+        bothNumbers = f"(type({a} := {left}) is float) & (type({b} := {right}) is float)"
+
+        if type_ in self.numberOps:
+            return f"({a} {self.numberOps[type_]} {b} if {bothNumbers} else _numberError({line}))"
+
+        match type_:
+            # a zero divisor is falsy, -0.0 included
+            case tokenType.slash:
+                return f"(({a} / {b} if {b} else _divisionError({line})) if {bothNumbers} else _numberError({line}))"
+            case tokenType.plus:
+                return f"({a} + {b} if {bothNumbers} or type({a}) is str is type({b}) else _addError({line}))"
+            # Lox values compare the same way isEqual does under plain ==
+            case tokenType.equal_equal:
+                return f"({left} == {right})"
+            case tokenType.bang_equal:
+                return f"({left} != {right})"
+
+        return "None"
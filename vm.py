@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from STMT import Stmt
+from ploxTokens import *
+from bytecode import OpCode, Chunk, Compiler, CompileError
+from ploxRuntime import LoxRuntimeError, isEqual, isTruthy, stringify
+
+# plain ints so the dispatch loop compares small ints instead of enum members
+CONSTANT = int(OpCode.CONSTANT)
+NIL = int(OpCode.NIL)
+TRUE = int(OpCode.TRUE)
+FALSE = int(OpCode.FALSE)
+POP = int(OpCode.POP)
+POPN = int(OpCode.POPN)
+GET_LOCAL = int(OpCode.GET_LOCAL)
+SET_LOCAL = int(OpCode.SET_LOCAL)
+GET_GLOBAL = int(OpCode.GET_GLOBAL)
+SET_GLOBAL = int(OpCode.SET_GLOBAL)
+DEFINE_GLOBAL = int(OpCode.DEFINE_GLOBAL)
+EQUAL = int(OpCode.EQUAL)
+NOT_EQUAL = int(OpCode.NOT_EQUAL)
+GREATER = int(OpCode.GREATER)
+GREATER_EQUAL = int(OpCode.GREATER_EQUAL)
+LESS = int(OpCode.LESS)
+LESS_EQUAL = int(OpCode.LESS_EQUAL)
+ADD = int(OpCode.ADD)
+SUBTRACT = int(OpCode.SUBTRACT)
+MULTIPLY = int(OpCode.MULTIPLY)
+DIVIDE = int(OpCode.DIVIDE)
+NOT = int(OpCode.NOT)
+NEGATE = int(OpCode.NEGATE)
+PRINT = int(OpCode.PRINT)
+JUMP = int(OpCode.JUMP)
+JUMP_IF_FALSE = int(OpCode.JUMP_IF_FALSE)
+JUMP_IF_TRUE = int(OpCode.JUMP_IF_TRUE)
+LOOP = int(OpCode.LOOP)
+RETURN = int(OpCode.RETURN)
+
+class VM:
+
+    # Stack machine that runs the Chunks made by bytecode.Compiler. Same
+    # interface as Interpreter (interperate(statements)) so lox can use it as
+    # a backend. Globals stick around between runs like they do in the REPL.
+
+    def __init__(self, lox_inst):
+        self.lox_inst = lox_inst
+        self.output = lox_inst.output
+        self.globals: dict[str, object] = {}
+
+    def interperate(self, statements: list[Stmt]):
+        chunk = self.prepare(statements)
+        if chunk is None:
+            return
+
+        try:
+            self.run(chunk)
+        except LoxRuntimeError as e:
+            self.lox_inst.runTimeError(e)
+
+    # for lox.prepare(): a Chunk is never written to while it runs, so one
+    # can be shared by any number of VMs
+    def prepare(self, statements: list[Stmt]) -> Chunk|None:
+        try:
+            return Compiler(self.lox_inst).compile(statements)
+        except CompileError:
+            return None
+
+    def runPrepared(self, chunk: Chunk) -> None:
+        self.run(chunk)
+
+    def error(self, chunk: Chunk, ip: int, msg: str, lexeme: str = "") -> LoxRuntimeError:
+        # ip has already moved past the failing instruction
+        return LoxRuntimeError(Token(tokenType.notok, lexeme, chunk.lines[ip - 1]), msg)
+
+    def run(self, chunk: Chunk):
+        code = chunk.code
+        constants = chunk.constants
+        globals = self.globals
+        writeLine = self.output.writeLine
+
+        stack: list[object] = []
+        push = stack.append
+        pop = stack.pop
+        ip = 0
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            # roughly ordered by how often they show up in loop bodies
+            if op == GET_LOCAL:
+                push(stack[code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op == GET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                try:
+                    push(globals[name])
+                except KeyError:
+                    raise self.error(chunk, ip, f"Undefined variable {name}. Lock tf in bruh", name) from None
+            elif op == SET_LOCAL:
+                stack[code[ip]] = stack[-1]
+                ip += 1
+            elif op == SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in globals:
+                    raise self.error(chunk, ip, f"ts undefined: {name}.", name)
+                globals[name] = stack[-1]
+            elif op == POP:
+                pop()
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += code[ip] + 1
+                else:
+                    ip += 1
+            elif op == LOOP:
+                ip = ip + 1 - code[ip]
+            elif op == JUMP:
+                ip += code[ip] + 1
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if (type(a) is float and type(b) is float) or (type(a) is str and type(b) is str):
+                    stack[-1] = a + b
+                else:
+                    raise self.error(chunk, ip, "operands must be two numbers or strings")
+            elif op == LESS:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = a < b
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = a - b
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = a * b
+            elif op == DIVIDE:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                if b == 0:
+                    raise self.error(chunk, ip, "division by zero")
+                stack[-1] = a / b
+            elif op == GREATER:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = a > b
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = a >= b
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = a <= b
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = isEqual(stack[-1], b)
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = not isEqual(stack[-1], b)
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += 1
+                else:
+                    ip += code[ip] + 1
+            elif op == POPN:
+                del stack[-code[ip]:]
+                ip += 1
+            elif op == NOT:
+                stack[-1] = not isTruthy(stack[-1])
+            elif op == NEGATE:
+                if type(stack[-1]) is not float:
+                    raise self.error(chunk, ip, "operand must be a number")
+                stack[-1] = -stack[-1]
+            elif op == PRINT:
+                writeLine(stringify(pop()))
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == DEFINE_GLOBAL:
+                globals[constants[code[ip]]] = pop()
+                ip += 1
+            elif op == RETURN:
+                return
+            else:
+                raise RuntimeError(f"unknown opcode {op} at {ip - 1}")